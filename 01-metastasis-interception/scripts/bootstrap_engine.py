@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Vectorized stratified bootstrap for AUROC / AUPRC (shared by the metastasis validation scripts).
+
+Why this exists:
+- `compute_per_step_validation.py` and `compute_holdout_validation.py` each looped up to 1000-5000
+  times per step per metric, calling sklearn on every resample, and the "stratified" bootstrap did
+  not actually stratify (resamples could lose a class and were silently dropped).
+
+Method:
+- All resample indices are drawn at once as a (B × n) matrix. Stratified: each class is resampled
+  with replacement within itself, so every resample keeps the observed positive/negative counts.
+- A resample only reweights the original samples, so each metric is computed from the (B × n)
+  multiplicity matrix and the original score order (one matmul into distinct-score groups, then
+  cumulative sums) with no per-resample sort.
+- AUROC is the Mann-Whitney U statistic (ties count ½); AUPRC is average precision exactly as
+  `sklearn.metrics.average_precision_score` (step-wise sum over distinct score thresholds).
+- Several score variants (V × n) share the same resamples (paired CIs).
+
+Usage:
+    from bootstrap_engine import bootstrap_ci
+    ci = bootstrap_ci(y_true, y_score, n_boot=1000, seed=42)
+    auroc_mean, auroc_lower, auroc_upper = ci["auroc"]
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def bootstrap_indices(
+    y_true: np.ndarray,
+    n_boot: int,
+    rng: np.random.Generator,
+    stratified: bool = True,
+) -> np.ndarray:
+    """(n_boot × n) resample index matrix; stratified keeps per-class counts fixed."""
+    y_true = np.asarray(y_true)
+    n = len(y_true)
+    if not stratified:
+        return rng.integers(0, n, size=(n_boot, n))
+    blocks = []
+    for c in np.unique(y_true):
+        members = np.flatnonzero(y_true == c)
+        blocks.append(members[rng.integers(0, len(members), size=(n_boot, len(members)))])
+    return np.concatenate(blocks, axis=1)
+
+
+def resample_counts(idx: np.ndarray, n: int) -> np.ndarray:
+    """(B × n) multiplicity of each original sample in each resample."""
+    B = idx.shape[0]
+    flat = (np.arange(B)[:, None] * n + idx).ravel()
+    return np.bincount(flat, minlength=B * n).reshape(B, n).astype(np.float64)
+
+
+def _tie_groups(y_score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct scores ascending and the (n × G) sample → score-group indicator."""
+    uniq, inv = np.unique(y_score, return_inverse=True)
+    G = np.zeros((len(y_score), len(uniq)))
+    G[np.arange(len(y_score)), inv] = 1.0
+    return uniq, G
+
+
+def auroc_weighted(y_true: np.ndarray, y_score: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """AUROC of each weighted resample (rows of W) of (y_true, y_score); NaN where a class is absent.
+
+    Mann-Whitney U over score groups: U = Σ_g pos_g · (neg below g + ½ neg_g).
+    """
+    _, G = _tie_groups(y_score)
+    pos = (W * (y_true == 1)) @ G
+    neg = (W * (y_true != 1)) @ G
+    neg_below = np.cumsum(neg, axis=1) - neg
+    P, N = pos.sum(axis=1), neg.sum(axis=1)
+    u = (pos * (neg_below + 0.5 * neg)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((P > 0) & (N > 0), u / (P * N), np.nan)
+
+
+def auprc_weighted(y_true: np.ndarray, y_score: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """Average precision (sklearn definition) of each weighted resample; NaN where no positives.
+
+    Thresholds are the distinct scores (descending): AP = Σ_g pos_g · precision@g / P.
+    """
+    _, G = _tie_groups(y_score)
+    pos = ((W * (y_true == 1)) @ G)[:, ::-1]
+    tot = (W @ G)[:, ::-1]
+    tp = np.cumsum(pos, axis=1)
+    k = np.cumsum(tot, axis=1)
+    P = tp[:, -1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(k > 0, tp / k, 0.0)
+        return np.where(P > 0, (pos * precision).sum(axis=1) / P, np.nan)
+
+
+METRICS = {"auroc": auroc_weighted, "auprc": auprc_weighted}
+
+
+def _summarize(vals: np.ndarray, confidence: float) -> Tuple[float, float, float]:
+    vals = vals[~np.isnan(vals)]
+    if len(vals) == 0:
+        return np.nan, np.nan, np.nan
+    alpha = (1 - confidence) / 2 * 100
+    return float(np.mean(vals)), float(np.percentile(vals, alpha)), float(np.percentile(vals, 100 - alpha))
+
+
+def bootstrap_distribution(
+    y_true: np.ndarray,
+    y_score: np.ndarray,
+    metrics: Sequence[str] = ("auroc", "auprc"),
+    n_boot: int = 1000,
+    seed: int = 42,
+    stratified: bool = True,
+    idx: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Raw bootstrap values: {metric: (B,) or (V × B) for a (V × n) y_score}."""
+    y_true = np.asarray(y_true).astype(int)
+    y_score = np.asarray(y_score, dtype=np.float64)
+    if idx is None:
+        idx = bootstrap_indices(y_true, n_boot, np.random.default_rng(seed), stratified)
+    W = resample_counts(idx, len(y_true))
+    variants = y_score[None, :] if y_score.ndim == 1 else y_score
+    out = {}
+    for m in metrics:
+        fn = METRICS[m]
+        vals = np.stack([fn(y_true, s, W) for s in variants])
+        out[m] = vals[0] if y_score.ndim == 1 else vals
+    return out
+
+
+def bootstrap_ci(
+    y_true: np.ndarray,
+    y_score: np.ndarray,
+    metrics: Sequence[str] = ("auroc", "auprc"),
+    n_boot: int = 1000,
+    seed: int = 42,
+    confidence: float = 0.95,
+    stratified: bool = True,
+) -> Dict:
+    """{metric: (mean, lower, upper)}; for a (V × n) y_score, {metric: [(mean, lower, upper)] * V}."""
+    dist = bootstrap_distribution(y_true, y_score, metrics, n_boot, seed, stratified)
+    if np.ndim(y_score) == 1:
+        return {m: _summarize(v, confidence) for m, v in dist.items()}
+    return {m: [_summarize(row, confidence) for row in v] for m, v in dist.items()}
@@ -7,17 +7,29 @@ Drop each signal (functionality, chromatin, essentiality, regulatory) and measur
 - Measure AUROC drop per signal per step
 - Rank signal importance with confidence intervals
 
+Weight sensitivity sweep (reviewer question: how sensitive are results to WEIGHTS?):
+- Sample the weight simplex (Dirichlet) or a regular grid (--grid_step)
+- Score every (gene, step) row for every weight vector at once: (rows × 4) @ (4 × W)
+- Per-step AUROC for all W columns in one rank-based pass
+- Report the stability region around the published WEIGHTS
+
 Author: Zo
 Date: October 13, 2025
 """
 
+import argparse
+import itertools
 import json
-import os
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
-from sklearn.metrics import roc_auc_score
+from scipy.stats import rankdata
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_data
 
 SEED = 42
 np.random.seed(SEED)
@@ -34,87 +46,138 @@ WEIGHTS = {
 
 SIGNALS = ['functionality', 'essentiality', 'chromatin', 'regulatory']
 
-def load_data():
-    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"))
-    if not rules_path.exists():
-        rules_path = Path("oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json")
-    with open(rules_path) as f:
-        rules = json.load(f)
-    
-    scores = pd.read_csv(DATA_DIR / "real_target_lock_data.csv")
-    if 'mission' in scores.columns:
-        scores = scores.rename(columns={'mission': 'step'})
-    
-    return rules, scores
+def build_step_design(rules, scores) -> List[Dict]:
+    """Per step: gene list, (genes × 4) signal matrix X, binary labels y, published target_lock_score."""
+    design = []
+    for step in rules['steps']:
+        step_scores = scores[scores['step'] == step]
+        if len(step_scores) == 0:
+            continue
+        y = step_scores['is_relevant'].to_numpy(dtype=int)
+        design.append({
+            'step': step,
+            'genes': step_scores['gene'].tolist(),
+            'X': step_scores[SIGNALS].to_numpy(dtype=float),
+            'y': y,
+            'published': step_scores['target_lock_score'].to_numpy(dtype=float),
+        })
+    return design
 
-def recompute_target_lock(scores_df, exclude_signal=None):
-    """Recompute Target-Lock score excluding one signal"""
-    weights = WEIGHTS.copy()
-    
+def auroc_columns(y_true: np.ndarray, S: np.ndarray) -> np.ndarray:
+    """AUROC of every column of S (n × W) against y_true (ties count ½, as roc_auc_score); NaN if one class."""
+    y = np.asarray(y_true).astype(bool)
+    P, N = int(y.sum()), int((~y).sum())
+    if P == 0 or N == 0:
+        return np.full(S.shape[1], np.nan)
+    # Round away float noise from the matmul so equal-in-exact-arithmetic scores tie
+    ranks = rankdata(np.round(S, 10), axis=0)
+    return (ranks[y].sum(axis=0) - P * (P + 1) / 2.0) / (P * N)
+
+def score_weight_matrix(design: List[Dict], W: np.ndarray) -> np.ndarray:
+    """(steps × W) per-step AUROC for every weight vector (rows of W, in SIGNALS order)."""
+    X = np.vstack([d['X'] for d in design])
+    S = X @ W.T  # all Target-Lock scores for all weight vectors: (rows × W)
+    out = np.full((len(design), len(W)), np.nan)
+    start = 0
+    for k, d in enumerate(design):
+        n = len(d['y'])
+        out[k] = auroc_columns(d['y'], S[start:start + n])
+        start += n
+    return out
+
+def ablation_weights(exclude_signal=None) -> np.ndarray:
+    """WEIGHTS with one signal zeroed and the rest renormalized (SIGNALS order)."""
+    w = np.array([WEIGHTS[sig] for sig in SIGNALS], dtype=float)
     if exclude_signal:
-        # Zero out excluded signal and renormalize
-        weights[exclude_signal] = 0
-        total = sum(weights.values())
-        weights = {k: v/total for k, v in weights.items()}
-    
-    new_scores = (
-        scores_df['functionality'] * weights['functionality'] +
-        scores_df['essentiality'] * weights['essentiality'] +
-        scores_df['chromatin'] * weights['chromatin'] +
-        scores_df['regulatory'] * weights['regulatory']
-    )
-    
-    return new_scores
+        w[SIGNALS.index(exclude_signal)] = 0.0
+        w = w / w.sum()
+    return w
 
 def compute_ablation_per_step(rules, scores):
     """Compute AUROC drop for each signal per step"""
+    design = [d for d in build_step_design(rules, scores) if len(np.unique(d['y'])) == 2]
+    if not design:
+        return pd.DataFrame()
+    
+    # Leave-one-signal-out weight vectors, scored in one pass
+    W = np.stack([ablation_weights(sig) for sig in SIGNALS])
+    ablated = score_weight_matrix(design, W)
+    
     results = []
-    steps = list(rules['steps'].keys())
-    
-    for step in steps:
-        # Get labels
-        step_data = rules['steps'][step]
-        primary = set(step_data.get('primary_genes', []))
-        secondary = set(step_data.get('secondary_genes', []))
-        relevant = primary | secondary
-        
-        # Get scores for this step
-        step_scores = scores[scores['step'] == step].copy()
-        if len(step_scores) == 0:
-            continue
-        
-        step_scores['label'] = step_scores['gene'].apply(lambda g: 1 if g in relevant else 0)
-        
-        y_true = step_scores['label'].values
-        
-        if len(np.unique(y_true)) < 2:
-            continue
-        
-        # Baseline AUROC (all signals)
-        y_full = step_scores['target_lock_score'].values
-        try:
-            auroc_full = roc_auc_score(y_true, y_full)
-        except:
-            continue
-        
-        result = {'step': step, 'auroc_full': auroc_full}
-        
-        # Ablation for each signal
-        for signal in SIGNALS:
-            y_ablated = recompute_target_lock(step_scores, exclude_signal=signal).values
-            try:
-                auroc_ablated = roc_auc_score(y_true, y_ablated)
-                delta = auroc_full - auroc_ablated
-                result[f'{signal}_auroc'] = auroc_ablated
-                result[f'{signal}_delta'] = delta
-            except:
-                result[f'{signal}_auroc'] = np.nan
-                result[f'{signal}_delta'] = np.nan
-        
+    for k, d in enumerate(design):
+        # Baseline AUROC (all signals, published scores)
+        auroc_full = auroc_columns(d['y'], d['published'][:, None])[0]
+        result = {'step': d['step'], 'auroc_full': auroc_full}
+        for j, signal in enumerate(SIGNALS):
+            result[f'{signal}_auroc'] = ablated[k, j]
+            result[f'{signal}_delta'] = auroc_full - ablated[k, j]
         results.append(result)
     
     return pd.DataFrame(results)
 
+def sample_weight_simplex(n: int, seed: int = SEED) -> np.ndarray:
+    """n weight vectors uniform on the 4-signal simplex (Dirichlet(1, 1, 1, 1))."""
+    return np.random.default_rng(seed).dirichlet(np.ones(len(SIGNALS)), size=n)
+
+def weight_grid(step: float) -> np.ndarray:
+    """All weight vectors on the simplex with coordinates in multiples of `step`."""
+    k = int(round(1.0 / step))
+    pts = [c for c in itertools.product(range(k + 1), repeat=len(SIGNALS) - 1) if sum(c) <= k]
+    return np.array([list(c) + [k - sum(c)] for c in pts], dtype=float) / k
+
+def weight_sensitivity_sweep(
+    rules,
+    scores,
+    W: np.ndarray,
+    tolerance: float = 0.02,
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Per-step and mean AUROC for every weight vector plus the stability region around WEIGHTS.
+    
+    A weight vector is "stable" if its mean per-step AUROC is within `tolerance` of the published
+    weights' mean AUROC. The stable L1 radius is the distance from WEIGHTS to the nearest unstable
+    sampled vector (every sampled vector closer than that is stable).
+    """
+    design = [d for d in build_step_design(rules, scores) if len(np.unique(d['y'])) == 2]
+    w0 = ablation_weights(None)
+    aurocs = score_weight_matrix(design, np.vstack([w0[None, :], W]))
+    ref, grid = aurocs[:, 0], aurocs[:, 1:]
+    
+    mean_auroc = np.nanmean(grid, axis=0)
+    ref_mean = float(np.nanmean(ref))
+    stable = mean_auroc >= ref_mean - tolerance
+    l1 = np.abs(W - w0).sum(axis=1)
+    radius = float(l1[~stable].min()) if (~stable).any() else float(l1.max())
+    
+    sweep_df = pd.DataFrame(W, columns=[f'w_{sig}' for sig in SIGNALS])
+    sweep_df['l1_from_published'] = l1
+    sweep_df['mean_auroc'] = mean_auroc
+    sweep_df['stable'] = stable
+    for k, d in enumerate(design):
+        sweep_df[f'auroc_{d["step"]}'] = grid[k]
+    
+    best = int(np.nanargmax(mean_auroc))
+    summary = {
+        'n_weight_vectors': int(len(W)),
+        'tolerance': tolerance,
+        'published_weights': dict(zip(SIGNALS, w0.tolist())),
+        'published_mean_auroc': ref_mean,
+        'published_per_step_auroc': {d['step']: float(ref[k]) for k, d in enumerate(design)},
+        'published_percentile': float((mean_auroc <= ref_mean).mean() * 100),
+        'fraction_stable': float(stable.mean()),
+        'stable_l1_radius': radius,
+        'stable_weight_ranges': {
+            sig: [float(W[stable, j].min()), float(W[stable, j].max())] if stable.any() else [np.nan, np.nan]
+            for j, sig in enumerate(SIGNALS)
+        },
+        'best_weights': dict(zip(SIGNALS, W[best].tolist())),
+        'best_mean_auroc': float(mean_auroc[best]),
+        'mean_auroc_quantiles': {
+            q: float(np.nanpercentile(mean_auroc, q)) for q in (5, 25, 50, 75, 95)
+        },
+    }
+    return sweep_df, summary
+
 def plot_ablation_bars(results_df, output_path):
     """Plot ablation impact as grouped bar chart"""
     fig, ax = plt.subplots(figsize=(14, 8))
@@ -161,6 +224,12 @@ def plot_ablation_bars(results_df, output_path):
     print(f"✅ Saved ablation chart: {output_path}")
 
 def main():
+    ap = argparse.ArgumentParser(description="Ablation study + weight sensitivity sweep")
+    ap.add_argument("--n_weights", type=int, default=10000, help="Dirichlet samples of the weight simplex")
+    ap.add_argument("--grid_step", type=float, default=None, help="Use a regular simplex grid instead (e.g. 0.05)")
+    ap.add_argument("--tolerance", type=float, default=0.02, help="Mean-AUROC drop still counted as stable")
+    args = ap.parse_args()
+    
     print("=" * 80)
     print("🔥 TASK 5: ABLATION STUDY")
     print("=" * 80)
@@ -206,6 +275,21 @@ def main():
     output_path = OUTPUT_DIR / "figure2d_ablation.png"
     plot_ablation_bars(results_df, output_path)
     
+    # Weight sensitivity sweep
+    W = weight_grid(args.grid_step) if args.grid_step else sample_weight_simplex(args.n_weights)
+    sweep_df, summary = weight_sensitivity_sweep(rules, scores, W, tolerance=args.tolerance)
+    print(f"\n📊 Weight Sensitivity ({len(W):,} weight vectors, tolerance {args.tolerance}):")
+    print(f"   Published mean AUROC: {summary['published_mean_auroc']:.3f} "
+          f"(percentile {summary['published_percentile']:.1f} of sampled weights)")
+    print(f"   Stable fraction: {summary['fraction_stable']:.1%} | stable L1 radius: {summary['stable_l1_radius']:.3f}")
+    for sig, (lo, hi) in summary['stable_weight_ranges'].items():
+        print(f"   {sig:15s}: stable weights in [{lo:.2f}, {hi:.2f}]")
+    sweep_df.to_csv(DATA_DIR / "weight_sensitivity_sweep.csv", index=False)
+    with open(DATA_DIR / "weight_sensitivity_summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"✅ Saved sweep: {DATA_DIR / 'weight_sensitivity_sweep.csv'}")
+    print(f"✅ Saved summary: {DATA_DIR / 'weight_sensitivity_summary.json'}")
+    
     print("\n✅ TASK 5 COMPLETE: Ablation Study Done")
     print("=" * 80)
 
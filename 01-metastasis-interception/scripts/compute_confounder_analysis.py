@@ -14,33 +14,22 @@ Author: Zo
 Date: October 13, 2025
 """
 
-import json
-import os
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 from scipy import stats
 
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_data
+
 SEED = 42
 np.random.seed(SEED)
 
 OUTPUT_DIR = Path("publication/figures")
 DATA_DIR = Path("publication/data")
 
-def load_data():
-    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"))
-    if not rules_path.exists():
-        rules_path = Path("oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json")
-    with open(rules_path) as f:
-        rules = json.load(f)
-    
-    scores = pd.read_csv(DATA_DIR / "real_target_lock_data.csv")
-    if 'mission' in scores.columns:
-        scores = scores.rename(columns={'mission': 'step'})
-    
-    return rules, scores
-
 def simulate_gene_properties(genes):
     """Simulate gene properties (would be replaced with real data)"""
     np.random.seed(SEED)
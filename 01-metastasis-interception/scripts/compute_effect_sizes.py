@@ -9,13 +9,15 @@ Author: Zo
 Date: October 13, 2025
 """
 
-import json
-import os
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_data
+
 SEED = 42
 np.random.seed(SEED)
 
@@ -33,19 +35,6 @@ def cohens_d(group1, group2):
     
     return (np.mean(group1) - np.mean(group2)) / pooled_std
 
-def load_data():
-    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"))
-    if not rules_path.exists():
-        rules_path = Path("oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json")
-    with open(rules_path) as f:
-        rules = json.load(f)
-    
-    scores = pd.read_csv(DATA_DIR / "real_target_lock_data.csv")
-    if 'mission' in scores.columns:
-        scores = scores.rename(columns={'mission': 'step'})
-    
-    return rules, scores
-
 def compute_effect_sizes(rules, scores):
     """Compute Cohen's d for each step and signal"""
     results = []
@@ -53,17 +42,10 @@ def compute_effect_sizes(rules, scores):
     signals = ['functionality', 'essentiality', 'chromatin', 'regulatory', 'target_lock_score']
     
     for step in steps:
-        step_data = rules['steps'][step]
-        primary = set(step_data.get('primary_genes', []))
-        secondary = set(step_data.get('secondary_genes', []))
-        relevant = primary | secondary
-        
         step_scores = scores[scores['step'] == step].copy()
         if len(step_scores) == 0:
             continue
         
-        step_scores['is_relevant'] = step_scores['gene'].apply(lambda g: 1 if g in relevant else 0)
-        
         relevant_genes = step_scores[step_scores['is_relevant'] == 1]
         non_relevant_genes = step_scores[step_scores['is_relevant'] == 0]
         
@@ -33,12 +33,15 @@ import numpy as np
 import pandas as pd
 from pathlib import Path
 from sklearn.metrics import roc_auc_score, average_precision_score
-from sklearn.utils import resample
 from scipy import stats
 from typing import Dict, List, Tuple
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).parent))
+from bootstrap_engine import bootstrap_ci
+
 
 # Configuration
 BOOTSTRAP_ITERATIONS = 5000  # Increased from 1000 per reviewer feedback
@@ -202,38 +205,6 @@ def split_genes_stratified(rules: Dict, train_size: int = 28) -> Tuple[List[str]
     
     return train_genes, test_genes
 
-def bootstrap_metric(y_true: np.ndarray, y_pred: np.ndarray, metric_func, n_iterations: int = BOOTSTRAP_ITERATIONS) -> Tuple[float, float, float]:
-    """
-    Compute metric with bootstrap confidence intervals
-    
-    Returns: (mean, lower_ci, upper_ci)
-    """
-    n = len(y_true)
-    metrics = []
-    
-    for _ in range(n_iterations):
-        indices = resample(np.arange(n), random_state=SEED + len(metrics))
-        y_true_boot = y_true[indices]
-        y_pred_boot = y_pred[indices]
-        
-        try:
-            metric_val = metric_func(y_true_boot, y_pred_boot)
-            if not np.isnan(metric_val):
-                metrics.append(metric_val)
-        except:
-            continue
-    
-    if len(metrics) == 0:
-        return np.nan, np.nan, np.nan
-    
-    metrics = np.array(metrics)
-    mean_metric = np.mean(metrics)
-    alpha = 1 - CONFIDENCE_LEVEL
-    lower = np.percentile(metrics, 100 * alpha / 2)
-    upper = np.percentile(metrics, 100 * (1 - alpha / 2))
-    
-    return mean_metric, lower, upper
-
 def compute_validation_metrics(df: pd.DataFrame, labels_df: pd.DataFrame, genes: List[str], split_name: str) -> pd.DataFrame:
     """
     Compute AUROC/AUPRC for a given gene set
@@ -284,13 +255,12 @@ def compute_validation_metrics(df: pd.DataFrame, labels_df: pd.DataFrame, genes:
             auroc = roc_auc_score(step_labels, step_scores)
             auprc = average_precision_score(step_labels, step_scores)
             
-            # Bootstrap CIs
-            auroc_mean, auroc_lower, auroc_upper = bootstrap_metric(
-                step_labels, step_scores, roc_auc_score
-            )
-            auprc_mean, auprc_lower, auprc_upper = bootstrap_metric(
-                step_labels, step_scores, average_precision_score
+            # Stratified bootstrap CIs (shared, vectorized resamples)
+            ci = bootstrap_ci(
+                step_labels, step_scores, n_boot=BOOTSTRAP_ITERATIONS, seed=SEED, confidence=CONFIDENCE_LEVEL
             )
+            auroc_mean, auroc_lower, auroc_upper = ci['auroc']
+            auprc_mean, auprc_lower, auprc_upper = ci['auprc']
             
             # Fisher's exact test
             # For binary classification, we need a threshold
@@ -3,7 +3,7 @@
 Per-Step Validation Dominance Script
 
 Computes comprehensive validation metrics for metastasis Target-Lock scores:
-- Per-step AUROC/AUPRC with 1000-bootstrap CIs (seed=42)
+- Per-step AUROC/AUPRC with 1000-bootstrap stratified CIs (seed=42, bootstrap_engine.py)
 - Macro/micro-averaged PR curves
 - Calibration curves (reliability diagrams)
 - Effect sizes (Cohen's d) for signal differences
@@ -25,13 +25,16 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
-from sklearn.metrics import roc_auc_score, average_precision_score, roc_curve, precision_recall_curve
-from sklearn.utils import resample
+from sklearn.metrics import roc_auc_score, roc_curve, precision_recall_curve
 from scipy import stats
 from typing import Dict, List, Tuple
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).parent))
+from bootstrap_engine import bootstrap_ci
+
 # Set seed for reproducibility
 SEED = 42
 np.random.seed(SEED)
@@ -132,36 +135,6 @@ def load_target_lock_scores() -> pd.DataFrame:
     print(f"✅ Loaded Target-Lock scores: {len(df)} rows")
     return df
 
-def bootstrap_metric(y_true, y_score, metric_fn, n_iterations=1000, seed=42):
-    """Compute bootstrap CI for a metric"""
-    scores = []
-    rng = np.random.RandomState(seed)
-    
-    for i in range(n_iterations):
-        # Stratified bootstrap
-        indices = rng.choice(len(y_true), size=len(y_true), replace=True)
-        y_true_boot = y_true[indices]
-        y_score_boot = y_score[indices]
-        
-        # Skip if all one class
-        if len(np.unique(y_true_boot)) < 2:
-            continue
-        
-        try:
-            score = metric_fn(y_true_boot, y_score_boot)
-            scores.append(score)
-        except:
-            continue
-    
-    if len(scores) == 0:
-        return np.nan, np.nan, np.nan
-    
-    mean = np.mean(scores)
-    ci_lower = np.percentile(scores, (1 - CONFIDENCE_LEVEL) / 2 * 100)
-    ci_upper = np.percentile(scores, (1 + CONFIDENCE_LEVEL) / 2 * 100)
-    
-    return mean, ci_lower, ci_upper
-
 def compute_per_step_metrics(labels: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
     """Compute AUROC/AUPRC per step with bootstrap CIs"""
     results = []
@@ -188,15 +161,10 @@ def compute_per_step_metrics(labels: pd.DataFrame, scores: pd.DataFrame) -> pd.D
             print(f"   ⚠️  {step}: Only one class present")
             continue
         
-        # AUROC with bootstrap CI
-        auroc_mean, auroc_lower, auroc_upper = bootstrap_metric(
-            y_true, y_score, roc_auc_score, BOOTSTRAP_ITERATIONS, SEED
-        )
-        
-        # AUPRC with bootstrap CI
-        auprc_mean, auprc_lower, auprc_upper = bootstrap_metric(
-            y_true, y_score, average_precision_score, BOOTSTRAP_ITERATIONS, SEED
-        )
+        # AUROC/AUPRC with stratified bootstrap CIs (shared, vectorized resamples)
+        ci = bootstrap_ci(y_true, y_score, n_boot=BOOTSTRAP_ITERATIONS, seed=SEED, confidence=CONFIDENCE_LEVEL)
+        auroc_mean, auroc_lower, auroc_upper = ci['auroc']
+        auprc_mean, auprc_lower, auprc_upper = ci['auprc']
         
         # Precision@K
         k_values = [3, 5, 10]
@@ -11,33 +11,22 @@ Author: Zo
 Date: October 13, 2025
 """
 
-import json
-import os
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 from sklearn.metrics import precision_recall_curve
 
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_data
+
 SEED = 42
 np.random.seed(SEED)
 
 OUTPUT_DIR = Path("publication/figures")
 DATA_DIR = Path("publication/data")
 
-def load_data():
-    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"))
-    if not rules_path.exists():
-        rules_path = Path("oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json")
-    with open(rules_path) as f:
-        rules = json.load(f)
-    
-    scores = pd.read_csv(DATA_DIR / "real_target_lock_data.csv")
-    if 'mission' in scores.columns:
-        scores = scores.rename(columns={'mission': 'step'})
-    
-    return rules, scores
-
 def compute_precision_at_k(y_true, y_score, k):
     """Compute precision@K"""
     top_k_idx = np.argsort(y_score)[-k:]
@@ -51,26 +40,13 @@ def analyze_per_step_precision_at_k(rules, scores):
     steps = list(rules['steps'].keys())
     
     for step in steps:
-        # Get labels
-        all_genes = set()
-        for step_data in rules['steps'].values():
-            all_genes.update(step_data.get('primary_genes', []))
-            all_genes.update(step_data.get('secondary_genes', []))
-        
-        step_data = rules['steps'][step]
-        primary = set(step_data.get('primary_genes', []))
-        secondary = set(step_data.get('secondary_genes', []))
-        relevant = primary | secondary
-        
         # Get scores for this step
         step_scores = scores[scores['step'] == step].copy()
         if len(step_scores) == 0:
             continue
         
-        # Merge with labels
-        step_scores['label'] = step_scores['gene'].apply(lambda g: 1 if g in relevant else 0)
-        
-        y_true = step_scores['label'].values
+        # Labels precomputed by the shared dataset loader
+        y_true = step_scores['is_relevant'].values
         y_score = step_scores['target_lock_score'].values
         
         if len(y_true) < max(k_values):
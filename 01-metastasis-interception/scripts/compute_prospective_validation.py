@@ -10,7 +10,7 @@ Purpose:
 
 Strategy:
 - Use insights API endpoints (same approach as generate_target_lock_data_v2.py)
-- Fetch gene coordinates from Ensembl
+- Resolve gene coordinates from the shared gene-locus table (Ensembl for misses)
 - Call insights endpoints for functionality, essentiality, regulatory, chromatin
 - Compute Target-Lock scores using weights
 
@@ -21,6 +21,7 @@ Version: 2.0.0
 
 import json
 import asyncio
+import sys
 import httpx
 import pandas as pd
 import numpy as np
@@ -29,6 +30,9 @@ from typing import Dict, List, Tuple, Optional
 from scipy.stats import spearmanr
 from sklearn.metrics import roc_auc_score, average_precision_score
 
+sys.path.insert(0, str(Path(__file__).parent))
+from gene_locus_store import get_store
+
 # Configuration
 DATA_DIR = Path("publications/01-metastasis-interception/data")
 OUTPUT_DIR = DATA_DIR
@@ -88,42 +92,32 @@ def load_target_lock_scores() -> pd.DataFrame:
     print(f"✅ Loaded Target-Lock scores: {len(df)} rows (reference data)")
     return df
 
+async def resolve_gene_coords(genes: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Scoring coordinates for all genes at once from the shared gene-locus table: a synthetic A>G at
+    the locus start. Loci missing locally are fetched from Ensembl in one concurrent pass and
+    persisted (skipped when GENE_LOCUS_OFFLINE=1).
+    
+    Returns: {gene: {"chrom": str, "pos": int, "ref": str, "alt": str} or None}
+    """
+    loci = await get_store().resolve(genes)
+    return {
+        g: None if not loci.get(g) else {
+            "chrom": str(loci[g]["chrom"]),
+            "pos": int(loci[g]["start"]),
+            "ref": "A",  # Synthetic variant
+            "alt": "G"   # Synthetic variant
+        }
+        for g in genes
+    }
+
 def fetch_gene_coords(gene: str) -> Optional[Dict[str, str]]:
     """
-    Fetch gene coordinates from Ensembl API.
+    Get gene coordinates for one gene (see `resolve_gene_coords`; prefer it for gene lists).
     
     Returns: {"chrom": str, "pos": int, "ref": str, "alt": str} or None
     """
-    url = f"https://rest.ensembl.org/lookup/symbol/homo_sapiens/{gene}?expand=0"
-    headers = {"Content-Type": "application/json"}
-    
-    try:
-        # Use shorter timeout and simpler endpoint
-        response = httpx.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            chrom = data.get("seq_region_name", "")
-            start = data.get("start", 0)
-            
-            if not chrom or not start:
-                return None
-            
-            # Use canonical transcript start position
-            # For regulatory/chromatin, we'll use a representative position
-            # Use a synthetic variant at the start of the gene
-            return {
-                "chrom": str(chrom),
-                "pos": int(start),
-                "ref": "A",  # Synthetic variant
-                "alt": "G"   # Synthetic variant
-            }
-        return None
-    except httpx.TimeoutException:
-        print(f"  ⚠️  Timeout fetching coordinates for {gene}")
-        return None
-    except Exception as e:
-        print(f"  ⚠️  Error fetching coordinates for {gene}: {e}")
-        return None
+    return asyncio.run(resolve_gene_coords([gene]))[gene]
 
 async def fetch_insights(gene: str, coords: Optional[Dict[str, str]], api_base: str = API_BASE) -> Dict:
     """
@@ -517,11 +511,10 @@ async def main():
     print(f"  ✅ Reference data: {len(reference_df)} rows")
     print()
     
-    # Step 3: Fetch gene coordinates from Ensembl
-    print("🔬 Step 3: Fetching gene coordinates from Ensembl...")
+    # Step 3: Resolve gene coordinates (one batched lookup instead of a request per gene)
+    print("🔬 Step 3: Resolving gene coordinates (local gene-locus table, Ensembl for misses)...")
     gene_coords = {}
-    for gene in prospective_genes:
-        coords = fetch_gene_coords(gene)
+    for gene, coords in (await resolve_gene_coords(prospective_genes)).items():
         if coords:
             gene_coords[gene] = coords
             print(f"  ✅ {gene}: chr{coords['chrom']}:{coords['pos']}")
@@ -642,7 +635,6 @@ if __name__ == "__main__":
     import sys
     
     # Allow API_BASE to be set via command line or environment variable
-    global API_BASE
     if len(sys.argv) > 1:
         API_BASE = sys.argv[1]
         print(f"📡 Using API_BASE from command line: {API_BASE}")
@@ -28,10 +28,10 @@ from typing import Dict, List, Tuple, Optional
 from scipy.stats import spearmanr
 from sklearn.metrics import roc_auc_score, average_precision_score
 
-# Import coordinate cache
+# Import shared gene-locus table (seeded from gene_coordinates_cache.PROSPECTIVE_GENE_COORDS)
 import sys
 sys.path.insert(0, str(Path(__file__).parent))
-from gene_coordinates_cache import PROSPECTIVE_GENE_COORDS
+from gene_locus_store import get_store
 
 # Configuration
 DATA_DIR = Path("../data")
@@ -92,108 +92,112 @@ def load_target_lock_scores() -> pd.DataFrame:
     print(f"✅ Loaded Target-Lock scores: {len(df)} rows (reference data)")
     return df
 
+def _synthetic_variant(locus: Dict) -> Dict:
+    return {
+        "chrom": str(locus["chrom"]),
+        "pos": int(locus["start"]),
+        "ref": "A",  # Synthetic variant
+        "alt": "G"   # Synthetic variant
+    }
+
+async def resolve_gene_coords(genes: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Scoring coordinates for all genes at once from the shared gene-locus table.
+    
+    Curated anchors (seeded from `PROSPECTIVE_GENE_COORDS`) win; other genes use a synthetic A>G
+    at the locus start. Loci missing locally are fetched from Ensembl in one concurrent pass and
+    persisted (skipped when GENE_LOCUS_OFFLINE=1).
+    
+    Returns: {gene: {"chrom": str, "pos": int, "ref": str, "alt": str} or None}
+    """
+    store = get_store()
+    out: Dict[str, Optional[Dict]] = {g: store.anchor(g) for g in genes}
+    need = [g for g in genes if out[g] is None]
+    if need:
+        loci = await store.resolve(need)
+        for g in need:
+            out[g] = _synthetic_variant(loci[g]) if loci.get(g) else None
+    return out
+
 def fetch_gene_coords(gene: str) -> Optional[Dict[str, str]]:
     """
-    Get gene coordinates from cache (preferred) or Ensembl API (fallback).
+    Get gene coordinates for one gene (see `resolve_gene_coords`; prefer it for gene lists).
     
     Returns: {"chrom": str, "pos": int, "ref": str, "alt": str} or None
     """
-    # First, try cache
-    if gene in PROSPECTIVE_GENE_COORDS:
-        coords = PROSPECTIVE_GENE_COORDS[gene].copy()
-        # Ensure types are correct
-        coords["pos"] = int(coords["pos"])
-        return coords
-    
-    # Fallback to Ensembl API (with timeout handling)
-    url = f"https://rest.ensembl.org/lookup/symbol/homo_sapiens/{gene}?expand=0"
-    headers = {"Content-Type": "application/json"}
-    
+    return asyncio.run(resolve_gene_coords([gene]))[gene]
+
+# Distinct Evo2 requests per gene. The multi-window call is shared by all three Evo2 signals;
+# essentiality and functionality use different exon flanks, so those stay two separate calls.
+EVO2_MODEL_ID = "evo2_1b"
+EXON_FLANKS = {"essentiality": 4096, "functionality": 8192}
+MAX_IN_FLIGHT = int(os.getenv("EVO2_MAX_IN_FLIGHT", "16"))
+
+
+async def _post_evo2(client: httpx.AsyncClient, url: str, payload: Dict, gene: str) -> Optional[Dict]:
+    """POST one Evo2 request; returns the JSON body, or None on HTTP error / exception."""
+    route = url.rsplit("/", 1)[-1]
     try:
-        response = httpx.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            chrom = data.get("seq_region_name", "")
-            start = data.get("start", 0)
-            
-            if not chrom or not start:
-                return None
-            
-            return {
-                "chrom": str(chrom),
-                "pos": int(start),
-                "ref": "A",  # Synthetic variant
-                "alt": "G"   # Synthetic variant
-            }
-        return None
-    except httpx.TimeoutException:
-        print(f"  ⚠️  Timeout fetching coordinates for {gene} (using cache if available)")
-        # Return cached if available
-        if gene in PROSPECTIVE_GENE_COORDS:
-            return PROSPECTIVE_GENE_COORDS[gene].copy()
-        return None
+        r = await client.post(url, json=payload)
+        if r.status_code < 400:
+            return r.json() or {}
+        print(f"    ⚠️  Evo2 /{route} failed for {gene}: {r.status_code} - {r.text[:100]}")
     except Exception as e:
-        print(f"  ⚠️  Error fetching coordinates for {gene}: {e} (using cache if available)")
-        # Return cached if available
-        if gene in PROSPECTIVE_GENE_COORDS:
-            return PROSPECTIVE_GENE_COORDS[gene].copy()
+        print(f"    ⚠️  Evo2 /{route} exception for {gene}: {e}")
+    return None
+
+
+async def fetch_evo2_responses(
+    client: httpx.AsyncClient,
+    gene: str,
+    coords: Dict[str, str],
+    evo2_base: str,
+) -> Dict[str, Optional[Dict]]:
+    """
+    Issue each distinct Evo2 request for a gene once, concurrently, over the shared client.
+    
+    Returns: {"multi": ..., "exon_4096": ..., "exon_8192": ...} (None where a request failed)
+    """
+    base = {
+        "assembly": "GRCh38",
+        "chrom": coords["chrom"],
+        "pos": coords["pos"],
+        "ref": coords["ref"],
+        "alt": coords["alt"],
+        "model_id": EVO2_MODEL_ID
+    }
+    flanks = sorted(set(EXON_FLANKS.values()))
+    bodies = await asyncio.gather(
+        _post_evo2(client, f"{evo2_base}/score_variant_multi", base, gene),
+        *[_post_evo2(client, f"{evo2_base}/score_variant_exon", {**base, "flank": f}, gene) for f in flanks],
+    )
+    out = {"multi": bodies[0]}
+    out.update({f"exon_{f}": b for f, b in zip(flanks, bodies[1:])})
+    return out
+
+
+def _field(body: Optional[Dict], key: str) -> Optional[float]:
+    if body is None or body.get(key) is None:
         return None
+    try:
+        return float(body[key])
+    except (TypeError, ValueError):
+        return None
+
 
-async def compute_essentiality_from_evo2(gene: str, coords: Optional[Dict[str, str]], evo2_base: str) -> float:
+def compute_essentiality_from_evo2(evo2: Dict[str, Optional[Dict]]) -> float:
     """
-    Compute essentiality score using Evo2 service directly.
+    Essentiality score from shared Evo2 responses.
     
     Based on insights.py: predict_gene_essentiality logic.
     """
-    if not coords:
-        return 0.0
-    
     evo_mags = []
-    
-    try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            # score_variant_multi
-            try:
-                mreq = {
-                    "assembly": "GRCh38",
-                    "chrom": coords["chrom"],
-                    "pos": coords["pos"],
-                    "ref": coords["ref"],
-                    "alt": coords["alt"],
-                    "model_id": "evo2_1b"
-                }
-                mr = await client.post(f"{evo2_base}/score_variant_multi", json=mreq)
-                if mr.status_code < 400:
-                    md = (mr.json() or {}).get("min_delta")
-                    if md is not None:
-                        evo_mags.append(abs(float(md)))
-                else:
-                    print(f"    ⚠️  Evo2 /score_variant_multi failed for {gene}: {mr.status_code} - {mr.text[:100]}")
-            except Exception as e:
-                print(f"    ⚠️  Evo2 /score_variant_multi exception for {gene}: {e}")
-            
-            # score_variant_exon
-            try:
-                ereq = {
-                    "assembly": "GRCh38",
-                    "chrom": coords["chrom"],
-                    "pos": coords["pos"],
-                    "ref": coords["ref"],
-                    "alt": coords["alt"],
-                    "flank": 4096,
-                    "model_id": "evo2_1b"
-                }
-                er = await client.post(f"{evo2_base}/score_variant_exon", json=ereq)
-                if er.status_code < 400:
-                    ed = (er.json() or {}).get("exon_delta")
-                    if ed is not None:
-                        evo_mags.append(abs(float(ed)))
-                else:
-                    print(f"    ⚠️  Evo2 /score_variant_exon failed for {gene}: {er.status_code} - {er.text[:100]}")
-            except Exception as e:
-                print(f"    ⚠️  Evo2 /score_variant_exon exception for {gene}: {e}")
-    except Exception:
-        pass
+    md = _field(evo2.get("multi"), "min_delta")
+    if md is not None:
+        evo_mags.append(abs(md))
+    ed = _field(evo2.get(f"exon_{EXON_FLANKS['essentiality']}"), "exon_delta")
+    if ed is not None:
+        evo_mags.append(abs(ed))
     
     # Aggregate essentiality proxy (from insights.py logic)
     evo_magnitude = min(1.0, sum(evo_mags)) if evo_mags else 0.0
@@ -202,56 +206,14 @@ async def compute_essentiality_from_evo2(gene: str, coords: Optional[Dict[str, s
     
     return essentiality_score
 
-async def compute_functionality_from_evo2(gene: str, coords: Optional[Dict[str, str]], evo2_base: str) -> float:
+def compute_functionality_from_evo2(evo2: Dict[str, Optional[Dict]]) -> float:
     """
-    Compute functionality score using Evo2 service directly.
+    Functionality score from shared Evo2 responses (exon call with the larger flank for domain effects).
     
     Based on insights.py: predict_protein_functionality_change logic.
     """
-    if not coords:
-        return 0.55  # Default baseline from insights.py
-    
-    md_mag = 0.0
-    ed_mag = 0.0
-    
-    try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            # score_variant_multi
-            try:
-                mreq = {
-                    "assembly": "GRCh38",
-                    "chrom": coords["chrom"],
-                    "pos": coords["pos"],
-                    "ref": coords["ref"],
-                    "alt": coords["alt"],
-                    "model_id": "evo2_1b"
-                }
-                mr = await client.post(f"{evo2_base}/score_variant_multi", json=mreq)
-                if mr.status_code < 400:
-                    js = mr.json() or {}
-                    md_mag = abs(float(js.get("min_delta") or 0.0))
-            except Exception:
-                pass
-            
-            # score_variant_exon (with larger flank for domain effects)
-            try:
-                ereq = {
-                    "assembly": "GRCh38",
-                    "chrom": coords["chrom"],
-                    "pos": coords["pos"],
-                    "ref": coords["ref"],
-                    "alt": coords["alt"],
-                    "flank": 8192,
-                    "model_id": "evo2_1b"
-                }
-                er = await client.post(f"{evo2_base}/score_variant_exon", json=ereq)
-                if er.status_code < 400:
-                    js2 = er.json() or {}
-                    ed_mag = abs(float(js2.get("exon_delta") or 0.0))
-            except Exception:
-                pass
-    except Exception:
-        pass
+    md_mag = abs(_field(evo2.get("multi"), "min_delta") or 0.0)
+    ed_mag = abs(_field(evo2.get(f"exon_{EXON_FLANKS['functionality']}"), "exon_delta") or 0.0)
     
     # Combine magnitudes (from insights.py logic)
     combined_mag = max(md_mag, ed_mag * 0.8)
@@ -259,33 +221,13 @@ async def compute_functionality_from_evo2(gene: str, coords: Optional[Dict[str,
     
     return functionality_score
 
-async def compute_regulatory_from_evo2(gene: str, coords: Optional[Dict[str, str]], evo2_base: str) -> float:
+def compute_regulatory_from_evo2(evo2: Dict[str, Optional[Dict]]) -> float:
     """
-    Compute regulatory score using Evo2 service directly.
+    Regulatory score from the shared multi-window response.
     
     Based on insights.py: predict_splicing_regulatory logic.
     """
-    if not coords:
-        return 0.1  # Minimum from insights.py
-    
-    delta = 0.0
-    
-    try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            payload = {
-                "assembly": "GRCh38",
-                "chrom": coords["chrom"],
-                "pos": coords["pos"],
-                "ref": coords["ref"],
-                "alt": coords["alt"],
-                "model_id": "evo2_1b"
-            }
-            r = await client.post(f"{evo2_base}/score_variant_multi", json=payload)
-            if r.status_code < 400:
-                js = r.json() or {}
-                delta = float(js.get("min_delta") or 0.0)
-    except Exception:
-        delta = 0.0
+    delta = _field(evo2.get("multi"), "min_delta") or 0.0
     
     # Map absolute delta to [0,1] (from insights.py logic)
     mag = min(1.0, abs(delta) / 1.0)
@@ -293,7 +235,7 @@ async def compute_regulatory_from_evo2(gene: str, coords: Optional[Dict[str, str
     
     return score
 
-async def compute_chromatin_heuristic(gene: str, coords: Optional[Dict[str, str]]) -> float:
+def compute_chromatin_heuristic(gene: str, coords: Optional[Dict[str, str]]) -> float:
     """
     Compute chromatin accessibility score using heuristic.
     
@@ -304,18 +246,26 @@ async def compute_chromatin_heuristic(gene: str, coords: Optional[Dict[str, str]
     # In production, this would call Enformer service
     return 0.5  # Placeholder
 
-async def fetch_insights_direct_evo2(gene: str, coords: Optional[Dict[str, str]], evo2_base: str = EVO2_API_BASE) -> Dict:
+async def fetch_insights_direct_evo2(
+    gene: str,
+    coords: Optional[Dict[str, str]],
+    client: httpx.AsyncClient,
+    evo2_base: str = EVO2_API_BASE,
+) -> Dict:
     """
     Fetch all 4 insights for a gene using Evo2 service directly.
     
-    Implements the insights logic ourselves by calling Evo2 endpoints.
+    Each distinct Evo2 request is sent once (concurrently, over the shared pooled `client`);
+    all signals are derived from those shared responses.
     """
     results = {
         "gene": gene,
         "functionality": 0.0,
         "essentiality": 0.0,
         "chromatin": 0.0,
-        "regulatory": 0.0
+        "regulatory": 0.0,
+        "evo2_requests": 0,
+        "evo2_failed": 0,
     }
     
     if not coords:
@@ -333,11 +283,15 @@ async def fetch_insights_direct_evo2(gene: str, coords: Optional[Dict[str, str]]
         return results
     
     try:
+        evo2 = await fetch_evo2_responses(client, gene, coords, evo2_base)
+        results["evo2_requests"] = len(evo2)
+        results["evo2_failed"] = sum(body is None for body in evo2.values())
+        
         # Compute all 4 signals
-        results["functionality"] = await compute_functionality_from_evo2(gene, coords, evo2_base)
-        results["essentiality"] = await compute_essentiality_from_evo2(gene, coords, evo2_base)
-        results["regulatory"] = await compute_regulatory_from_evo2(gene, coords, evo2_base)
-        results["chromatin"] = await compute_chromatin_heuristic(gene, coords)
+        results["functionality"] = compute_functionality_from_evo2(evo2)
+        results["essentiality"] = compute_essentiality_from_evo2(evo2)
+        results["regulatory"] = compute_regulatory_from_evo2(evo2)
+        results["chromatin"] = compute_chromatin_heuristic(gene, coords)
         
         # Calculate target lock score
         results["target_lock_score"] = (
@@ -481,6 +435,7 @@ def generate_validation_report(
 |--------|-------|
 | **Prospective genes** | {metrics['n_genes']} |
 | **Data points (genes × steps)** | {metrics['n_data_points']} |
+| **Failed Evo2 requests (defaults used)** | {metrics.get('n_evo2_requests_failed', 0)}/{metrics.get('n_evo2_requests', 0)} |
 | **AUROC** | {auroc_str} |
 | **AUPRC** | {auprc_str} |
 | **Precision@3** | {prec3_str} |
@@ -572,10 +527,9 @@ async def main():
     print()
     
     # Step 3: Fetch gene coordinates from Ensembl
-    print("🔬 Step 3: Fetching gene coordinates from Ensembl...")
+    print("🔬 Step 3: Resolving gene coordinates (local gene-locus table, Ensembl for misses)...")
     gene_coords = {}
-    for gene in prospective_genes:
-        coords = fetch_gene_coords(gene)
+    for gene, coords in (await resolve_gene_coords(prospective_genes)).items():
         if coords:
             gene_coords[gene] = coords
             print(f"  ✅ {gene}: chr{coords['chrom']}:{coords['pos']}")
@@ -591,15 +545,22 @@ async def main():
     
     # Fetch insights for each gene (once, then expand to all steps)
     print(f"🚀 Fetching insights for {len(prospective_genes)} genes...")
-    tasks = []
-    for gene in prospective_genes:
-        coords = gene_coords.get(gene)
-        tasks.append(fetch_insights_direct_evo2(gene, coords, EVO2_API_BASE))
-    
-    gene_insights = await asyncio.gather(*tasks)
+    # One pooled client for every gene; the connection limit bounds in-flight requests, so requests
+    # queued for a connection wait without a pool timeout (TIMEOUT applies once a request is sent)
+    limits = httpx.Limits(max_connections=MAX_IN_FLIGHT, max_keepalive_connections=MAX_IN_FLIGHT)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT, pool=None), limits=limits) as client:
+        gene_insights = await asyncio.gather(*[
+            fetch_insights_direct_evo2(gene, gene_coords.get(gene), client, EVO2_API_BASE)
+            for gene in prospective_genes
+        ])
     insights_map = {g["gene"]: g for g in gene_insights}
+    n_evo2_requests = sum(g["evo2_requests"] for g in gene_insights)
+    n_evo2_failed = sum(g["evo2_failed"] for g in gene_insights)
     
     print(f"  ✅ Fetched insights for {len(gene_insights)} genes")
+    if n_evo2_failed:
+        failed_genes = [g["gene"] for g in gene_insights if g["evo2_failed"]]
+        print(f"  ⚠️  {n_evo2_failed}/{n_evo2_requests} Evo2 requests failed (defaults used) for: {', '.join(failed_genes)}")
     print()
     
     # Expand to all steps (same insights for each step)
@@ -647,6 +608,8 @@ async def main():
     # Step 6: Compute validation metrics
     print("📊 Step 6: Computing validation metrics...")
     metrics = compute_prospective_metrics(scores_df, labels_df)
+    metrics["n_evo2_requests"] = int(n_evo2_requests)
+    metrics["n_evo2_requests_failed"] = int(n_evo2_failed)
     print(f"  ✅ Metrics computed")
     if not np.isnan(metrics['auroc']):
         print(f"     AUROC: {metrics['auroc']:.3f}")
@@ -12,8 +12,7 @@ Author: Zo
 Date: October 13, 2025
 """
 
-import json
-import os
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -21,28 +20,15 @@ import seaborn as sns
 from pathlib import Path
 from scipy import stats
 
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_data
+
 SEED = 42
 np.random.seed(SEED)
 
 OUTPUT_DIR = Path("publication/figures")
 DATA_DIR = Path("publication/data")
 
-def load_data():
-    """Load labels and scores"""
-    # Load ground truth
-    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"))
-    if not rules_path.exists():
-        rules_path = Path("oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json")
-    with open(rules_path) as f:
-        rules = json.load(f)
-    
-    # Load scores
-    scores = pd.read_csv(DATA_DIR / "real_target_lock_data.csv")
-    if 'mission' in scores.columns:
-        scores = scores.rename(columns={'mission': 'step'})
-    
-    return rules, scores
-
 def build_confusion_matrix(rules, scores):
     """Build confusion matrix: predicted step (max score) vs true step labels"""
     
@@ -26,6 +26,18 @@ import os
 
 # Add paths for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "oncology-coPilot" / "oncology-backend-minimal"))
+sys.path.insert(0, str(Path(__file__).parent))
+from gene_locus_store import get_store
+from reference_genome import IndexedFasta, open_reference
+
+# guide_interpreter is in src/tools/ (imported once, not per guide)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+try:
+    from tools.guide_interpreter import locate_guide_in_gene
+    GUIDE_INTERPRETER_ERROR = None
+except ImportError as e:
+    locate_guide_in_gene = None
+    GUIDE_INTERPRETER_ERROR = e
 
 # Configuration
 DOENCH_CSV = Path("publications/01-metastasis-interception/data/doench_2016_raw.csv")
@@ -35,28 +47,42 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 # Evo2 service URL (from existing architecture)
 EVO2_API_BASE = os.getenv("EVO2_API_BASE", "http://127.0.0.1:8000")
 
+# Local GRCh38 FASTA (indexed, memory-mapped) for guide context; falls back to Ensembl REST if unset
+REFERENCE_FASTA = os.getenv("REFERENCE_FASTA")
+# Guides scored per run (0 = whole dataset) and guides in flight at once
+MAX_GUIDES = int(os.getenv("DOENCH_MAX_GUIDES", "20"))
+MAX_CONCURRENCY = int(os.getenv("DOENCH_MAX_CONCURRENCY", "16"))
+ENSEMBL_MAX_CONCURRENCY = 4  # Ensembl REST allows ~15 req/s
+
+async def resolve_gene_coordinates(gene_symbols: List[str]) -> Dict[str, Optional[Dict]]:
+    """Gene loci for all symbols from the shared gene-locus table (one concurrent Ensembl pass for misses)."""
+    loci = await get_store().resolve(gene_symbols)
+    return {
+        g: None if rec is None else {
+            "chrom": rec["chrom"],
+            "start": rec["start"],
+            "end": rec["end"],
+            "strand": rec["strand"]
+        }
+        for g, rec in loci.items()
+    }
+
 async def fetch_gene_coordinates(gene_symbol: str) -> Optional[Dict]:
-    """Fetch gene coordinates from Ensembl API."""
-    url = f"https://rest.ensembl.org/lookup/symbol/homo_sapiens/{gene_symbol}"
-    params = {"expand": "1", "content-type": "application/json"}
-    
+    """Fetch gene coordinates (local gene-locus table, Ensembl on a miss)."""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.get(url, params=params)
-            if r.status_code == 200:
-                data = r.json()
-                return {
-                    "chrom": data.get("seq_region_name"),
-                    "start": data.get("start"),
-                    "end": data.get("end"),
-                    "strand": data.get("strand")
-                }
+        return (await resolve_gene_coordinates([gene_symbol]))[gene_symbol]
     except Exception as e:
         print(f"⚠️  Failed to fetch coordinates for {gene_symbol}: {e}")
     return None
 
-async def fetch_ensembl_context(chrom: str, pos: int, window_size: int = 150, assembly: str = "GRCh38") -> Optional[str]:
-    """Fetch ±window_size bp context from Ensembl."""
+async def fetch_ensembl_context(
+    chrom: str,
+    pos: int,
+    window_size: int = 150,
+    assembly: str = "GRCh38",
+    client: Optional[httpx.AsyncClient] = None,
+) -> Optional[str]:
+    """Fetch ±window_size bp context from Ensembl (over `client` if given)."""
     asm = "GRCh38" if assembly.lower() in ("grch38", "hg38") else "GRCh37"
     start = max(1, pos - window_size)
     end = pos + window_size
@@ -64,14 +90,33 @@ async def fetch_ensembl_context(chrom: str, pos: int, window_size: int = 150, as
     url = f"https://rest.ensembl.org/sequence/region/human/{region}?content-type=text/plain;coord_system_version={asm}"
     
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            r = await client.get(url)
-            if r.status_code == 200:
-                return (r.text or "").strip().upper()
+        if client is None:
+            async with httpx.AsyncClient(timeout=20.0) as c:
+                r = await c.get(url)
+        else:
+            r = await client.get(url, timeout=20.0)
+        if r.status_code == 200:
+            return (r.text or "").strip().upper()
     except Exception as e:
         print(f"⚠️  Failed to fetch context for {chrom}:{pos}: {e}")
     return None
 
+async def fetch_context(
+    chrom: str,
+    pos: int,
+    window_size: int,
+    genome: Optional[IndexedFasta] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Optional[str]:
+    """±window_size bp context: local indexed FASTA when available, else Ensembl REST."""
+    if genome is not None:
+        try:
+            return genome.window(chrom, pos, window_size)
+        except KeyError as e:
+            print(f"⚠️  {e}")
+            return None
+    return await fetch_ensembl_context(chrom=chrom, pos=pos, window_size=window_size, client=client)
+
 
 def compute_gc_efficacy(guide_seq: str) -> float:
     """GC-based baseline heuristic."""
@@ -79,10 +124,19 @@ def compute_gc_efficacy(guide_seq: str) -> float:
     homopolymer_penalty = 0.1 if any(h in guide_seq for h in ["AAAA", "TTTT", "CCCC", "GGGG"]) else 0.0
     return max(0.0, min(1.0, 0.75 - abs(gc - 0.5) - homopolymer_penalty))
 
-async def process_guide(row: pd.Series, gene_coords_cache: Dict, gene_location_cache: Dict) -> Optional[Dict]:
+async def process_guide(
+    row: pd.Series,
+    gene_coords_cache: Dict,
+    gene_location_cache: Dict,
+    client: Optional[httpx.AsyncClient] = None,
+    genome: Optional[IndexedFasta] = None,
+) -> Optional[Dict]:
     """
     Process a single guide: map to coordinates, score with Evo2.
     
+    `client` is the shared pooled HTTP client (Evo2 + Ensembl fallback); `genome` serves context
+    windows locally when a reference FASTA is configured.
+    
     ARCHITECTURE FIXES:
     1. Uses locate_guide_in_gene() for guide→gene position mapping
     2. Converts gene-relative position → genomic coordinate
@@ -100,32 +154,27 @@ async def process_guide(row: pd.Series, gene_coords_cache: Dict, gene_location_c
     # Step 1: Locate guide within gene sequence (using existing code)
     cache_key = f"{gene_symbol}:{guide_23bp}"
     if cache_key not in gene_location_cache:
+        if locate_guide_in_gene is None:
+            print(f"⚠️  Cannot locate guide {guide_23bp} in {gene_symbol}: {GUIDE_INTERPRETER_ERROR}")
+            return None
         try:
-            # Fix import path - guide_interpreter is in src/tools/
-            import sys
-            from pathlib import Path
-            src_path = Path(__file__).parent.parent.parent / "src"
-            if str(src_path) not in sys.path:
-                sys.path.insert(0, str(src_path))
-            from tools.guide_interpreter import locate_guide_in_gene
             location = locate_guide_in_gene(guide_23bp, gene_symbol)
             if not location:
                 return None  # Guide not found in gene
             gene_location_cache[cache_key] = location
-        except (ImportError, Exception) as e:
+        except Exception as e:
             print(f"⚠️  Cannot locate guide {guide_23bp} in {gene_symbol}: {e}")
             return None
     else:
         location = gene_location_cache[cache_key]
     
     # Step 2: Get gene coordinates (cached)
+    # (unresolved genes are cached as None so they are not re-fetched once per guide)
     if gene_symbol not in gene_coords_cache:
-        coords = await fetch_gene_coordinates(gene_symbol)
-        if not coords:
-            return None
-        gene_coords_cache[gene_symbol] = coords
-    else:
-        coords = gene_coords_cache[gene_symbol]
+        gene_coords_cache[gene_symbol] = await fetch_gene_coordinates(gene_symbol)
+    coords = gene_coords_cache[gene_symbol]
+    if not coords:
+        return None
     
     # Step 3: Convert gene-relative position → genomic coordinate
     # location['nucleotide_position'] is relative to gene start
@@ -142,10 +191,12 @@ async def process_guide(row: pd.Series, gene_coords_cache: Dict, gene_location_c
     
     # Step 4: Fetch larger context for Evo2 (4096bp window, not 150bp)
     window_size = 4096  # Evo2Scorer uses [4096, 8192, 16384, 25000]
-    context = await fetch_ensembl_context(
+    context = await fetch_context(
         chrom=coords['chrom'],
         pos=genomic_pos,
-        window_size=window_size
+        window_size=window_size,
+        genome=genome,
+        client=client
     )
     
     if not context or len(context) < 100:
@@ -159,17 +210,20 @@ async def process_guide(row: pd.Series, gene_coords_cache: Dict, gene_location_c
     evo_delta = None
     
     try:
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            payload = {
-                "model_id": "evo2_1b",
-                "sequence": context
-            }
+        payload = {
+            "model_id": "evo2_1b",
+            "sequence": context
+        }
+        if client is None:
+            async with httpx.AsyncClient(timeout=180.0) as c:
+                r = await c.post(evo_url, json=payload)
+        else:
             r = await client.post(evo_url, json=payload)
-            if r.status_code == 200:
-                result = r.json()
-                likelihood = result.get("likelihood", result.get("score", 0.0))
-                # Use negative likelihood as proxy for disruption (matching existing endpoint)
-                evo_delta = -abs(likelihood) if likelihood else None
+        if r.status_code == 200:
+            result = r.json()
+            likelihood = result.get("likelihood", result.get("score", 0.0))
+            # Use negative likelihood as proxy for disruption (matching existing endpoint)
+            evo_delta = -abs(likelihood) if likelihood else None
     except Exception as e:
         print(f"⚠️  Evo2 scoring failed: {e}")
     
@@ -188,7 +242,7 @@ async def process_guide(row: pd.Series, gene_coords_cache: Dict, gene_location_c
         "guide_23bp": guide_23bp,
         "gene": gene_symbol,
         "activity_score": activity_score,
-        "evo2_delta": evo2_delta,
+        "evo2_delta": evo_delta,
         "evo2_efficacy": efficacy,
         "gc_efficacy": gc_efficacy,
         "chrom": coords['chrom'],
@@ -212,23 +266,50 @@ async def main():
     df = df[df['guide_23bp'].str.match(r'^[ACGT]{23}$', na=False)]
     print(f"  ✅ Valid 23bp guides: {len(df):,}")
     
-    # Sample for testing (first 20 guides to verify it works)
-    df_sample = df.head(20).copy()
-    print(f"\n🧪 Processing test sample: {len(df_sample)} guides (will expand to full dataset after verification)")
+    # Sample for testing (first DOENCH_MAX_GUIDES guides; 0 = full dataset)
+    df_sample = (df.head(MAX_GUIDES) if MAX_GUIDES > 0 else df).copy()
+    print(f"\n🧪 Processing {len(df_sample)} guides (DOENCH_MAX_GUIDES={MAX_GUIDES}; 0 = full dataset)")
+    
+    if locate_guide_in_gene is None:
+        raise SystemExit(f"❌ tools.guide_interpreter is not importable: {GUIDE_INTERPRETER_ERROR}")
+    
+    genome = open_reference(REFERENCE_FASTA)
+    if genome is not None:
+        print(f"  ✅ Context from local reference: {genome.path} ({len(genome.index)} sequences)")
+    else:
+        print("  ⚠️  REFERENCE_FASTA not set: fetching context from Ensembl REST (slow)")
     
     # Process guides (with caching to prevent credit burn)
     gene_coords_cache = {}
     gene_location_cache = {}
     results = []
     
-    print(f"\n🔄 Processing guides (with caching to prevent credit burn)...")
-    for idx, row in df_sample.iterrows():
-        result = await process_guide(row, gene_coords_cache, gene_location_cache)
-        if result:
-            results.append(result)
-        if (idx + 1) % 10 == 0:
-            print(f"  Processed {idx + 1}/{len(df_sample)}... (cached: {len(gene_coords_cache)} genes, {len(gene_location_cache)} locations)")
-        await asyncio.sleep(0.2)  # Rate limiting for Ensembl API
+    # Resolve all target-gene loci up front (local table; misses fetched concurrently and persisted)
+    genes = sorted(df_sample['Target gene'].astype(str).unique())
+    gene_coords_cache.update(await resolve_gene_coordinates(genes))
+    n_resolved = sum(1 for c in gene_coords_cache.values() if c)
+    print(f"  ✅ Resolved loci for {n_resolved}/{len(genes)} genes")
+    
+    print(f"\n🔄 Processing guides concurrently (with caching to prevent credit burn)...")
+    n_in_flight = MAX_CONCURRENCY if genome is not None else min(MAX_CONCURRENCY, ENSEMBL_MAX_CONCURRENCY)
+    sem = asyncio.Semaphore(n_in_flight)
+    n_done = 0
+    
+    async def _one(row: pd.Series) -> Optional[Dict]:
+        nonlocal n_done
+        async with sem:
+            result = await process_guide(row, gene_coords_cache, gene_location_cache, client=client, genome=genome)
+        n_done += 1
+        if n_done % 10 == 0 or n_done == len(df_sample):
+            print(f"  Processed {n_done}/{len(df_sample)}... (cached: {len(gene_coords_cache)} genes, {len(gene_location_cache)} locations)")
+        return result
+    
+    # One pooled client for every Evo2 (and fallback Ensembl) request
+    limits = httpx.Limits(max_connections=n_in_flight, max_keepalive_connections=n_in_flight)
+    async with httpx.AsyncClient(timeout=180.0, limits=limits) as client:
+        results = [r for r in await asyncio.gather(*[_one(row) for _, row in df_sample.iterrows()]) if r]
+    if genome is not None:
+        genome.close()
     
     # Convert to DataFrame
     results_df = pd.DataFrame(results)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Persistent GRCh38 gene-locus table shared by the metastasis scripts.
+
+Why this exists:
+- `compute_prospective_validation_direct_evo2.fetch_gene_coords`, `doench_2016_clinical_validation.fetch_gene_coordinates`
+  and `update_target_lock_chromatin_enformer._ensembl_lookup_gene` each did their own uncached, one-gene-at-a-time
+  Ensembl lookups, so the coordinate stage needed the network and ran serially.
+
+Design:
+- One SQLite file (stdlib only), two tables:
+  - `loci`    symbol → chrom/start/end/strand/gene_id (Ensembl REST lookups or an offline GTF import)
+  - `anchors` symbol → curated scoring variant (chrom/pos/ref/alt), seeded from `PROSPECTIVE_GENE_COORDS`
+- Lookups are local primary-key reads. Misses are resolved with Ensembl's batch symbol lookup
+  (POST, ≤1000 symbols per request, chunks in parallel), retried via aliases, and persisted.
+- Offline: set GENE_LOCUS_OFFLINE=1 (or pass fetch=False) and only the local table is used.
+
+Usage:
+    python3 gene_locus_store.py --import-gtf Homo_sapiens.GRCh38.110.gtf.gz   # offline seed (one-time)
+    python3 gene_locus_store.py --fetch RET KDR ESR1                           # resolve + persist
+
+    from gene_locus_store import get_store
+    loci = await get_store().resolve(["RET", "KDR"])   # {"RET": {"chrom": "10", "start": ..., ...}, ...}
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import httpx
+
+DEFAULT_DB = Path(os.getenv(
+    "GENE_LOCUS_DB",
+    str(Path(__file__).resolve().parent.parent / "data" / "gene_loci_grch38.sqlite"),
+))
+ENSEMBL_LOOKUP_URL = "https://rest.ensembl.org/lookup/symbol/homo_sapiens"
+ENSEMBL_BATCH_SIZE = 1000  # Ensembl POST lookup limit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS loci (
+    symbol          TEXT PRIMARY KEY,
+    chrom           TEXT NOT NULL,
+    start           INTEGER NOT NULL,
+    end             INTEGER NOT NULL,
+    strand          INTEGER NOT NULL,
+    gene_id         TEXT,
+    resolved_symbol TEXT,
+    source          TEXT NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS anchors (
+    symbol     TEXT PRIMARY KEY,
+    chrom      TEXT NOT NULL,
+    pos        INTEGER NOT NULL,
+    ref        TEXT NOT NULL,
+    alt        TEXT NOT NULL,
+    source     TEXT NOT NULL
+);
+"""
+
+_LOCUS_COLS = ("symbol", "chrom", "start", "end", "strand", "gene_id", "resolved_symbol", "source")
+
+
+def _norm_chrom(chrom) -> str:
+    c = str(chrom)
+    return c[3:] if c.lower().startswith("chr") else c
+
+
+def _offline() -> bool:
+    return os.getenv("GENE_LOCUS_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+class GeneLocusStore:
+    """SQLite-backed symbol → locus table with concurrent Ensembl fetch-and-persist for misses."""
+
+    def __init__(self, path: Path = DEFAULT_DB, *, seed_anchors: bool = True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        if seed_anchors:
+            self._seed_prospective_anchors()
+
+    def _seed_prospective_anchors(self) -> None:
+        try:
+            from gene_coordinates_cache import PROSPECTIVE_GENE_COORDS
+        except ImportError:
+            return
+        rows = [
+            (g.upper(), _norm_chrom(c["chrom"]), int(c["pos"]), str(c["ref"]), str(c["alt"]), "gene_coordinates_cache")
+            for g, c in PROSPECTIVE_GENE_COORDS.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO anchors VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    # ---- local reads ----
+    def locus(self, symbol: str) -> Optional[Dict]:
+        return self.loci([symbol]).get(symbol)
+
+    def loci(self, symbols: Iterable[str]) -> Dict[str, Dict]:
+        """Locally known loci for `symbols` (keys are the symbols as passed in)."""
+        want: Dict[str, List[str]] = {}
+        for s in symbols:
+            spellings = want.setdefault(str(s).upper(), [])
+            if s not in spellings:
+                spellings.append(s)
+        if not want:
+            return {}
+        out: Dict[str, Dict] = {}
+        keys = list(want)
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                cur = self._conn.execute(
+                    f"SELECT {', '.join(_LOCUS_COLS)} FROM loci WHERE symbol IN ({','.join('?' * len(chunk))})", chunk
+                )
+                for row in cur.fetchall():
+                    for s in want[row[0]]:
+                        out[s] = dict(zip(_LOCUS_COLS, row))
+        return out
+
+    def anchor(self, symbol: str) -> Optional[Dict]:
+        """Curated scoring variant {"chrom", "pos", "ref", "alt"} for a gene, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chrom, pos, ref, alt FROM anchors WHERE symbol = ?", (str(symbol).upper(),)
+            ).fetchone()
+        return None if row is None else {"chrom": row[0], "pos": int(row[1]), "ref": row[2], "alt": row[3]}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM loci").fetchone()[0])
+
+    # ---- writes ----
+    def put_loci(self, records: Iterable[Mapping], source: str) -> int:
+        now = time.time()
+        rows = [
+            (
+                str(r["symbol"]).upper(), _norm_chrom(r["chrom"]), int(r["start"]), int(r["end"]),
+                int(r.get("strand") or 1), r.get("gene_id"), r.get("resolved_symbol"), source, now,
+            )
+            for r in records
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO loci VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def import_gtf(self, gtf_path: str) -> int:
+        """Load every `gene` feature (gene_name → locus) from an Ensembl/GENCODE GTF (.gtf or .gtf.gz).
+
+        The first record per symbol wins (primary assembly chromosomes precede patches/PAR copies
+        in Ensembl GTFs).
+        """
+        opener = gzip.open if str(gtf_path).endswith(".gz") else open
+        recs: Dict[str, Dict] = {}
+        with opener(gtf_path, "rt") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) < 9 or parts[2] != "gene":
+                    continue
+                attrs = {}
+                for kv in parts[8].split(";"):
+                    kv = kv.strip()
+                    if " " in kv:
+                        k, v = kv.split(" ", 1)
+                        attrs[k] = v.strip('"')
+                name = attrs.get("gene_name")
+                if not name or name.upper() in recs:
+                    continue
+                recs[name.upper()] = {
+                    "symbol": name,
+                    "chrom": parts[0],
+                    "start": int(parts[3]),
+                    "end": int(parts[4]),
+                    "strand": 1 if parts[6] == "+" else -1,
+                    "gene_id": (attrs.get("gene_id") or "").split(".")[0] or None,
+                }
+        return self.put_loci(recs.values(), source=f"gtf:{Path(gtf_path).name}")
+
+    # ---- fetch-and-persist ----
+    async def _fetch_chunk(self, client: httpx.AsyncClient, symbols: List[str], retries: int = 3) -> Dict[str, Dict]:
+        for attempt in range(retries + 1):
+            try:
+                r = await client.post(
+                    ENSEMBL_LOOKUP_URL,
+                    json={"symbols": symbols},
+                    headers={"Content-Type": "application/json", "Accept": "application/json"},
+                )
+                if r.status_code == 429 or r.status_code >= 500:
+                    raise httpx.HTTPStatusError(f"Ensembl {r.status_code}", request=r.request, response=r)
+                r.raise_for_status()
+                data = r.json() or {}
+                return {k: v for k, v in data.items() if isinstance(v, dict) and v.get("seq_region_name")}
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if attempt >= retries:
+                    print(f"  ⚠️  Ensembl lookup failed for {len(symbols)} symbols: {e}")
+                    return {}
+                retry_after = e.response.headers.get("Retry-After") if isinstance(e, httpx.HTTPStatusError) else None
+                await asyncio.sleep(float(retry_after) if retry_after else 1.0 * (2 ** attempt))
+        return {}
+
+    async def _fetch(self, symbols: List[str], client: Optional[httpx.AsyncClient]) -> Dict[str, Dict]:
+        chunks = [symbols[i:i + ENSEMBL_BATCH_SIZE] for i in range(0, len(symbols), ENSEMBL_BATCH_SIZE)]
+
+        async def _run(c: httpx.AsyncClient) -> Dict[str, Dict]:
+            found: Dict[str, Dict] = {}
+            for part in await asyncio.gather(*[self._fetch_chunk(c, ch) for ch in chunks]):
+                found.update(part)
+            return found
+
+        if client is not None:
+            return await _run(client)
+        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as c:
+            return await _run(c)
+
+    async def resolve(
+        self,
+        symbols: Iterable[str],
+        *,
+        fetch: Optional[bool] = None,
+        aliases: Optional[Mapping[str, str]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> Dict[str, Optional[Dict]]:
+        """Loci for `symbols`: local table first, then one concurrent Ensembl pass for misses (persisted).
+
+        `aliases` maps publication names to Ensembl symbols (e.g. VEGFR2 → KDR); a miss is retried under
+        its alias and stored under the requested name. Unresolved symbols map to None.
+        """
+        symbols = list(dict.fromkeys(str(s) for s in symbols))
+        aliases = {str(k).upper(): str(v) for k, v in (aliases or {}).items()}
+        out: Dict[str, Optional[Dict]] = {s: None for s in symbols}
+        out.update(self.loci(symbols))
+        local_alias = self.loci(aliases[s.upper()] for s in symbols if out[s] is None and s.upper() in aliases)
+        for s in symbols:
+            if out[s] is None and aliases.get(s.upper()) in local_alias:
+                out[s] = dict(local_alias[aliases[s.upper()]], symbol=s.upper(), resolved_symbol=aliases[s.upper()])
+
+        missing = [s for s in symbols if out[s] is None]
+        if missing and (fetch if fetch is not None else not _offline()):
+            query = list(dict.fromkeys([s.upper() for s in missing] + [aliases[s.upper()].upper() for s in missing if s.upper() in aliases]))
+            found = {k.upper(): v for k, v in (await self._fetch(query, client)).items()}
+            new = []
+            for s in missing:
+                alias = aliases.get(s.upper())
+                js = found.get(s.upper())
+                resolved = s
+                if js is None and alias:
+                    js, resolved = found.get(alias.upper()), alias
+                if js is None:
+                    continue
+                new.append({
+                    "symbol": s,
+                    "chrom": js["seq_region_name"],
+                    "start": js["start"],
+                    "end": js["end"],
+                    "strand": js.get("strand", 1),
+                    "gene_id": js.get("id"),
+                    "resolved_symbol": js.get("display_name") or resolved,
+                })
+            if new:
+                self.put_loci(new, source="ensembl_rest")
+                out.update(self.loci([r["symbol"] for r in new]))
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "GeneLocusStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_STORE: Optional[GeneLocusStore] = None
+
+
+def get_store() -> GeneLocusStore:
+    """Process-wide store at DEFAULT_DB (opened on first use)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = GeneLocusStore(DEFAULT_DB)
+    return _STORE
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build / query the local gene-locus table")
+    ap.add_argument("--db", type=Path, default=DEFAULT_DB)
+    ap.add_argument("--import-gtf", dest="gtf", type=str, default=None, help="Ensembl/GENCODE GTF (.gtf or .gtf.gz)")
+    ap.add_argument("--fetch", nargs="*", default=[], help="Resolve these symbols (Ensembl for misses) and persist")
+    args = ap.parse_args()
+
+    with GeneLocusStore(args.db) as store:
+        if args.gtf:
+            n = store.import_gtf(args.gtf)
+            print(f"✅ Imported {n} gene loci from {args.gtf}")
+        if args.fetch:
+            loci = asyncio.run(store.resolve(args.fetch))
+            for g, rec in loci.items():
+                print(f"  {g:10s}: " + (f"chr{rec['chrom']}:{rec['start']:,}-{rec['end']:,} ({rec['source']})" if rec else "unresolved"))
+        print(f"📁 {args.db}: {len(store)} loci")
+
+
+if __name__ == "__main__":
+    main()
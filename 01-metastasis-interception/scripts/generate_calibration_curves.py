@@ -9,33 +9,21 @@ Author: Zo
 Date: October 13, 2025
 """
 
-import json
-import os
+import sys
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 from sklearn.calibration import calibration_curve
 
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_data
+
 SEED = 42
 np.random.seed(SEED)
 
 OUTPUT_DIR = Path("publication/figures")
 DATA_DIR = Path("publication/data")
 
-def load_data():
-    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"))
-    if not rules_path.exists():
-        rules_path = Path("oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json")
-    with open(rules_path) as f:
-        rules = json.load(f)
-    
-    scores = pd.read_csv(DATA_DIR / "real_target_lock_data.csv")
-    if 'mission' in scores.columns:
-        scores = scores.rename(columns={'mission': 'step'})
-    
-    return rules, scores
-
 def generate_calibration_curves(rules, scores):
     """Generate calibration curves for each step"""
     fig, axes = plt.subplots(2, 4, figsize=(20, 10))
@@ -46,12 +34,6 @@ def generate_calibration_curves(rules, scores):
     for idx, step in enumerate(steps):
         ax = axes[idx]
         
-        # Get labels
-        step_data = rules['steps'][step]
-        primary = set(step_data.get('primary_genes', []))
-        secondary = set(step_data.get('secondary_genes', []))
-        relevant = primary | secondary
-        
         # Get scores for this step
         step_scores = scores[scores['step'] == step].copy()
         if len(step_scores) == 0:
@@ -59,9 +41,7 @@ def generate_calibration_curves(rules, scores):
             ax.set_title(step.replace('_', ' ').title())
             continue
         
-        step_scores['label'] = step_scores['gene'].apply(lambda g: 1 if g in relevant else 0)
-        
-        y_true = step_scores['label'].values
+        y_true = step_scores['is_relevant'].values
         y_prob = step_scores['target_lock_score'].values
         
         if len(np.unique(y_true)) < 2:
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Shared in-memory dataset for the metastasis analysis scripts (rules + Target-Lock scores + labels).
+
+Why this exists:
+- `compute_specificity_matrix.py`, `compute_precision_at_k.py`, `compute_effect_sizes.py`,
+  `generate_calibration_curves.py`, `compute_confounder_analysis.py` and `compute_ablation_study.py`
+  each had their own copy of `load_data()`, re-read the rules JSON and `real_target_lock_data.csv`,
+  and rebuilt the per-step relevance labels gene by gene.
+
+Design:
+- Loaded once per process (memoized on the input hashes) and exposed as a `MetastasisDataset`:
+  - `genes` × `steps` label matrix (2 = primary, 1 = secondary, 0 = not relevant; rules order)
+  - `genes` × `steps` × columns score tensor (NaN where a gene/step row is absent)
+  - the long-form `scores` frame the scripts already use, with a precomputed `is_relevant` column
+- Persisted as `.npz` under DATA_DIR/.cache, keyed on the sha256 of the rules JSON and the scores
+  CSV, so an unchanged rerun skips JSON/CSV parsing and label construction entirely.
+
+Usage:
+    from metastasis_dataset import load_data, load_dataset
+    rules, scores = load_data()                  # drop-in for the per-script load_data()
+    ds = load_dataset()
+    y = ds.relevant[:, ds.steps.index("angiogenesis")]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path("publication/data")
+SCORES_FILE = "real_target_lock_data.csv"
+RULES_CANDIDATES = (
+    "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json",
+    "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.0.json",
+)
+CACHE_VERSION = 1  # bump when the cached array layout changes
+
+_MEMO: Dict[str, "MetastasisDataset"] = {}
+
+
+@dataclass
+class MetastasisDataset:
+    rules: Dict
+    genes: List[str]
+    steps: List[str]
+    labels: np.ndarray          # (genes × steps) int8: 2 primary, 1 secondary, 0 not relevant
+    columns: List[str]          # numeric score columns, in CSV order
+    tensor: np.ndarray          # (genes × steps × columns) float64, NaN where absent
+    row_index: np.ndarray       # (rows × 2) gene/step index of each CSV row, in CSV order
+    key: str
+
+    @property
+    def relevant(self) -> np.ndarray:
+        """(genes × steps) 0/1 relevance (primary or secondary)."""
+        return (self.labels > 0).astype(int)
+
+    def signal(self, column: str) -> np.ndarray:
+        """(genes × steps) matrix of one score column."""
+        return self.tensor[:, :, self.columns.index(column)]
+
+    @property
+    def scores(self) -> pd.DataFrame:
+        """Long-form scores in the original CSV row order ('mission' → 'step') plus `is_relevant`."""
+        if getattr(self, "_scores", None) is None:
+            gi, si = self.row_index[:, 0], self.row_index[:, 1]
+            frame = pd.DataFrame(self.tensor[gi, si], columns=self.columns)
+            frame.insert(0, "gene", np.asarray(self.genes, dtype=object)[gi])
+            frame.insert(1, "step", np.asarray(self.steps, dtype=object)[si])
+            for col in frame.columns[2:]:
+                if col.startswith("is_") and not frame[col].isna().any():
+                    frame[col] = frame[col].astype(int)
+            frame["is_relevant"] = (self.labels[gi, si] > 0).astype(int)
+            self._scores = frame
+        return self._scores.copy()
+
+
+def resolve_rules_path() -> Path:
+    """METASTASIS_RULES_PATH, falling back to v1.0.0 when it (or the v1.0.1 default) is missing."""
+    rules_path = Path(os.environ.get("METASTASIS_RULES_PATH", RULES_CANDIDATES[0]))
+    if not rules_path.exists():
+        rules_path = Path(RULES_CANDIDATES[1])
+    return rules_path
+
+
+def _cache_dir() -> Path:
+    return Path(os.environ.get("METASTASIS_DATASET_CACHE", str(DATA_DIR / ".cache")))
+
+
+def _dataset_key(rules_bytes: bytes, scores_bytes: bytes) -> str:
+    h = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for blob in (rules_bytes, scores_bytes):
+        h.update(hashlib.sha256(blob).digest())
+    return h.hexdigest()[:20]
+
+
+def build_dataset(rules: Dict, scores: pd.DataFrame, key: str = "") -> MetastasisDataset:
+    """Label matrix + score tensor from the rules dict and the long-form scores frame."""
+    if "mission" in scores.columns:
+        scores = scores.rename(columns={"mission": "step"})
+    steps = list(rules["steps"].keys())
+    steps += [s for s in pd.unique(scores["step"]) if s not in steps]
+    genes = list(pd.unique(scores["gene"]))
+    rule_genes = set()
+    for step_data in rules["steps"].values():
+        rule_genes.update(step_data.get("primary_genes", []))
+        rule_genes.update(step_data.get("secondary_genes", []))
+    genes += sorted(rule_genes - set(genes))
+    g_pos = {g: i for i, g in enumerate(genes)}
+    s_pos = {s: j for j, s in enumerate(steps)}
+
+    labels = np.zeros((len(genes), len(steps)), dtype=np.int8)
+    for step, step_data in rules["steps"].items():
+        j = s_pos[step]
+        for g in step_data.get("secondary_genes", []):
+            labels[g_pos[g], j] = 1
+        for g in step_data.get("primary_genes", []):
+            labels[g_pos[g], j] = 2
+
+    columns = [c for c in scores.columns if c not in ("gene", "step") and pd.api.types.is_numeric_dtype(scores[c])]
+    row_index = np.column_stack([
+        scores["gene"].map(g_pos).to_numpy(),
+        scores["step"].map(s_pos).to_numpy(),
+    ]).astype(np.int32)
+    tensor = np.full((len(genes), len(steps), len(columns)), np.nan)
+    tensor[row_index[:, 0], row_index[:, 1]] = scores[columns].to_numpy(dtype=np.float64)
+    return MetastasisDataset(rules, genes, steps, labels, columns, tensor, row_index, key)
+
+
+def _save(ds: MetastasisDataset, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(
+        tmp,
+        rules=np.array(json.dumps(ds.rules)),
+        genes=np.array(ds.genes),
+        steps=np.array(ds.steps),
+        labels=ds.labels,
+        columns=np.array(ds.columns),
+        tensor=ds.tensor,
+        row_index=ds.row_index,
+    )
+    os.replace(tmp, path)
+
+
+def _load(path: Path, key: str) -> MetastasisDataset:
+    with np.load(path, allow_pickle=False) as z:
+        return MetastasisDataset(
+            rules=json.loads(str(z["rules"])),
+            genes=z["genes"].tolist(),
+            steps=z["steps"].tolist(),
+            labels=z["labels"],
+            columns=z["columns"].tolist(),
+            tensor=z["tensor"],
+            row_index=z["row_index"],
+            key=key,
+        )
+
+
+def load_dataset(
+    rules_path: Optional[Path] = None,
+    scores_path: Optional[Path] = None,
+    use_cache: bool = True,
+) -> MetastasisDataset:
+    """The dataset for the current inputs (memoized in-process, then .npz cache, then build)."""
+    rules_path = Path(rules_path) if rules_path else resolve_rules_path()
+    scores_path = Path(scores_path) if scores_path else DATA_DIR / SCORES_FILE
+    rules_bytes = rules_path.read_bytes()
+    scores_bytes = scores_path.read_bytes()
+    key = _dataset_key(rules_bytes, scores_bytes)
+    if key in _MEMO:
+        return _MEMO[key]
+
+    cache_path = _cache_dir() / f"metastasis_dataset_{key}.npz"
+    ds = None
+    if use_cache and cache_path.exists():
+        try:
+            ds = _load(cache_path, key)
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable dataset cache {cache_path}: {e}")
+    if ds is None:
+        ds = build_dataset(json.loads(rules_bytes), pd.read_csv(scores_path), key)
+        if use_cache:
+            _save(ds, cache_path)
+    _MEMO[key] = ds
+    return ds
+
+
+def load_data() -> Tuple[Dict, pd.DataFrame]:
+    """Load labels and scores: (rules dict, long-form scores with 'step' and 'is_relevant')."""
+    ds = load_dataset()
+    return ds.rules, ds.scores
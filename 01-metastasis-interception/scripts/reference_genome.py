@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Local reference-genome sequence provider (indexed FASTA, memory-mapped).
+
+Why this exists:
+- `doench_2016_clinical_validation.process_guide` fetched every 4096-bp context window from the
+  Ensembl REST API, one HTTP round trip per guide, which made the full Doench set impractical.
+
+Design:
+- Standard samtools `.fai` index (name, length, offset, linebases, linewidth); built on first use if
+  missing (plain, uncompressed FASTA only).
+- The FASTA is memory-mapped; a window is a byte slice computed from the line geometry, so lookups
+  cost microseconds and only touched pages are read.
+- Chromosome names are matched with or without the "chr" prefix (and MT ↔ chrM).
+
+Usage:
+    export REFERENCE_FASTA=/data/ref/GRCh38.primary_assembly.fa
+    genome = IndexedFasta(os.environ["REFERENCE_FASTA"])
+    genome.fetch("17", 43044295, 43044394)      # 1-based, inclusive (Ensembl region semantics)
+    genome.window("chr17", 43045000, 4096)      # pos ± 4096
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+
+class FaiEntry(NamedTuple):
+    length: int
+    offset: int
+    linebases: int
+    linewidth: int
+
+
+def build_fai(fasta_path: str, fai_path: Optional[str] = None) -> str:
+    """Write a samtools-compatible `.fai` index next to the FASTA (or at `fai_path`)."""
+    fai_path = fai_path or f"{fasta_path}.fai"
+    rows = []
+    name = None
+    length = offset = linebases = linewidth = 0
+    short_line_seen = False
+    pos = 0
+    with open(fasta_path, "rb") as f:
+        for line in f:
+            n = len(line)
+            if line.startswith(b">"):
+                if name is not None:
+                    rows.append((name, length, offset, linebases, linewidth))
+                name = line[1:].split()[0].decode()
+                length = linebases = linewidth = 0
+                offset = pos + n
+                short_line_seen = False
+            else:
+                bases = len(line.rstrip(b"\r\n"))
+                if bases:
+                    if linebases == 0:
+                        linebases, linewidth = bases, n
+                    elif short_line_seen or bases > linebases:
+                        raise ValueError(f"{fasta_path}: irregular line lengths in sequence {name}")
+                    elif bases < linebases:
+                        short_line_seen = True
+                    length += bases
+            pos += n
+    if name is not None:
+        rows.append((name, length, offset, linebases, linewidth))
+    with open(fai_path, "w") as out:
+        for r in rows:
+            out.write("\t".join(str(x) for x in r) + "\n")
+    return fai_path
+
+
+class IndexedFasta:
+    """Random access to an uncompressed, faidx-indexed FASTA via mmap."""
+
+    def __init__(self, fasta_path: str, fai_path: Optional[str] = None):
+        self.path = str(fasta_path)
+        if self.path.endswith(".gz"):
+            raise ValueError(f"{self.path}: compressed FASTA is not supported; decompress it first")
+        fai = fai_path or f"{self.path}.fai"
+        if not Path(fai).exists():
+            build_fai(self.path, fai)
+        self.index: Dict[str, FaiEntry] = {}
+        with open(fai) as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) >= 5:
+                    self.index[parts[0]] = FaiEntry(*(int(x) for x in parts[1:5]))
+        self._fh = open(self.path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _entry(self, chrom: str) -> FaiEntry:
+        c = str(chrom)
+        bare = c[3:] if c.lower().startswith("chr") else c
+        for cand in (c, bare, f"chr{bare}", "chrM" if bare in ("M", "MT") else None, "MT" if bare == "M" else None):
+            if cand and cand in self.index:
+                return self.index[cand]
+        raise KeyError(f"Sequence {chrom!r} not in {self.path}")
+
+    def _byte(self, e: FaiEntry, i: int) -> int:
+        """File offset of 0-based base i."""
+        return e.offset + (i // e.linebases) * e.linewidth + (i % e.linebases)
+
+    def fetch(self, chrom: str, start: int, end: int) -> str:
+        """Bases start..end (1-based, inclusive; clipped to the sequence), upper-cased."""
+        e = self._entry(chrom)
+        s0 = max(0, int(start) - 1)
+        e0 = min(e.length, int(end))
+        if e0 <= s0:
+            return ""
+        raw = self._mm[self._byte(e, s0): self._byte(e, e0 - 1) + 1]
+        return raw.replace(b"\n", b"").replace(b"\r", b"").decode("ascii").upper()
+
+    def window(self, chrom: str, pos: int, flank: int) -> str:
+        """pos ± flank (same region as the Ensembl `{chrom}:{pos-flank}-{pos+flank}:1` query)."""
+        return self.fetch(chrom, max(1, int(pos) - int(flank)), int(pos) + int(flank))
+
+    def __contains__(self, chrom: str) -> bool:
+        try:
+            self._entry(chrom)
+            return True
+        except KeyError:
+            return False
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+
+def open_reference(path: Optional[str] = None) -> Optional[IndexedFasta]:
+    """IndexedFasta for `path` or $REFERENCE_FASTA; None when neither is set."""
+    path = path or os.getenv("REFERENCE_FASTA")
+    return IndexedFasta(path) if path else None
@@ -5,7 +5,12 @@
 # - Avoids any possibility of silently generating synthetic datasets
 #
 # Usage:
-#   ./scripts/reproduce_all_resubmission.sh
+#   ./scripts/reproduce_all_resubmission.sh            # incremental: unchanged steps are skipped
+#   ./scripts/reproduce_all_resubmission.sh --force all
+#
+# Steps 3-6 are run by reproduce_pipeline.py: independent steps run in parallel, a step is skipped
+# when its script and input hashes are unchanged since its last successful run, and a failing step
+# only blocks the steps that depend on it. Extra arguments are passed through to it.
 #
 set -e
 
@@ -21,9 +26,15 @@ if [ ! -d "venv" ]; then
   echo "  Creating virtual environment..."
   python3 -m venv venv
 fi
-echo "  Installing dependencies..."
-venv/bin/pip install -q --upgrade pip
-venv/bin/pip install -q -r requirements.txt
+REQ_HASH=$(sha256sum requirements.txt | cut -d' ' -f1)
+if [ "$(cat venv/.requirements.sha256 2>/dev/null)" != "$REQ_HASH" ]; then
+  echo "  Installing dependencies..."
+  venv/bin/pip install -q --upgrade pip
+  venv/bin/pip install -q -r requirements.txt
+  echo "$REQ_HASH" > venv/.requirements.sha256
+else
+  echo "  Dependencies up to date (requirements.txt unchanged)"
+fi
 echo ""
 
 echo "Step 2/6: Configuration..."
@@ -33,30 +44,9 @@ export EVO_FORCE_MODEL=evo2_1b
 export EVO_USE_DELTA_ONLY=1
 echo ""
 
-echo "Step 3/6: Stage canonical publication inputs..."
-venv/bin/python stage_publication_inputs.py
-echo ""
-
-echo "Step 3.5/6: Update chromatin with Enformer (Option A)..."
-venv/bin/python update_target_lock_chromatin_enformer.py
-echo ""
-
-echo "Step 4/6: Validation Metrics (Day 1)..."
-venv/bin/python compute_per_step_validation.py
-venv/bin/python compute_specificity_matrix.py
-venv/bin/python compute_precision_at_k.py
-venv/bin/python compute_ablation_study.py
-venv/bin/python compute_confounder_analysis.py
-echo ""
-
-echo "Step 5/6: Enhanced Validation (Day 2)..."
-venv/bin/python generate_calibration_curves.py
-venv/bin/python compute_effect_sizes.py
-venv/bin/python generate_table_s2.py
-echo ""
-
-echo "Step 6/7: Hold-Out Validation (28 train / 10 test)..."
-venv/bin/python compute_holdout_validation.py
+echo "Steps 3-6: Staging, Enformer chromatin, validation metrics, hold-out (incremental, parallel)..."
+PIPELINE_STATUS=0
+venv/bin/python reproduce_pipeline.py "$@" || PIPELINE_STATUS=$?
 echo ""
 
 echo "Step 7/8: Additional Validations (Optional - may require external data/services)..."
@@ -129,6 +119,10 @@ if [ $MISSING -ne 0 ]; then
   echo "❌ ERROR: $MISSING required output file(s) missing"
   exit 1
 fi
+if [ $PIPELINE_STATUS -ne 0 ]; then
+  echo "❌ ERROR: pipeline step(s) failed (see publication/logs/)"
+  exit $PIPELINE_STATUS
+fi
 if [ $OPTIONAL_MISSING -gt 0 ]; then
   echo "⚠️  NOTE: $OPTIONAL_MISSING optional file(s) not found (TCGA/Prospective validations require external data/APIs)"
 fi
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware, incremental runner for the resubmission reproduction pipeline.
+
+Why this exists:
+- `reproduce_all_resubmission.sh` ran every step serially and `set -e` aborted everything on the first
+  failure, so a one-CSV change meant re-running the whole pipeline (Enformer backfill included).
+
+Design:
+- Each step declares its script, helper modules, input files and output files (paths exactly as the
+  scripts use them, relative to the working directory the pipeline is launched from).
+- A step depends on the most recent earlier step that writes one of its inputs; independent steps
+  (per-step, the analysis suite, hold-out) run concurrently in a process pool (workers reuse their
+  imports across steps).
+- The six dataset analyses (specificity, P@K, ablation, confounders, calibration, effect sizes) are
+  one step, `run_analysis_suite.py`, so they share a single dataset load in one process.
+- A step is skipped when its script + helper hashes and input content hashes match the last successful
+  run and its outputs still exist. In-place outputs (a file that is both input and output, e.g. the
+  Enformer chromatin backfill) are compared against the hash the step left behind.
+- A failed step only blocks the steps downstream of it; everything else still runs. Per-step logs go
+  to `<state dir>/logs/<step>.log`, state to `publication/.pipeline_state.json` (PIPELINE_STATE).
+
+Usage:
+    python3 reproduce_pipeline.py                 # incremental run
+    python3 reproduce_pipeline.py --dry-run       # show what would run / be skipped
+    python3 reproduce_pipeline.py --force analysis_suite --jobs 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+from metastasis_dataset import resolve_rules_path
+from run_analysis_suite import SUITE as ANALYSIS_SUITE
+from stage_publication_inputs import OPTIONAL_FILES, REQUIRED_FILES, _get_spec
+
+STATE_PATH = Path(os.environ.get("PIPELINE_STATE", "publication/.pipeline_state.json"))
+PUB_DATA = "publication/data"
+PUB_FIGS = "publication/figures"
+MISSING = "missing"
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    script: str
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    helpers: Tuple[str, ...] = ()
+
+
+def _figure(stem: str, root: str = PUB_FIGS) -> Tuple[str, str]:
+    return (f"{root}/{stem}.png", f"{root}/{stem}.svg")
+
+
+def build_pipeline() -> List[Step]:
+    """The resubmission pipeline, in the order `reproduce_all_resubmission.sh` ran it."""
+    rules = str(resolve_rules_path())
+    bundle = _get_spec().src_bundle_dir
+    target_lock = f"{PUB_DATA}/real_target_lock_data.csv"
+    analysis_inputs = (target_lock, rules)
+    return [
+        Step(
+            "stage", "stage_publication_inputs.py",
+            inputs=tuple(str(bundle / rel) for rel in REQUIRED_FILES + OPTIONAL_FILES),
+            outputs=tuple(f"publication/{rel}" for rel in REQUIRED_FILES),
+        ),
+        Step(
+            "enformer_chromatin", "update_target_lock_chromatin_enformer.py",
+            inputs=(target_lock, rules),
+            outputs=(target_lock, f"{PUB_DATA}/chromatin_audit_enformer_38genes.csv"),
+            helpers=("gene_locus_store.py",),
+        ),
+        Step(
+            "per_step", "compute_per_step_validation.py",
+            inputs=("../data/real_target_lock_data.csv", rules),
+            outputs=("../data/per_step_validation_metrics.csv", *_figure("figure2a_per_step_roc", "../figures")),
+            helpers=("bootstrap_engine.py",),
+        ),
+        Step(
+            "analysis_suite", "run_analysis_suite.py", analysis_inputs,
+            outputs=(
+                f"{PUB_DATA}/specificity_enrichment.csv", *_figure("figure2b_specificity_matrix"),
+                f"{PUB_DATA}/precision_at_k.csv", *_figure("figure2c_precision_at_k"),
+                f"{PUB_DATA}/ablation_study.csv",
+                f"{PUB_DATA}/weight_sensitivity_sweep.csv",
+                f"{PUB_DATA}/weight_sensitivity_summary.json",
+                *_figure("figure2d_ablation"),
+                f"{PUB_DATA}/confounder_analysis.csv", *_figure("figure_s1_confounders"),
+                *_figure("figure_s2_calibration_curves"),
+                f"{PUB_DATA}/effect_sizes.csv", *_figure("figure_s3_effect_sizes"),
+            ),
+            helpers=(*(f"{name}.py" for name in ANALYSIS_SUITE), "metastasis_dataset.py"),
+        ),
+        Step(
+            "table_s2", "generate_table_s2.py",
+            inputs=tuple(f"{PUB_DATA}/{name}.csv" for name in (
+                "per_step_validation_metrics", "precision_at_k", "specificity_enrichment", "effect_sizes", "ablation_study",
+            )),
+            outputs=("publication/tables/table_s2_validation_metrics.csv", "publication/tables/table_s2_validation_metrics.tex"),
+        ),
+        Step(
+            "holdout", "compute_holdout_validation.py",
+            inputs=("../data/real_target_lock_data.csv", rules),
+            outputs=("../data/holdout_validation_metrics.csv", "../data/holdout_train_test_split.json"),
+            helpers=("bootstrap_engine.py",),
+        ),
+    ]
+
+
+def dependencies(steps: Sequence[Step]) -> Dict[str, Set[str]]:
+    """step → upstream steps (the latest earlier writer of each input)."""
+    deps: Dict[str, Set[str]] = {}
+    last_writer: Dict[str, str] = {}
+    for step in steps:
+        deps[step.name] = {last_writer[p] for p in step.inputs if p in last_writer}
+        for p in step.outputs:
+            last_writer[p] = step.name
+    return deps
+
+
+def file_hash(path: str) -> str:
+    p = Path(path)
+    if not p.exists():
+        return MISSING
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def code_hash(step: Step) -> str:
+    h = hashlib.sha256()
+    for name in (step.script, *step.helpers):
+        h.update(name.encode())
+        h.update(file_hash(str(SCRIPTS_DIR / name)).encode())
+    return h.hexdigest()
+
+
+def load_state() -> Dict:
+    if STATE_PATH.exists():
+        try:
+            return json.loads(STATE_PATH.read_text())
+        except json.JSONDecodeError:
+            print(f"⚠️  Ignoring unreadable pipeline state {STATE_PATH}")
+    return {}
+
+
+def save_state(state: Dict) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    os.replace(tmp, STATE_PATH)
+
+
+def stale_reason(step: Step, record: Optional[Dict]) -> Optional[str]:
+    """Why `step` must run, or None if its last successful run is still current."""
+    if not record:
+        return "never run"
+    if record.get("code") != code_hash(step):
+        return "script changed"
+    outputs = record.get("outputs", {})
+    for p in step.inputs:
+        expected = outputs[p] if p in step.outputs else record.get("inputs", {}).get(p)
+        if file_hash(p) != expected:
+            return f"input changed: {p}"
+    for p in step.outputs:
+        if not Path(p).exists():
+            return f"output missing: {p}"
+    return None
+
+
+def _run_script(script: str, log_path: str) -> float:
+    """Worker: run `script` as __main__ with stdout/stderr to `log_path`; returns elapsed seconds."""
+    import runpy
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+    except ImportError:
+        pass
+
+    t0 = time.time()
+    Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        argv = sys.argv
+        sys.argv = [script]
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise RuntimeError(f"{Path(script).name} exited with status {e.code}") from None
+        except Exception as e:
+            traceback.print_exc()
+            raise RuntimeError(f"{Path(script).name}: {type(e).__name__}: {e}") from None
+        finally:
+            sys.argv = argv
+            if "matplotlib.pyplot" in sys.modules:
+                sys.modules["matplotlib.pyplot"].close("all")
+    return time.time() - t0
+
+
+def run_pipeline(
+    steps: Sequence[Step],
+    jobs: int,
+    force: Set[str],
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    """Run stale steps in dependency order; returns {step: ran|skipped|failed|blocked|would run}."""
+    deps = dependencies(steps)
+    by_name = {s.name: s for s in steps}
+    state = load_state()
+    log_dir = STATE_PATH.parent / "logs"
+    status: Dict[str, str] = {}
+    pending = [s.name for s in steps]
+    running = {}
+    started_inputs: Dict[str, Dict[str, str]] = {}
+
+    def ready(name: str) -> bool:
+        return all(status.get(d) in ("ran", "skipped", "would run") for d in deps[name])
+
+    def blocked(name: str) -> bool:
+        return any(status.get(d) in ("failed", "blocked") for d in deps[name])
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                if blocked(name):
+                    pending.remove(name)
+                    status[name] = "blocked"
+                    print(f"⏭️  {name}: blocked by failed upstream step")
+                elif ready(name):
+                    pending.remove(name)
+                    step = by_name[name]
+                    reason = "forced" if name in force or "all" in force else stale_reason(step, state.get(name))
+                    if reason is None and any(status.get(d) == "would run" for d in deps[name]):
+                        reason = "upstream would run"
+                    if reason is None:
+                        status[name] = "skipped"
+                        print(f"✅ {name}: up to date")
+                    elif dry_run:
+                        status[name] = "would run"
+                        print(f"▶️  {name}: would run ({reason})")
+                    else:
+                        print(f"▶️  {name}: running ({reason})")
+                        started_inputs[name] = {p: file_hash(p) for p in step.inputs}
+                        running[pool.submit(_run_script, str(SCRIPTS_DIR / step.script), str(log_dir / f"{name}.log"))] = name
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                step = by_name[name]
+                try:
+                    elapsed = fut.result()
+                except Exception as e:
+                    status[name] = "failed"
+                    print(f"❌ {name}: {e} (log: {log_dir / f'{name}.log'})")
+                    continue
+                missing = [p for p in step.outputs if not Path(p).exists()]
+                if missing:
+                    status[name] = "failed"
+                    print(f"❌ {name}: declared outputs not produced: {', '.join(missing)}")
+                    continue
+                status[name] = "ran"
+                state[name] = {
+                    "code": code_hash(step),
+                    "inputs": started_inputs[name],
+                    "outputs": {p: file_hash(p) for p in step.outputs},
+                    "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "seconds": round(elapsed, 2),
+                }
+                save_state(state)
+                print(f"✅ {name}: done in {elapsed:.1f}s")
+    return status
+
+
+def main():
+    steps = build_pipeline()
+    names = [s.name for s in steps]
+    ap = argparse.ArgumentParser(description="Incremental, parallel resubmission pipeline")
+    ap.add_argument("--jobs", type=int, default=min(6, os.cpu_count() or 1), help="Worker processes")
+    ap.add_argument("--force", nargs="*", default=[], choices=names + ["all"], help="Re-run these steps regardless of hashes")
+    ap.add_argument("--skip", nargs="*", default=[], choices=names, help="Leave these steps out (e.g. enformer_chromatin offline)")
+    ap.add_argument("--dry-run", action="store_true", help="Report what would run without running it")
+    args = ap.parse_args()
+
+    steps = [s for s in steps if s.name not in args.skip]
+    t0 = time.time()
+    status = run_pipeline(steps, max(1, args.jobs), set(args.force), dry_run=args.dry_run)
+
+    print("\n" + "=" * 80)
+    print("PIPELINE SUMMARY")
+    print("=" * 80)
+    for name in (s.name for s in steps):
+        print(f"   {name:20s} {status.get(name, '?')}")
+    print(f"   {'elapsed':20s} {time.time() - t0:.1f}s")
+    failed = [n for n, s in status.items() if s in ("failed", "blocked")]
+    if failed:
+        print(f"\n❌ {len(failed)} step(s) failed or blocked: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Run the metastasis analysis suite in one Python process.
+
+Each analysis script is imported and its `main()` called in turn, so the interpreter, numpy/pandas/
+scipy/sklearn/matplotlib imports and the shared dataset (`metastasis_dataset.load_dataset`) are paid
+once instead of once per script. A failing analysis is reported and the rest still run; the exit
+code is non-zero if any failed.
+
+Usage:
+    python3 run_analysis_suite.py                                  # full suite
+    python3 run_analysis_suite.py --only compute_ablation_study    # subset, in suite order
+"""
+
+import argparse
+import importlib
+import sys
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from metastasis_dataset import load_dataset
+
+SUITE = [
+    "compute_specificity_matrix",
+    "compute_precision_at_k",
+    "compute_ablation_study",
+    "compute_confounder_analysis",
+    "generate_calibration_curves",
+    "compute_effect_sizes",
+]
+
+
+def run_analysis(name: str) -> float:
+    """Import `name` and run its main() with an empty command line; returns elapsed seconds."""
+    t0 = time.time()
+    module = importlib.import_module(name)
+    argv = sys.argv
+    sys.argv = [module.__file__]
+    try:
+        module.main()
+    finally:
+        sys.argv = argv
+        if "matplotlib.pyplot" in sys.modules:
+            sys.modules["matplotlib.pyplot"].close("all")
+    return time.time() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the metastasis analysis suite in-process")
+    ap.add_argument("--only", nargs="+", choices=SUITE, default=None, help="Run only these analyses")
+    args = ap.parse_args()
+    selected = [name for name in SUITE if not args.only or name in args.only]
+    import matplotlib
+    matplotlib.use("Agg")
+
+    t0 = time.time()
+    ds = load_dataset()
+    print(f"✅ Dataset {ds.key}: {len(ds.genes)} genes × {len(ds.steps)} steps ({time.time() - t0:.2f}s)")
+
+    timings, failures = {}, []
+    for name in selected:
+        try:
+            timings[name] = run_analysis(name)
+        except Exception:
+            traceback.print_exc()
+            failures.append(name)
+
+    print("\n" + "=" * 80)
+    print("ANALYSIS SUITE SUMMARY")
+    print("=" * 80)
+    for name in selected:
+        status = f"{timings[name]:6.2f}s" if name in timings else "FAILED"
+        print(f"   {name:32s} {status}")
+    print(f"   {'total':32s} {time.time() - t0:6.2f}s")
+    if failures:
+        print(f"\n❌ {len(failures)} analysis step(s) failed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
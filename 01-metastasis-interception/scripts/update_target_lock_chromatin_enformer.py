@@ -4,8 +4,17 @@ Replace stub chromatin in the 38-gene Target-Lock dataset with REAL Enformer pre
 
 What this does
 - Loads staged `../data/real_target_lock_data.csv` (8 missions × 38 genes).
-- For each gene, queries Ensembl for gene locus and uses TSS as a consistent coordinate.
+- For each gene, resolves the gene locus (shared local gene-locus table; Ensembl for misses) and uses TSS
+  as a consistent coordinate.
 - Calls the backend Enformer client (ENFORMER_URL must be set) to get accessibility + provenance.
+  Loci are scored concurrently (ENFORMER_MAX_CONCURRENCY, default 8) over one pooled client, and every
+  real (non-stub) prediction is kept in a persistent SQLite cache keyed by (chrom, pos, model version,
+  context): a re-run with unchanged loci makes no network calls. Predictions are stored under the
+  model named in their provenance (`provenance.model`, else ENFORMER_MODEL_VERSION), and the model each
+  ENFORMER_URL answered with is recorded, so later runs know the cache key before any call.
+  ENFORMER_MODEL_VERSION overrides the recorded model (ENFORMER_CACHE_DB overrides the cache location;
+  ENFORMER_NO_CACHE=1 skips cache reads, e.g. after redeploying a new model under the same URL, but
+  still stores fresh predictions and re-records the model).
 - Writes:
   - `../data/real_target_lock_data.csv` (overwritten) with updated chromatin + recomputed target_lock_score
   - `../data/chromatin_audit_enformer_38genes.csv` with per-gene details and stub-rate
@@ -23,14 +32,21 @@ Usage
 
 from __future__ import annotations
 
+import json
 import os
+import sqlite3
+import time
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import httpx
 import pandas as pd
 
 import asyncio
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+from gene_locus_store import get_store
 
 
 DATA_DIR = Path("publication/data")
@@ -39,6 +55,13 @@ OUT_CSV = DATA_DIR / "real_target_lock_data.csv"  # overwrite (resubmission mode
 AUDIT_CSV = DATA_DIR / "chromatin_audit_enformer_38genes.csv"
 TSS_CACHE_CSV = DATA_DIR / "gene_tss_grch38_38genes.csv"
 
+ENFORMER_CACHE_DB = Path(os.getenv(
+    "ENFORMER_CACHE_DB",
+    str(Path(__file__).resolve().parent.parent / "data" / "enformer_predictions.sqlite"),
+))
+ENFORMER_MAX_CONCURRENCY = int(os.getenv("ENFORMER_MAX_CONCURRENCY", "8"))
+ENFORMER_CONTEXT_BP = 32000
+
 RULES_PATH_DEFAULT = "oncology-coPilot/oncology-backend-minimal/api/config/metastasis_rules_v1.0.1.json"
 
 WEIGHTS = {"functionality": 0.35, "essentiality": 0.35, "chromatin": 0.15, "regulatory": 0.15}
@@ -51,59 +74,139 @@ ENSEMBL_SYMBOL_ALIASES = {
 
 
 
-async def _ensembl_lookup_gene(gene: str) -> Dict:
-    symbol = gene
-    url = f"https://rest.ensembl.org/lookup/symbol/homo_sapiens/{symbol}?expand=0"
-    headers = {"Content-Type": "application/json"}
-    async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0)) as client:
-        r = await client.get(url, headers=headers)
-        try:
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError:
-            # Retry with alias if known (e.g., VEGFR2 -> KDR)
-            alias = ENSEMBL_SYMBOL_ALIASES.get(gene.upper())
-            if not alias or alias.upper() == gene.upper():
-                raise
-            url2 = f"https://rest.ensembl.org/lookup/symbol/homo_sapiens/{alias}?expand=0"
-            r2 = await client.get(url2, headers=headers)
-            r2.raise_for_status()
-            js2 = r2.json()
-            # Preserve original requested gene name for downstream reporting
-            js2["_requested_symbol"] = gene
-            js2["_resolved_symbol"] = alias
-            return js2
-
-
-async def _gene_tss(gene: str) -> Tuple[str, int]:
-    js = await _ensembl_lookup_gene(gene)
-    chrom = str(js.get("seq_region_name"))
-    start = int(js.get("start"))
-    end = int(js.get("end"))
-    strand = int(js.get("strand", 1))
-    tss = start if strand == 1 else end
+async def _gene_tss_map(genes: List[str]) -> Dict[str, Tuple[str, int]]:
+    """TSS per gene from the shared gene-locus table (misses fetched concurrently from Ensembl, with
+    publication-name aliases such as VEGFR2 -> KDR). Raises if any gene cannot be resolved."""
+    loci = await get_store().resolve(genes, aliases=ENSEMBL_SYMBOL_ALIASES)
+    missing = [g for g, rec in loci.items() if rec is None]
+    if missing:
+        raise RuntimeError(f"Could not resolve gene loci for: {', '.join(missing)}")
+    return {g: _tss(rec) for g, rec in loci.items()}
+
+
+def _tss(locus: Dict) -> Tuple[str, int]:
+    chrom = str(locus["chrom"])
+    tss = int(locus["start"]) if int(locus.get("strand", 1)) == 1 else int(locus["end"])
     return chrom, tss
 
 
-async def _chromatin_for_gene(gene: str, chrom: str, pos: int) -> Dict:
+
+class EnformerCache:
+    """Persistent (chrom, pos, model_version, context_bp) → Enformer prediction table."""
+
+    def __init__(self, path: Path = ENFORMER_CACHE_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS predictions (
+                chrom TEXT NOT NULL,
+                pos INTEGER NOT NULL,
+                model_version TEXT NOT NULL,
+                context_bp INTEGER NOT NULL,
+                accessibility_score REAL NOT NULL,
+                provenance TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (chrom, pos, model_version, context_bp)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS deployments (
+                enformer_url TEXT PRIMARY KEY,
+                model_version TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def deployment_model(self, enformer_url: Optional[str]) -> Optional[str]:
+        """Model version `enformer_url` answered with on its last fresh run, if recorded."""
+        if not enformer_url:
+            return None
+        row = self._conn.execute(
+            "SELECT model_version FROM deployments WHERE enformer_url = ?", (enformer_url.rstrip("/"),)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_deployment_model(self, enformer_url: str, model_version: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO deployments VALUES (?, ?, ?)",
+                (enformer_url.rstrip("/"), model_version, time.time()),
+            )
+
+    def get(self, chrom: str, pos: int, model_version: str, context_bp: int = ENFORMER_CONTEXT_BP) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT accessibility_score, provenance FROM predictions "
+            "WHERE chrom = ? AND pos = ? AND model_version = ? AND context_bp = ?",
+            (str(chrom), int(pos), model_version, int(context_bp)),
+        ).fetchone()
+        return None if row is None else {"accessibility_score": row[0], "provenance": json.loads(row[1])}
+
+    def put(self, chrom: str, pos: int, model_version: str, pred: Dict, context_bp: int = ENFORMER_CONTEXT_BP) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(chrom), int(pos), model_version, int(context_bp),
+                    float(pred["accessibility_score"]), json.dumps(pred.get("provenance") or {}), time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+async def _predict(client: httpx.AsyncClient, enformer_url: str, chrom: str, pos: int, retries: int = 3) -> Dict:
     # For locus accessibility we use reference sequence at TSS; no SNV is applied.
     payload = {
         "chrom": str(chrom),
         "pos": int(pos),
         "ref": "N",
         "alt": "N",
-        "context_bp": 32000,
+        "context_bp": ENFORMER_CONTEXT_BP,
         "use_cache": True,
     }
-
-    enformer_url = os.environ.get("ENFORMER_URL")
-    if not enformer_url:
-        raise RuntimeError("ENFORMER_URL must be set")
-
-    async with httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=10.0)) as client:
-        r = await client.post(f"{enformer_url}/predict", json=payload)
-        r.raise_for_status()
-        pred = r.json() or {}
+    for attempt in range(retries + 1):
+        try:
+            r = await client.post(f"{enformer_url}/predict", json=payload)
+            if r.status_code == 429 or r.status_code >= 500:
+                raise httpx.HTTPStatusError(f"Enformer {r.status_code}", request=r.request, response=r)
+            r.raise_for_status()
+            return r.json() or {}
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            retryable = isinstance(e, httpx.TransportError) or e.response.status_code == 429 or e.response.status_code >= 500
+            if attempt >= retries or not retryable:
+                raise
+            retry_after = e.response.headers.get("Retry-After") if isinstance(e, httpx.HTTPStatusError) else None
+            await asyncio.sleep(float(retry_after) if retry_after else 2.0 * (2 ** attempt))
+    return {}
+
+
+async def _chromatin_for_gene(
+    gene: str,
+    chrom: str,
+    pos: int,
+    *,
+    client: Optional[httpx.AsyncClient],
+    enformer_url: Optional[str],
+    model_version: Optional[str],
+    cache: EnformerCache,
+    read_cache: bool,
+    sem: asyncio.Semaphore,
+) -> Dict:
+    cached = cache.get(chrom, pos, model_version) if read_cache and model_version else None
+    if cached is not None:
+        pred = cached
+    else:
+        if client is None or not enformer_url:
+            raise RuntimeError(f"ENFORMER_URL must be set ({gene} {chrom}:{pos} is not in the Enformer cache)")
+        async with sem:
+            pred = await _predict(client, enformer_url, chrom, pos)
+        prov = pred.get("provenance") or {}
+        # key on the model that actually answered; the URL alone does not pin a model version
+        model_version = prov.get("model") or model_version
+        if model_version and "accessibility_score" in pred and not _is_stub(prov):
+            cache.put(chrom, pos, model_version, pred)
 
     return {
         "gene": gene,
@@ -111,9 +214,46 @@ async def _chromatin_for_gene(gene: str, chrom: str, pos: int) -> Dict:
         "pos": pos,
         "accessibility_score": float(pred.get("accessibility_score", 0.0)),
         "provenance": pred.get("provenance") or {},
+        "model_version": model_version,
+        "cache_hit": cached is not None,
     }
 
 
+async def fetch_chromatin(
+    tss_map: Dict[str, Tuple[str, int]],
+    genes: List[str],
+    enformer_url: Optional[str],
+    model_version: Optional[str],
+    cache: EnformerCache,
+    read_cache: bool = True,
+) -> List[Dict]:
+    """Enformer accessibility at each gene's TSS: cache hits locally, misses concurrently over one client.
+
+    Cache reads need `model_version` (and `read_cache`); fresh predictions are always stored.
+    """
+    sem = asyncio.Semaphore(ENFORMER_MAX_CONCURRENCY)
+    read_cache = read_cache and bool(model_version)
+    misses = not read_cache or any(cache.get(*tss_map[g], model_version) is None for g in genes)
+    client = None
+    if misses and enformer_url:
+        limits = httpx.Limits(max_connections=ENFORMER_MAX_CONCURRENCY, max_keepalive_connections=ENFORMER_MAX_CONCURRENCY)
+        client = httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=10.0), limits=limits)
+    try:
+        results = list(await asyncio.gather(*[
+            _chromatin_for_gene(g, *tss_map[g], client=client, enformer_url=enformer_url,
+                                model_version=model_version, cache=cache, read_cache=read_cache, sem=sem)
+            for g in genes
+        ]))
+    finally:
+        if client is not None:
+            await client.aclose()
+    # Remember which model this deployment serves, so the next run can read the cache without a call
+    fresh_models = {r["model_version"] for r in results if not r["cache_hit"] and not _is_stub(r["provenance"])}
+    if enformer_url and len(fresh_models) == 1 and None not in fresh_models:
+        cache.set_deployment_model(enformer_url, fresh_models.pop())
+    return results
+
+
 def _is_stub(prov: Dict) -> bool:
     return (prov or {}).get("method") == "deterministic_fallback"
 
@@ -124,7 +264,8 @@ async def main_async() -> None:
         raise FileNotFoundError(f"Missing input dataset: {IN_CSV}. Run staging first.")
 
     enformer_url = os.environ.get("ENFORMER_URL")
-    if not enformer_url:
+    model_version = os.environ.get("ENFORMER_MODEL_VERSION")
+    if not enformer_url and not model_version:
         raise RuntimeError("ENFORMER_URL must be set to your deployed Modal Enformer endpoint for Option A.")
 
     df = pd.read_csv(IN_CSV)
@@ -140,19 +281,26 @@ async def main_async() -> None:
         tss_df = pd.read_csv(TSS_CACHE_CSV)
         tss_map = {r["gene"]: (str(r["chrom"]), int(r["pos"])) for _, r in tss_df.iterrows()}
     else:
-        tss_rows = []
-        for g in genes:
-            chrom, pos = await _gene_tss(g)
-            tss_rows.append({"gene": g, "chrom": chrom, "pos": pos})
+        tss_rows = [{"gene": g, "chrom": chrom, "pos": pos} for g, (chrom, pos) in (await _gene_tss_map(genes)).items()]
         tss_df = pd.DataFrame(tss_rows)
         tss_df.to_csv(TSS_CACHE_CSV, index=False)
         tss_map = {r["gene"]: (str(r["chrom"]), int(r["pos"])) for _, r in tss_df.iterrows()}
 
-    # Fetch chromatin per gene (TSS-based)
-    results = []
-    for g in genes:
-        chrom, pos = tss_map[g]
-        results.append(await _chromatin_for_gene(g, chrom=chrom, pos=pos))
+    # Fetch chromatin per gene (TSS-based); cached loci never touch the network
+    no_cache = os.getenv("ENFORMER_NO_CACHE", "").lower() in ("1", "true", "yes")
+    cache = EnformerCache()
+    if not model_version:
+        model_version = cache.deployment_model(enformer_url)
+        if model_version:
+            print(f"Enformer model for {enformer_url}: {model_version} (recorded on an earlier run)")
+        elif not no_cache:
+            print("⚠️  No model recorded for this ENFORMER_URL yet: predicting every locus fresh")
+    try:
+        results = await fetch_chromatin(tss_map, genes, enformer_url, model_version, cache, read_cache=not no_cache)
+    finally:
+        cache.close()
+    n_hits = sum(r["cache_hit"] for r in results)
+    print(f"✅ Enformer chromatin for {len(results)} loci ({n_hits} from cache, {len(results) - n_hits} predicted)")
 
     audit = pd.DataFrame(
         [
@@ -165,6 +313,8 @@ async def main_async() -> None:
                 "model": (r["provenance"] or {}).get("model"),
                 "warning": (r["provenance"] or {}).get("warning"),
                 "enformer_url": enformer_url,
+                "model_version": r["model_version"],
+                "cache_hit": r["cache_hit"],
             }
             for r in results
         ]
@@ -16,13 +16,24 @@ import argparse
 import json
 import os
 import random
+import sys
+import threading
 from collections import Counter
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gdsc2_labels import compute_labels
+from depmap_index import EssentialityIndex, load_index_if_present
+from feature_table import FeatureTable
+from gene_calibrator import GeneCalibrator
+from input_cache import OmicsShards, load_gdsc2, load_omics_mutations, stream_filter_omics
+from softmax_lr import fit_softmax_regression_batch, predict_softmax
+from variant_score_store import VariantScoreStore, normalize_assembly
+
 # -------------------------
 # Drug class mapping
 # -------------------------
@@ -130,6 +141,10 @@ class CellLineFeatures:
     gene_raw_max: Dict[str, float] = field(default_factory=dict)
 
 
+def modal_model_id(app_name: str = "variant-analysis-evo2", cls_name: str = "Evo2Model") -> str:
+    return f"modal:{app_name}/{cls_name}"
+
+
 class Evo2VariantScorer:
 
     """Wrapper around deployed Modal app `variant-analysis-evo2`.
@@ -137,15 +152,20 @@ class Evo2VariantScorer:
     Signature:
       analyze_single_variant(pos, alt, genome, chrom)
 
-    Cache key used here: hg38:chrX:pos:ALT
+    Store identity: model_id = modal:{app_name}/{cls_name} (no windows/flank).
     """
 
     def __init__(self, app_name: str = "variant-analysis-evo2", cls_name: str = "Evo2Model"):
         import modal
 
+        self.model_id = modal_model_id(app_name, cls_name)
         self._cls = modal.Cls.from_name(app_name, cls_name)
         self._obj = self._cls()
 
+    @property
+    def score_identity(self) -> Dict[str, Any]:
+        return {"model_id": self.model_id, "windows": None, "flank": None}
+
     def score_snv(self, chrom: str, pos: int, alt: str, genome: str = "hg38") -> Dict:
         out = self._obj.analyze_single_variant.remote(int(pos), str(alt).upper(), genome, str(chrom))
         if not isinstance(out, dict) or "delta_score" not in out:
@@ -153,12 +173,22 @@ class Evo2VariantScorer:
         return out
 
 
+DEFAULT_EVO_WINDOWS = (1024, 2048, 4096, 8192)
+
+
 class EvoApiVariantScorer:
     """HTTP client for backend Evo endpoints (doctrine-aligned).
 
     Calls:
     - POST {api_base}/api/evo/score_variant_multi  -> {min_delta, ...}
     - POST {api_base}/api/evo/score_variant_exon   -> {exon_delta, ...}
+    - POST {api_base}{batch_route} (optional)      -> {results: [{min_delta, exon_delta, ...}, ...]}
+
+    One pooled `httpx.Client` is reused for every request (keep-alive; no per-variant handshakes).
+    `score_variants` sends a whole list in one batch request when the backend exposes `batch_route`;
+    otherwise (404/405/501) it falls back to per-variant calls pipelined over the pooled client.
+    Requests go through `evo2_http.ResilientClient` (retry/backoff, AIMD in-flight limit capped at
+    `max_in_flight`, circuit breaker); `http_stats()` reports its counters for the receipt.
     """
 
     def __init__(
@@ -169,30 +199,91 @@ class EvoApiVariantScorer:
         timeout_s: float = 60.0,
         exon_flank: int = 4096,
         windows: Optional[List[int]] = None,
+        batch_route: str = "/api/evo/score_variants_batch",
+        max_in_flight: int = 8,
+        max_retries: int = 4,
+        target_latency_s: Optional[float] = None,
     ):
         self.api_base = str(api_base).rstrip("/")
         self.model_id = str(model_id)
         self.timeout_s = float(timeout_s)
         self.exon_flank = int(exon_flank)
-        self.windows = windows or [1024, 2048, 4096, 8192]
+        self.windows = windows or list(DEFAULT_EVO_WINDOWS)
+        self.batch_route = str(batch_route or "")
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_retries = int(max_retries)
+        self.target_latency_s = target_latency_s
+        # None = unknown (probe on first batch), False = backend lacks the route
+        self._batch_supported: Optional[bool] = None if self.batch_route else False
+        self._client = None
+        self._client_lock = threading.Lock()  # scorer is shared by the per-line worker threads
+        # One executor for every caller: concurrent lines share max_in_flight workers instead of each
+        # opening its own pool (max_concurrency × max_in_flight threads against one connection pool).
+        self._executor = None
+        self._http_stats: Optional[Dict[str, Any]] = None
 
         try:
             import httpx  # noqa: F401
         except Exception as e:
             raise RuntimeError("httpx is required for --evo_api_base usage") from e
 
-    def score_variant(
-        self,
-        *,
-        assembly: str,
-        chrom: str,
-        pos: int,
-        ref: str,
-        alt: str,
-    ) -> Dict[str, Any]:
-        import httpx
-
-        payload = {
+    @property
+    def score_identity(self) -> Dict[str, Any]:
+        return {"model_id": self.model_id, "windows": list(self.windows), "flank": self.exon_flank}
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        with self._client_lock:
+            if self._client is not None:
+                return self._client
+            import httpx
+            from evo2_http import ResilientClient
+
+            self._client = ResilientClient(
+                httpx.Client(
+                    timeout=self.timeout_s,
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=2 * self.max_in_flight,
+                        max_keepalive_connections=2 * self.max_in_flight,
+                    ),
+                ),
+                max_concurrency=self.max_in_flight,
+                max_retries=self.max_retries,
+                target_latency_s=self.target_latency_s,
+            )
+        return self._client
+
+    def http_stats(self) -> Optional[Dict[str, Any]]:
+        if self._client is not None:
+            return self._client.stats()
+        return self._http_stats
+
+    @property
+    def executor(self):
+        if self._executor is not None:
+            return self._executor
+        with self._client_lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="evo_api")
+        return self._executor
+
+    def close(self) -> None:
+        with self._client_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self._client is not None:
+                self._http_stats = self._client.stats()
+                self._client.close()
+                self._client = None
+
+    def _payload(self, *, assembly: str, chrom: str, pos: int, ref: str, alt: str) -> Dict[str, Any]:
+        return {
             "assembly": str(assembly),
             "chrom": str(chrom).replace("chr", ""),
             "pos": int(pos),
@@ -202,18 +293,7 @@ class EvoApiVariantScorer:
             "windows": list(self.windows),
         }
 
-        with httpx.Client(timeout=self.timeout_s, follow_redirects=True) as client:
-            r_multi = client.post(f"{self.api_base}/api/evo/score_variant_multi", json=payload)
-            r_multi.raise_for_status()
-            j_multi = r_multi.json() if r_multi.content else {}
-
-            r_exon = client.post(
-                f"{self.api_base}/api/evo/score_variant_exon",
-                json={**payload, "flank": int(self.exon_flank)},
-            )
-            r_exon.raise_for_status()
-            j_exon = r_exon.json() if r_exon.content else {}
-
+    def _result(self, j_multi: Any, j_exon: Any, method: str = "evo_api_multi_exon") -> Dict[str, Any]:
         min_delta = j_multi.get("min_delta") if isinstance(j_multi, dict) else None
         exon_delta = j_exon.get("exon_delta") if isinstance(j_exon, dict) else None
 
@@ -230,7 +310,7 @@ class EvoApiVariantScorer:
             "exon_delta": exon_delta,
             "disruption": disruption,
             "provenance": {
-                "method": "evo_api_multi_exon",
+                "method": method,
                 "api_base": self.api_base,
                 "model_id": self.model_id,
                 "windows": self.windows,
@@ -240,6 +320,74 @@ class EvoApiVariantScorer:
             },
         }
 
+    def score_variant(
+        self,
+        *,
+        assembly: str,
+        chrom: str,
+        pos: int,
+        ref: str,
+        alt: str,
+    ) -> Dict[str, Any]:
+        payload = self._payload(assembly=assembly, chrom=chrom, pos=pos, ref=ref, alt=alt)
+        client = self.client
+
+        r_multi = client.post(f"{self.api_base}/api/evo/score_variant_multi", json=payload)
+        r_multi.raise_for_status()
+        j_multi = r_multi.json() if r_multi.content else {}
+
+        r_exon = client.post(
+            f"{self.api_base}/api/evo/score_variant_exon",
+            json={**payload, "flank": int(self.exon_flank)},
+        )
+        r_exon.raise_for_status()
+        j_exon = r_exon.json() if r_exon.content else {}
+
+        return self._result(j_multi, j_exon)
+
+    def _score_batch_route(self, payloads: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """One request for the whole list; returns None if the backend lacks the route."""
+        r = self.client.post(
+            f"{self.api_base}{self.batch_route}",
+            json={"variants": payloads, "flank": int(self.exon_flank), "model_id": self.model_id, "windows": list(self.windows)},
+        )
+        if r.status_code in (404, 405, 501):
+            return None
+        r.raise_for_status()
+        j = r.json() if r.content else {}
+        rows = j.get("results") if isinstance(j, dict) else None
+        if not isinstance(rows, list) or len(rows) != len(payloads):
+            raise RuntimeError(f"Unexpected batch response from {self.batch_route}: {str(j)[:200]}")
+        return [self._result(row, row, method="evo_api_batch") for row in rows]
+
+    def score_variants(self, variants: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Score a list of variants (dicts with assembly/chrom/pos/ref/alt), preserving order.
+
+        Failed variants come back as None (per-variant fallback path only).
+        """
+        if not variants:
+            return []
+        payloads = [self._payload(**v) for v in variants]
+
+        if self._batch_supported is not False:
+            out = self._score_batch_route(payloads)
+            if out is not None:
+                self._batch_supported = True
+                return list(out)
+            self._batch_supported = False
+            print(f"[evo_api] batch route {self.batch_route} not available; falling back to pipelined per-variant calls")
+
+        def _one(v: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            try:
+                return self.score_variant(**v)
+            except Exception as e:
+                print(f"[evo_api] scoring failed for {v.get('chrom')}:{v.get('pos')} {v.get('ref')}>{v.get('alt')}: {e}")
+                return None
+
+        if self.max_in_flight <= 1 or len(variants) <= 1:
+            return [_one(v) for v in variants]
+        return list(self.executor.map(_one, variants))
+
 
 def pick_variants_for_cellline(df: pd.DataFrame, max_variants: int) -> pd.DataFrame:
     """Pick variants to score for a cell line.
@@ -309,16 +457,56 @@ def get_lineage_essentiality(depmap: Dict, lineage: str, gene: str) -> float:
     return 0.0
 
 
+def _variant_row_identity(r: Any, *, genome: str, score_identity: Dict[str, Any]) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """(gene, ref, store identity) for one selected Omics row."""
+    chrom_raw = str(r["Chrom"])
+    chrom = chrom_raw if chrom_raw.startswith("chr") else f"chr{chrom_raw}"
+    pos = int(r["Pos"])
+    alt = str(r["Alt"]).upper()
+    ref = None if pd.isna(r.get("Ref")) else str(r.get("Ref")).upper()
+    gene = str(r["HugoSymbol"]).upper()
+    ident = dict(assembly=normalize_assembly(genome), chrom=chrom, pos=pos, ref=ref, alt=alt, **score_identity)
+    return gene, ref, ident
+
+
+def _store_record_from_api(hit: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "min_delta": hit.get("min_delta"),
+        "exon_delta": hit.get("exon_delta"),
+        "disruption": float(hit.get("disruption") or 0.0),
+        "provenance": hit.get("provenance"),
+    }
+
+
+def _store_record_from_modal(hit: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "delta_score": float(hit.get("delta_score")),
+        "reference": hit.get("reference"),
+        "prediction": hit.get("prediction"),
+        "confidence": hit.get("classification_confidence"),
+    }
+    out["disruption"] = delta_to_disruption(out.get("delta_score"))
+    return out
+
+
 def compute_features_for_cellline(
     model_id: str,
     lineage: str,
     muts: pd.DataFrame,
     max_variants: int,
-    cache: Dict[str, Dict],
+    cache: VariantScoreStore,
     scorer: Optional[Evo2VariantScorer],
     use_cache_only: bool,
+    score_identity: Dict[str, Any],
     genome: str = "hg38",
+    failed_keys: Optional[Set[str]] = None,
 ) -> CellLineFeatures:
+    """Score up to `max_variants` variants for one line; `cache` is the shared variant-score store.
+
+    `score_identity` (model_id/windows/flank) is part of the store key so scores from different
+    scorer configurations never alias. Keys in `failed_keys` (already failed in the dedup pre-pass)
+    are treated as unscored instead of being re-requested.
+    """
     subset = pick_variants_for_cellline(muts, max_variants=max_variants)
     n_considered = int(len(subset))
 
@@ -326,59 +514,41 @@ def compute_features_for_cellline(
     scored = 0
     gene_raw_max: Dict[str, float] = {}
 
+    # Pass 1: resolve store hits and collect misses (so backend misses can be scored as one batch)
+    rows: List[Dict[str, Any]] = []
     for _, r in subset.iterrows():
-        chrom_raw = str(r["Chrom"])
-        chrom = chrom_raw if chrom_raw.startswith("chr") else f"chr{chrom_raw}"
-        pos = int(r["Pos"])
-        alt = str(r["Alt"]).upper()
-        ref = None if pd.isna(r.get("Ref")) else str(r.get("Ref")).upper()
-        gene = str(r["HugoSymbol"]).upper()
-
-        key = f"{genome}:{chrom}:{pos}:{ref}:{alt}"
-
-        out = cache.get(key)
-        if out is None:
-            if use_cache_only:
-                continue
-            if scorer is None:
-                continue
-            # Prefer backend evo endpoints when available (multi-window + exon corroboration)
-            if hasattr(scorer, "score_variant") and ref:  # EvoApiVariantScorer
-                hit = scorer.score_variant(assembly="GRCh38" if genome in ("hg38","GRCh38") else "GRCh37", chrom=chrom, pos=pos, ref=ref, alt=alt)
-                out = {
-                    "min_delta": hit.get("min_delta"),
-                    "exon_delta": hit.get("exon_delta"),
-                    "disruption": float(hit.get("disruption") or 0.0),
-                    "provenance": hit.get("provenance"),
-                }
-                cache[key] = out
+        gene, ref, ident = _variant_row_identity(r, genome=genome, score_identity=score_identity)
+        key = cache.key(**ident)
+        rows.append({"gene": gene, "ref": ref, "ident": ident, "key": key, "out": cache.get(key)})
+
+    misses = [row for row in rows if row["out"] is None and not (failed_keys and row["key"] in failed_keys)]
+    if misses and not use_cache_only and scorer is not None:
+        # Prefer backend evo endpoints when available (multi-window + exon corroboration)
+        api_misses = [row for row in misses if row["ref"]] if hasattr(scorer, "score_variants") else []
+        if api_misses:  # EvoApiVariantScorer: one batched/pipelined call for the whole line
+            hits = scorer.score_variants([
+                {k: row["ident"][k] for k in ("assembly", "chrom", "pos", "ref", "alt")} for row in api_misses
+            ])
+            for row, hit in zip(api_misses, hits):
+                if hit is None:
+                    continue
+                out = _store_record_from_api(hit)
                 # No REF validation needed; we sent REF explicitly
-                scored += 1
-                d = float(out.get("disruption") or 0.0)
-                gene_raw_max[gene] = max(gene_raw_max.get(gene, 0.0), d)
-                if gene in HRR_GENES:
-                    hrr_max = max(hrr_max, d)
-                if gene in BER_GENES:
-                    ber_max = max(ber_max, d)
-                if gene in CHECKPOINT_GENES:
-                    checkpoint_max = max(checkpoint_max, d)
-                if gene in ATR_AXIS_GENES:
-                    atr_axis_max = max(atr_axis_max, d)
-                if gene in DNAPK_GENES:
-                    dnapk_max = max(dnapk_max, d)
-                if gene in DDR_BROAD:
-                    ddr_broad_max = max(ddr_broad_max, d)
-                continue
-
-            hit = scorer.score_snv(chrom=chrom, pos=pos, alt=alt, genome=genome)
-            out = {
-                "delta_score": float(hit.get("delta_score")),
-                "reference": hit.get("reference"),
-                "prediction": hit.get("prediction"),
-                "confidence": hit.get("classification_confidence"),
-            }
-            out["disruption"] = delta_to_disruption(out.get("delta_score"))
-            cache[key] = out
+                cache.put(row["key"], out, **row["ident"])
+                row["out"] = out
+        elif hasattr(scorer, "score_snv"):
+            for row in misses:
+                ident = row["ident"]
+                hit = scorer.score_snv(chrom=ident["chrom"], pos=ident["pos"], alt=ident["alt"], genome=genome)
+                out = _store_record_from_modal(hit)
+                cache.put(row["key"], out, **ident)
+                row["out"] = out
+
+    # Pass 2: aggregate in selection order
+    for row in rows:
+        out, gene, ref = row["out"], row["gene"], row["ref"]
+        if out is None:
+            continue
 
         # strict REF validation: only accept if provided ref matches service reference
         if ref and out.get("reference") and str(out["reference"]).upper() != ref:
@@ -417,65 +587,218 @@ def compute_features_for_cellline(
     )
 
 
-def build_gene_calibrator(train_feats: Dict[str, CellLineFeatures]) -> Dict[str, List[float]]:
-    """Build per-gene empirical distributions on TRAIN only.
+def mutations_getter(muts: Union[pd.DataFrame, OmicsShards]):
+    """ModelID → mutation rows accessor (one groupby for a DataFrame; lazy shard reads otherwise)."""
+    if isinstance(muts, pd.DataFrame):
+        by_mid: Dict[str, pd.DataFrame] = {}
+        if len(muts):
+            by_mid = {str(k): g for k, g in muts.groupby(muts["ModelID"].astype(str), sort=False)}
+        empty = muts.iloc[0:0]
+        return lambda mid: by_mid.get(str(mid), empty)
+    return muts.get
+
+
+def prescore_unique_variants(
+    mids: List[str],
+    *,
+    muts: Union[pd.DataFrame, OmicsShards],
+    max_variants: int,
+    cache: VariantScoreStore,
+    scorer: Any,
+    score_identity: Dict[str, Any],
+    max_concurrency: int = 1,
+    chunk_size: int = 256,
+    genome: str = "hg38",
+) -> Tuple[Dict[str, int], Set[str]]:
+    """Plan + score every distinct selected variant across `mids` exactly once (dedup pre-pass).
+
+    Recurrent hotspots (TP53, KRAS, ...) are selected by many lines; scoring them per line repeats
+    identical scorer calls. This collects the unique store keys over all lines' selections, scores
+    only those missing from the store (API: batched/pipelined chunks; Modal: bounded thread pool),
+    and writes them back. The per-line pass then aggregates from store hits.
 
-    Returns: gene -> sorted list of raw disruptions.
-    Also includes '__GLOBAL__' fallback distribution.
+    Returns (stats, failed store keys); pass the keys to the per-line pass so failures are not retried
+    once per line.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    get_muts = mutations_getter(muts)
+    unique: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}
+    n_occ = 0
+    for mid in mids:
+        subset = pick_variants_for_cellline(get_muts(mid), max_variants=max_variants)
+        for _, r in subset.iterrows():
+            _gene, ref, ident = _variant_row_identity(r, genome=genome, score_identity=score_identity)
+            n_occ += 1
+            unique.setdefault(cache.key(**ident), (ref, ident))
+
+    misses = [(k, ref, ident) for k, (ref, ident) in unique.items() if k not in cache]
+    failed: Set[str] = set()
+    stats = {"n_variant_occurrences": n_occ, "n_unique": len(unique), "n_store_hits": len(unique) - len(misses), "n_scored": 0, "n_failed": 0}
+    print(f"[dedup] {n_occ} selected variants → {len(unique)} unique; {len(misses)} need scoring")
+
+    if hasattr(scorer, "score_variants"):
+        todo = [m for m in misses if m[1]]  # backend route needs REF
+        for i in range(0, len(todo), max(1, int(chunk_size))):
+            chunk = todo[i:i + chunk_size]
+            hits = scorer.score_variants([
+                {k: ident[k] for k in ("assembly", "chrom", "pos", "ref", "alt")} for _, _, ident in chunk
+            ])
+            for (key, _ref, ident), hit in zip(chunk, hits):
+                if hit is None:
+                    stats["n_failed"] += 1
+                    failed.add(key)
+                    continue
+                cache.put(key, _store_record_from_api(hit), **ident)
+                stats["n_scored"] += 1
+            cache.flush()
+            print(f"[dedup] scored {min(i + chunk_size, len(todo))}/{len(todo)} unique variants")
+    elif hasattr(scorer, "score_snv"):
+        def _one(m: Tuple[str, Optional[str], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            _key, _ref, ident = m
+            try:
+                return scorer.score_snv(chrom=ident["chrom"], pos=ident["pos"], alt=ident["alt"], genome=genome)
+            except Exception as e:
+                print(f"[dedup] scoring failed for {ident['chrom']}:{ident['pos']} {ident['alt']}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, int(max_concurrency))) as ex:
+            for (key, _ref, ident), hit in zip(misses, ex.map(_one, misses)):
+                if hit is None:
+                    stats["n_failed"] += 1
+                    failed.add(key)
+                    continue
+                cache.put(key, _store_record_from_modal(hit), **ident)
+                stats["n_scored"] += 1
+        cache.flush()
+    return stats, failed
+
+
+def compute_features_for_celllines(
+    mids: List[str],
+    *,
+    muts: Union[pd.DataFrame, OmicsShards],
+    lineage_by_mid: Dict[str, str],
+    max_variants: int,
+    cache: VariantScoreStore,
+    scorer: Optional[Evo2VariantScorer],
+    use_cache_only: bool,
+    score_identity: Dict[str, Any],
+    max_concurrency: int = 1,
+    flush_every: int = 1,
+    genome: str = "hg38",
+    failed_keys: Optional[Set[str]] = None,
+) -> Dict[str, CellLineFeatures]:
+    """Compute features for many cell lines, optionally in a bounded thread pool.
+
+    Mutations are grouped by ModelID once (no per-line full-frame filter), or read lazily per line
+    from on-disk shards when `muts` is an `OmicsShards` (see `input_cache.stream_filter_omics`). Lines run concurrently
+    (scoring is I/O-bound); progress and store checkpoints stream as lines complete, and the
+    returned dict is always ordered like `mids` so downstream results stay deterministic.
     """
-    by_gene: Dict[str, List[float]] = {}
-    global_vals: List[float] = []
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    get_muts = mutations_getter(muts)
 
-    for f in train_feats.values():
-        for g, v in (f.gene_raw_max or {}).items():
-            by_gene.setdefault(g, []).append(float(v))
-            global_vals.append(float(v))
+    def _one(mid: str) -> CellLineFeatures:
+        return compute_features_for_cellline(
+            model_id=mid,
+            lineage=lineage_by_mid.get(mid, "Unknown"),
+            muts=get_muts(mid),
+            max_variants=max_variants,
+            cache=cache,
+            scorer=scorer,
+            use_cache_only=use_cache_only,
+            score_identity=score_identity,
+            genome=genome,
+            failed_keys=failed_keys,
+        )
+
+    done: Dict[str, CellLineFeatures] = {}
 
-    # Stabilize: ensure 0.0 is present for each gene and globally
-    for g in list(by_gene.keys()):
-        by_gene[g].append(0.0)
-        by_gene[g].sort()
+    def _on_done(i: int, mid: str) -> None:
+        f = done[mid]
+        if not use_cache_only:
+            print(f"[progress] {i}/{len(mids)} ModelID={mid} scored={f.n_variants_scored}/{f.n_variants_considered}")
+        if (i % max(1, int(flush_every))) == 0:
+            cache.flush()
 
-    global_vals.append(0.0)
-    global_vals.sort()
-    by_gene['__GLOBAL__'] = global_vals
-    return by_gene
+    n_workers = max(1, int(max_concurrency))
+    if n_workers == 1:
+        for i, mid in enumerate(mids, start=1):
+            done[mid] = _one(mid)
+            _on_done(i, mid)
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as ex:
+            futs = {ex.submit(_one, mid): mid for mid in mids}
+            for i, fut in enumerate(as_completed(futs), start=1):
+                mid = futs[fut]
+                done[mid] = fut.result()
+                _on_done(i, mid)
 
+    cache.flush()
+    return {mid: done[mid] for mid in mids}
 
-def percentile(sorted_vals: List[float], x: float) -> float:
-    """Empirical percentile in [0,1] using bisect_right."""
-    import bisect
 
-    if not sorted_vals:
-        return 0.0
-    i = bisect.bisect_right(sorted_vals, float(x))
-    return i / float(len(sorted_vals))
+def build_gene_calibrator(train_table: FeatureTable) -> GeneCalibrator:
+    """Build per-gene empirical distributions on TRAIN only.
+
+    Returns: packed GeneCalibrator (gene -> sorted raw disruptions, plus '__GLOBAL__' fallback).
+    """
+    return GeneCalibrator.from_gene_matrix(train_table.raw, train_table.observed, train_table.genes)
+
 
+def calibrated_gene_score(calib: GeneCalibrator, gene: str, raw: float) -> float:
+    return calib.score(gene, raw)
 
-def calibrated_gene_score(calib: Dict[str, List[float]], gene: str, raw: float) -> float:
-    gene = str(gene).upper()
-    if gene in calib:
-        return percentile(calib[gene], raw)
-    return percentile(calib.get('__GLOBAL__', [0.0]), raw)
+
+# Calibrated SP buckets (gene sets are fixed; resolved to columns once)
+SP_CLASSES = ["PARP", "ATR", "WEE1", "DNA_PK"]
+SP_CALIBRATED_BUCKETS: Dict[str, List[str]] = {
+    "PARP": sorted(HRR_GENES | BER_GENES),
+    # ATR axis driver set (checkpoint + replication stress regulators)
+    "ATR": sorted(set().union(ATR_AXIS_GENES, CHECKPOINT_GENES, {"ATM", "CHEK2", "ARID1A"})),
+    "WEE1": sorted(CHECKPOINT_GENES),
+    "DNA_PK": sorted(DNAPK_GENES),
+}
+SP_CALIBRATED_GENES: List[str] = sorted(set().union(*SP_CALIBRATED_BUCKETS.values()))
+_SP_BUCKET_COLS = {
+    cls: [SP_CALIBRATED_GENES.index(g) for g in genes] for cls, genes in SP_CALIBRATED_BUCKETS.items()
+}
+
+
+def score_classes_sp_calibrated_matrix(table: FeatureTable, calib: GeneCalibrator) -> np.ndarray:
+    """Calibrated SP class scores for every line in `table`: (N, 4) in SP_CLASSES order.
+
+    Unobserved genes contribute the percentile of raw=0.0 (same as the per-line rule).
+    """
+    pct = calib.percentiles(table.columns(SP_CALIBRATED_GENES), SP_CALIBRATED_GENES)
+    return np.stack([pct[:, _SP_BUCKET_COLS[c]].max(axis=1) for c in SP_CLASSES], axis=1)
 
 
-def score_classes_sp_calibrated(feat: CellLineFeatures, calib: Dict[str, List[float]]) -> Dict[str, float]:
+def score_classes_sp_calibrated(feat: CellLineFeatures, calib: GeneCalibrator) -> Dict[str, float]:
     """Compute SP class scores using calibrated (gene-specific) disruption."""
-    gmax = feat.gene_raw_max or {}
+    row = score_classes_sp_calibrated_matrix(FeatureTable.from_records([feat], genes=SP_CALIBRATED_GENES), calib)[0]
+    return {c: float(v) for c, v in zip(SP_CLASSES, row)}
 
-    def g(gene: str) -> float:
-        return calibrated_gene_score(calib, gene, float(gmax.get(gene, 0.0)))
 
-    parp = max([g(x) for x in (HRR_GENES | BER_GENES)] or [0.0])
+def build_feature_table(feats: Dict[str, CellLineFeatures]) -> FeatureTable:
+    """Columnar (lines × DDR genes) table from per-line scoring results (see feature_table.py)."""
+    return FeatureTable.from_records(feats.values(), genes=sorted(DDR_BROAD))
 
-    # ATR axis driver set (checkpoint + replication stress regulators)
-    atr_driver = set().union(ATR_AXIS_GENES, CHECKPOINT_GENES, {"ATM", "CHEK2", "ARID1A"})
-    atr = max([g(x) for x in atr_driver] or [0.0])
 
-    wee1 = max([g(x) for x in CHECKPOINT_GENES] or [0.0])
-    dnapk = max([g(x) for x in DNAPK_GENES] or [0.0])
+def lineage_target_essentiality(depmap: Union[Dict, EssentialityIndex], lineages: List[str]) -> Dict[str, List[float]]:
+    """Per-lineage drug-target essentiality vector in SP_CLASSES order (looked up once per lineage).
 
-    return {"PARP": parp, "ATR": atr, "WEE1": wee1, "DNA_PK": dnapk}
+    `depmap` is either the genome-wide `EssentialityIndex` (one vectorized lookup) or the legacy JSON dict.
+    """
+    if isinstance(depmap, EssentialityIndex):
+        E = depmap.essentiality(lineages, [CLASS_TARGET_GENE[c] for c in SP_CLASSES])
+        return {lin: E[k].tolist() for k, lin in enumerate(lineages)}
+    return {
+        lin: [get_lineage_essentiality(depmap, lineage=lin, gene=CLASS_TARGET_GENE[c]) for c in SP_CLASSES]
+        for lin in lineages
+    }
 
 
 def score_classes_sp(feat: CellLineFeatures) -> Dict[str, float]:
@@ -537,6 +860,88 @@ def macro_f1(y_true: List[str], y_pred: List[str], labels: List[str]) -> float:
     return sum(f1s) / max(1, len(f1s))
 
 
+def sweep_thresholds(
+    y_true: List[str],
+    best_cls: List[str],
+    best_conf: np.ndarray,
+    thresholds: List[float],
+    *,
+    labels: List[str] = LABELS,
+    max_parp_fpr: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """Evaluate the rule `pred = best_cls if best_conf >= thr else NONE` for every threshold at once.
+
+    Rows are sorted by confidence once; for each threshold the non-NONE predictions are a prefix of that
+    order, so per-class confusion counts are cumulative sums read at `searchsorted` positions.
+    Cost is O(n log n + T·K) instead of O(T·n). Returns per-threshold arrays
+    (macro_f1, accuracy, parp_fpr, feasible) in the order of `thresholds`.
+    Metrics match `macro_f1` / the per-row loop exactly.
+    """
+    thr = np.asarray(list(thresholds), dtype=np.float64)
+    conf = np.asarray(best_conf, dtype=np.float64)
+    n = len(y_true)
+    order = np.argsort(-conf, kind="stable")
+    conf_desc = conf[order]
+    yt = np.asarray(y_true, dtype=object)[order]
+    pc = np.asarray(best_cls, dtype=object)[order]
+
+    # k[t] = number of rows with conf >= thr[t] (prefix length in descending order)
+    k = n - np.searchsorted(conf_desc[::-1], thr, side="left")
+
+    def _prefix(mask: np.ndarray) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])[k]
+
+    f1s = []
+    correct = np.zeros(len(thr), dtype=np.int64)
+    for l in labels:
+        if l == "NONE":
+            continue
+        tp = _prefix((pc == l) & (yt == l))
+        n_pred = _prefix(pc == l)
+        n_true = int(np.sum(yt == l))
+        precision = tp / np.maximum(1, n_pred)
+        recall = tp / max(1, n_true)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            f1 = np.where(precision + recall == 0, 0.0, 2 * precision * recall / (precision + recall))
+        f1s.append(f1)
+        correct += tp
+    mf1 = np.mean(f1s, axis=0) if f1s else np.zeros(len(thr))
+
+    # Rows outside the prefix are predicted NONE; rows inside whose best class is NONE are too.
+    is_none = yt == "NONE"
+    correct += int(np.sum(is_none)) - _prefix(is_none & (pc != "NONE"))
+    accuracy = correct / max(1, n)
+
+    non_parp = yt != "PARP"
+    parp_fpr = _prefix(non_parp & (pc == "PARP")) / max(1, int(np.sum(non_parp)))
+    feasible = np.ones(len(thr), dtype=bool) if max_parp_fpr is None else parp_fpr <= max_parp_fpr
+    return {"macro_f1": mf1, "accuracy": accuracy, "parp_fpr": parp_fpr, "feasible": feasible}
+
+
+def _best_threshold(sweep: Dict[str, np.ndarray], thresholds: List[float], key: str) -> Dict[str, float]:
+    """First threshold (grid order) with maximal macro-F1 among feasible ones (same as the strict `>` loop)."""
+    best = {key: 0.0, "macro_f1": -1.0, "parp_fpr": 1.0, "accuracy": 0.0}
+    if not len(thresholds) or not sweep["feasible"].any():
+        return best
+    j = int(np.argmax(np.where(sweep["feasible"], sweep["macro_f1"], -np.inf)))
+    return {
+        key: float(thresholds[j]),
+        "macro_f1": float(sweep["macro_f1"][j]),
+        "parp_fpr": float(sweep["parp_fpr"][j]),
+        "accuracy": float(sweep["accuracy"][j]),
+    }
+
+
+def threshold_grid(start: float, stop: float, step: float) -> List[float]:
+    """Inclusive grid start..stop at `step` (rounded to the step's precision)."""
+    step = float(step)
+    if step <= 0:
+        raise ValueError("threshold grid step must be > 0")
+    n = int(np.floor((float(stop) - float(start)) / step + 1e-9)) + 1
+    digits = max(3, int(np.ceil(-np.log10(step))) + 3)
+    return [round(float(start) + i * step, digits) for i in range(n)]
+
+
 def tune_none_threshold(
     mids: List[str],
     labels_by_mid: Dict[str, str],
@@ -548,156 +953,344 @@ def tune_none_threshold(
     """Tune NONE threshold on training set only (no leakage).
 
     Objective: maximize macro-F1 subject to optional PARP false-positive rate constraint.
+    Best class/score per line is computed once; all grid values are swept together (`sweep_thresholds`).
 """
-    best = {"none_threshold": 0.0, "macro_f1": -1.0, "parp_fpr": 1.0, "accuracy": 0.0}
-    for thr in grid:
-        y_true = [labels_by_mid[m] for m in mids]
-        y_pred = [predict_from_scores(score_by_mid[m], none_threshold=thr) for m in mids]
+    y_true = [labels_by_mid[m] for m in mids]
+    best_cls, best_conf = [], []
+    for m in mids:
+        c, v = max(score_by_mid[m].items(), key=lambda kv: kv[1])
+        best_cls.append(c)
+        best_conf.append(float(v))
+    sweep = sweep_thresholds(y_true, best_cls, np.asarray(best_conf), grid, max_parp_fpr=max_parp_fpr)
+    return _best_threshold(sweep, grid, "none_threshold")
+
+
+def tune_prob_threshold(
+    y_true: List[str],
+    prob: np.ndarray,
+    classes: List[str],
+    *,
+    grid: List[float],
+    max_parp_fpr: Optional[float],
+) -> Dict[str, float]:
+    """Tune a probability threshold for predicting non-NONE.
+
+    Rule:
+    - compute best non-NONE class probability
+    - if best_non_none_prob < thr => NONE
+    - else => argmax over non-NONE classes
+    """
+    idx = {c: i for i, c in enumerate(classes)}
+    non_none = [c for c in classes if c != "NONE"]
+    sub = np.asarray(prob)[:, [idx[c] for c in non_none]]
+    j = np.argmax(sub, axis=1)
+    best_cls = [non_none[int(x)] for x in j]
+    best_p = sub[np.arange(sub.shape[0]), j]
+    sweep = sweep_thresholds(list(y_true), best_cls, best_p, grid, max_parp_fpr=max_parp_fpr)
+    return _best_threshold(sweep, grid, "prob_threshold")
+
+
+def pred_from_prob(prob_row: np.ndarray, classes: List[str], prob_threshold: float) -> str:
+    idx = {c: i for i, c in enumerate(classes)}
+    non_none = [c for c in classes if c != "NONE"]
+    non_none_idx = [idx[c] for c in non_none]
+    sub = prob_row[non_none_idx]
+    j = int(np.argmax(sub))
+    best_cls = non_none[j]
+    best_p = float(sub[j])
+    return "NONE" if best_p < prob_threshold else best_cls
+
+
+def evaluate_split(
+    train_list: List[str],
+    test_list: List[str],
+    *,
+    labels_by_mid: Dict[str, str],
+    table: FeatureTable,
+    depmap: Dict,
+    args: argparse.Namespace,
+    calib: Optional[GeneCalibrator] = None,
+) -> Dict[str, Any]:
+    """Fit/tune every method on `train_list` and report TRAIN/TEST metrics (no leakage).
+
+    Everything split-dependent lives here (gene calibrator, NONE/probability threshold tuning, LR fits),
+    so the single-split run and each CV fold share one code path. Module-level so it can run in a
+    process pool.
+    """
+    chosen = sorted(set(train_list) | set(test_list))
+    sub = table.take(chosen)
+    pos = {mid: i for i, mid in enumerate(chosen)}
+    train_rows = np.array([pos[m] for m in train_list], dtype=np.int64)
+
+    def eval_on(mids: List[str], pred_by_mid: Dict[str, str]) -> Dict:
+        y_true = [labels_by_mid[mid] for mid in mids]
+        y_pred = [pred_by_mid.get(mid, "NONE") for mid in mids]
 
         acc = sum(1 for t, p in zip(y_true, y_pred) if t == p) / max(1, len(y_true))
         mf1 = macro_f1(y_true, y_pred, LABELS)
+        cm = confusion_matrix(y_true, y_pred, LABELS)
 
         non_parp_idx = [i for i, t in enumerate(y_true) if t != "PARP"]
         parp_fp = sum(1 for i in non_parp_idx if y_pred[i] == "PARP")
         parp_fpr = parp_fp / max(1, len(non_parp_idx))
 
-        if max_parp_fpr is not None and parp_fpr > max_parp_fpr:
-            continue
-
-        if mf1 > best["macro_f1"]:
-            best = {"none_threshold": float(thr), "macro_f1": float(mf1), "parp_fpr": float(parp_fpr), "accuracy": float(acc)}
-
-    return best
+        return {
+            "accuracy": acc,
+            "macro_f1": mf1,
+            "parp_false_positive_rate": parp_fpr,
+            "confusion_matrix": cm,
+        }
 
+    preds: Dict[str, Dict[str, str]] = {}
 
-def _one_hot(y_idx: List[int], n_classes: int) -> np.ndarray:
-    Y = np.zeros((len(y_idx), n_classes), dtype=np.float64)
-    for i, c in enumerate(y_idx):
-        Y[i, int(c)] = 1.0
-    return Y
+    # Baseline: Always NONE
+    preds["Always NONE"] = {mid: "NONE" for mid in chosen}
 
+    # P-only baseline (gene-bucket presence; uses whatever S scores exist)
+    parp_hit = (sub.bucket_max(HRR_GENES) > 0) | (sub.bucket_max(BER_GENES) > 0)
+    atr_hit = (sub.bucket_max(ATR_AXIS_GENES) > 0) | (sub.bucket_max(DDR_BROAD) > 0)
+    p_only = np.select(
+        [sub.n_scored == 0, parp_hit, atr_hit, sub.bucket_max(CHECKPOINT_GENES) > 0, sub.bucket_max(DNAPK_GENES) > 0],
+        ["NONE", "PARP", "ATR", "WEE1", "DNA_PK"],
+        default="NONE",
+    )
+    preds["P-only"] = dict(zip(chosen, p_only.tolist()))
 
-def softmax(z: np.ndarray) -> np.ndarray:
-    z = z - np.max(z, axis=1, keepdims=True)
-    ez = np.exp(z)
-    return ez / np.sum(ez, axis=1, keepdims=True)
+    # Build gene calibrator on TRAIN only (SPE doctrine: gene-specific calibration)
+    if calib is None:
+        calib = build_gene_calibrator(sub.take(train_list))
 
+    # SP / SPD class scores as (lines × class) matrices; D = per-lineage target essentiality
+    sp_mat = score_classes_sp_calibrated_matrix(sub, calib)
+    ess_mat = sub.lineage_matrix(lineage_target_essentiality(depmap, sub.lineages), len(SP_CLASSES))
+    spd_mat = sp_mat * ess_mat
 
-def fit_softmax_regression(
-    X: np.ndarray,
-    y: List[str],
-    classes: List[str],
-    *,
-    lr: float = 0.5,
-    reg: float = 1e-3,
-    steps: int = 2000,
-    seed: int = 1337,
-) -> Dict[str, Any]:
-    """Train-only multinomial logistic regression (softmax) with L2.
+    # Score dictionaries (tuning / thresholded prediction)
+    sp_scores: Dict[str, Dict[str, float]] = {mid: dict(zip(SP_CLASSES, sp_mat[i].tolist())) for i, mid in enumerate(chosen)}
+    spd_scores: Dict[str, Dict[str, float]] = {mid: dict(zip(SP_CLASSES, spd_mat[i].tolist())) for i, mid in enumerate(chosen)}
 
-    Returns dict containing W, bias, feature scaling params, and class list.
-    """
-    rng = np.random.default_rng(seed)
+    # Default (fixed) thresholds
+    preds["SP"] = {mid: predict_from_scores(sp_scores[mid], none_threshold=args.none_threshold) for mid in chosen}
+    preds["SPD"] = {mid: predict_from_scores(spd_scores[mid], none_threshold=args.none_threshold) for mid in chosen}
 
-    class_to_idx = {c: i for i, c in enumerate(classes)}
-    y_idx = [class_to_idx.get(lbl, class_to_idx["NONE"]) for lbl in y]
+    tuning = {}
+    if args.tune_none_threshold:
+        grid = threshold_grid(0.0, 2.0, args.threshold_grid_step)  # 0.00..2.00
+        tuning["SP"] = tune_none_threshold(
+            mids=train_list,
+            labels_by_mid=labels_by_mid,
+            score_by_mid=sp_scores,
+            grid=grid,
+            max_parp_fpr=args.max_parp_fpr,
+        )
 
-    X = X.astype(np.float64)
-    mu = X.mean(axis=0)
-    sigma = X.std(axis=0)
-    sigma[sigma < 1e-8] = 1.0
-    Xn = (X - mu) / sigma
+        tuning["SPD"] = tune_none_threshold(
+            mids=train_list,
+            labels_by_mid=labels_by_mid,
+            score_by_mid=spd_scores,
+            grid=grid,
+            max_parp_fpr=args.max_parp_fpr,
+        )
 
-    n, d = Xn.shape
-    k = len(classes)
+        # apply tuned thresholds
+        preds["SP"] = {mid: predict_from_scores(sp_scores[mid], none_threshold=tuning["SP"]["none_threshold"]) for mid in chosen}
+        preds["SPD"] = {mid: predict_from_scores(spd_scores[mid], none_threshold=tuning["SPD"]["none_threshold"]) for mid in chosen}
 
-    W = 0.01 * rng.standard_normal((k, d))
-    b = np.zeros((k,), dtype=np.float64)
+    # Learned combiner (train-only): softmax regression over SP/SPD score vectors
+    # Feature sets (column slices of the score / essentiality matrices)
+    n_scored = sub.n_scored.astype(np.float64)[:, None]
+    X_all_sp = np.hstack([sp_mat, n_scored])
+    X_all_spd = np.hstack([spd_mat, n_scored, ess_mat])
 
-    Y = _one_hot(y_idx, k)
+    # Train models
+    y_train = [labels_by_mid[m] for m in train_list]
+    X_train_sp = X_all_sp[train_rows]
+    X_train_spd = X_all_spd[train_rows]
+    # Both combiners are fit in one batched solve (SP is zero-padded to the SPD feature width).
+    lr_sp, lr_spd = fit_softmax_regression_batch(
+        [X_train_sp, X_train_spd],
+        [y_train, y_train],
+        LABELS,
+        reg=1e-3,
+        solver=args.lr_solver,
+        tol=args.lr_tol,
+        max_iter=args.lr_max_iter,
+        lr=0.5,
+        steps=2000,
+        seeds=[args.seed, args.seed],
+    )
 
-    for _ in range(int(steps)):
-        logits = Xn @ W.T + b
-        P = softmax(logits)
-        # grad
-        G = (P - Y) / max(1, n)
-        dW = G.T @ Xn + reg * W
-        db = G.sum(axis=0)
-        W -= lr * dW
-        b -= lr * db
+    # Tune probability threshold on train only (safety constraint supported)
+    grid_p = threshold_grid(0.0, 0.9, args.threshold_grid_step)  # 0.00..0.90
+    prob_train_sp = predict_softmax(lr_sp, X_train_sp)
+    prob_train_spd = predict_softmax(lr_spd, X_train_spd)
+    tuning["LR_SP"] = tune_prob_threshold(y_train, prob_train_sp, LABELS, grid=grid_p, max_parp_fpr=args.max_parp_fpr)
+    tuning["LR_SPD"] = tune_prob_threshold(y_train, prob_train_spd, LABELS, grid=grid_p, max_parp_fpr=args.max_parp_fpr)
 
-    return {"classes": classes, "W": W, "b": b, "mu": mu, "sigma": sigma}
+    # Predict on all chosen
+    prob_all_sp = predict_softmax(lr_sp, X_all_sp)
+    prob_all_spd = predict_softmax(lr_spd, X_all_spd)
+    preds["LR-SP"] = {mid: pred_from_prob(prob_all_sp[i], LABELS, tuning["LR_SP"]["prob_threshold"]) for i, mid in enumerate(chosen)}
+    preds["LR-SPD"] = {mid: pred_from_prob(prob_all_spd[i], LABELS, tuning["LR_SPD"]["prob_threshold"]) for i, mid in enumerate(chosen)}
 
+    results = []
+    for name, pred in preds.items():
+        results.append({
+            "name": name,
+            "train": eval_on(train_list, pred),
+            "test": eval_on(test_list, pred),
+        })
 
-def predict_softmax(
-    model: Dict[str, Any],
-    X: np.ndarray,
-) -> np.ndarray:
-    X = X.astype(np.float64)
-    mu = model["mu"]; sigma = model["sigma"]
-    Xn = (X - mu) / sigma
-    W = model["W"]; b = model["b"]
-    logits = Xn @ W.T + b
-    return softmax(logits)
+    return {
+        "results": results,
+        "tuning": tuning,
+        "calibrator": calib,
+        "lr_solver": {
+            "solver": args.lr_solver,
+            "tol": float(args.lr_tol),
+            "max_iter": int(args.lr_max_iter),
+            "LR_SP": {"n_iter": lr_sp["n_iter"], "converged": lr_sp["converged"]},
+            "LR_SPD": {"n_iter": lr_spd["n_iter"], "converged": lr_spd["converged"]},
+        },
+    }
 
 
-def tune_prob_threshold(
-    y_true: List[str],
-    prob: np.ndarray,
-    classes: List[str],
+def stratified_folds(
+    mids: List[str],
+    labels_by_mid: Dict[str, str],
     *,
-    grid: List[float],
-    max_parp_fpr: Optional[float],
-) -> Dict[str, float]:
-    """Tune a probability threshold for predicting non-NONE.
-
-    Rule:
-    - compute best non-NONE class probability
-    - if best_non_none_prob < thr => NONE
-    - else => argmax over non-NONE classes
-    """
-    idx = {c: i for i, c in enumerate(classes)}
-    non_none = [c for c in classes if c != "NONE"]
-    non_none_idx = [idx[c] for c in non_none]
-
-    best = {"prob_threshold": 0.0, "macro_f1": -1.0, "parp_fpr": 1.0, "accuracy": 0.0}
+    n_folds: int,
+    n_repeats: int,
+    seed: int,
+) -> List[Tuple[int, int, List[str], List[str]]]:
+    """Repeated stratified K-fold: [(repeat, fold, train_ids, test_ids), ...] (deterministic per seed)."""
+    by_lab: Dict[str, List[str]] = {l: [] for l in LABELS}
+    for mid in sorted(mids):
+        by_lab[labels_by_mid.get(mid, "NONE")].append(mid)
+
+    out: List[Tuple[int, int, List[str], List[str]]] = []
+    for r in range(int(n_repeats)):
+        rng = random.Random(int(seed) + r)
+        fold_of: Dict[str, int] = {}
+        offset = 0
+        for lab in LABELS:
+            ids = list(by_lab.get(lab, []))
+            rng.shuffle(ids)
+            for i, mid in enumerate(ids):
+                # continue the round-robin across labels so small classes don't all land in fold 0
+                fold_of[mid] = (offset + i) % n_folds
+            offset += len(ids)
+        for k in range(int(n_folds)):
+            test = sorted(m for m, f in fold_of.items() if f == k)
+            train = sorted(m for m, f in fold_of.items() if f != k)
+            out.append((r, k, train, test))
+    return out
 
-    for thr in grid:
-        y_pred = []
-        for i in range(prob.shape[0]):
-            sub = prob[i, non_none_idx]
-            j = int(np.argmax(sub))
-            best_cls = non_none[j]
-            best_p = float(sub[j])
-            if best_p < thr:
-                y_pred.append("NONE")
-            else:
-                y_pred.append(best_cls)
 
-        acc = sum(1 for t, p in zip(y_true, y_pred) if t == p) / max(1, len(y_true))
-        mf1 = macro_f1(y_true, y_pred, LABELS)
+def _summarize(vals: List[float]) -> Dict[str, float]:
+    a = np.asarray(vals, dtype=np.float64)
+    return {
+        "mean": float(a.mean()) if a.size else 0.0,
+        "std": float(a.std(ddof=1)) if a.size > 1 else 0.0,
+        "min": float(a.min()) if a.size else 0.0,
+        "max": float(a.max()) if a.size else 0.0,
+    }
 
-        non_parp_idx = [i for i, t in enumerate(y_true) if t != "PARP"]
-        parp_fp = sum(1 for i in non_parp_idx if y_pred[i] == "PARP")
-        parp_fpr = parp_fp / max(1, len(non_parp_idx))
 
-        if max_parp_fpr is not None and parp_fpr > max_parp_fpr:
-            continue
-        if mf1 > best["macro_f1"]:
-            best = {"prob_threshold": float(thr), "macro_f1": float(mf1), "parp_fpr": float(parp_fpr), "accuracy": float(acc)}
+def run_cross_validation(
+    chosen: List[str],
+    *,
+    labels_by_mid: Dict[str, str],
+    table: FeatureTable,
+    depmap: Dict,
+    args: argparse.Namespace,
+    results_dir: str,
+    cache_path: str,
+) -> int:
+    """Run K×R stratified folds over precomputed features (process pool) and write one CV receipt."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    folds = stratified_folds(chosen, labels_by_mid, n_folds=args.cv_folds, n_repeats=args.cv_repeats, seed=args.seed)
+    workers = int(args.cv_workers) if args.cv_workers else (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(folds)))
+    kw = dict(labels_by_mid=labels_by_mid, table=table, depmap=depmap, args=args)
+
+    if workers == 1:
+        splits = [evaluate_split(tr, te, **kw) for _, _, tr, te in folds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futs = [ex.submit(evaluate_split, tr, te, **kw) for _, _, tr, te in folds]
+            splits = [f.result() for f in futs]
+
+    per_fold = []
+    by_method: Dict[str, Dict[str, List]] = {}
+    for (r, k, tr, te), split in zip(folds, splits):
+        per_fold.append({
+            "repeat": r,
+            "fold": k,
+            "n_train": len(tr),
+            "n_test": len(te),
+            "tuning": split["tuning"],
+            "lr_solver": split["lr_solver"],
+            "methods": split["results"],
+        })
+        for m in split["results"]:
+            agg = by_method.setdefault(m["name"], {"accuracy": [], "macro_f1": [], "parp_false_positive_rate": [], "cm": []})
+            for key in ("accuracy", "macro_f1", "parp_false_positive_rate"):
+                agg[key].append(float(m["test"][key]))
+            agg["cm"].append(np.asarray(m["test"]["confusion_matrix"], dtype=np.int64))
+
+    aggregate = []
+    for name, agg in by_method.items():
+        aggregate.append({
+            "name": name,
+            "test": {
+                "accuracy": _summarize(agg["accuracy"]),
+                "macro_f1": _summarize(agg["macro_f1"]),
+                "parp_false_positive_rate": _summarize(agg["parp_false_positive_rate"]),
+                # each line is tested once per repeat → pooled matrix sums over repeats
+                "pooled_confusion_matrix": np.sum(agg["cm"], axis=0).tolist(),
+            },
+        })
 
-    return best
+    receipt = {
+        "n_cell_lines": len(chosen),
+        "n_per_class_requested": int(args.n_per_class),
+        "seed": int(args.seed),
+        "max_variants_per_line": int(args.max_variants_per_line),
+        "z_sensitive_threshold": float(args.z_sensitive_threshold),
+        "min_margin": float(args.min_margin),
+        "cv": {"folds": int(args.cv_folds), "repeats": int(args.cv_repeats), "workers": workers, "n_splits": len(folds)},
+        "none_threshold": float(args.none_threshold),
+        "tune_none_threshold": bool(args.tune_none_threshold),
+        "max_parp_fpr": None if args.max_parp_fpr is None else float(args.max_parp_fpr),
+        "threshold_grid_step": float(args.threshold_grid_step),
+        "use_cache_only": bool(args.use_cache_only),
+        "cache_path": os.path.relpath(cache_path, results_dir),
+        "label_distribution": dict(Counter([labels_by_mid[mid] for mid in chosen])),
+        "aggregate": aggregate,
+        "folds": per_fold,
+        "notes": [
+            "Repeated stratified K-fold CV: features (Evo2 S scores) are computed once; the gene calibrator, "
+            "threshold tuning and LR fits are redone on each fold's TRAIN split only.",
+            "Aggregate std uses ddof=1 across all K×R test folds.",
+        ],
+    }
 
+    out_path = os.path.join(results_dir, f"{args.out_prefix}_cv{args.cv_folds}x{args.cv_repeats}_n{len(chosen)}.json")
+    with open(out_path, "w") as f:
+        json.dump(receipt, f, indent=2)
 
-def pred_from_prob(prob_row: np.ndarray, classes: List[str], prob_threshold: float) -> str:
-    idx = {c: i for i, c in enumerate(classes)}
-    non_none = [c for c in classes if c != "NONE"]
-    non_none_idx = [idx[c] for c in non_none]
-    sub = prob_row[non_none_idx]
-    j = int(np.argmax(sub))
-    best_cls = non_none[j]
-    best_p = float(sub[j])
-    return "NONE" if best_p < prob_threshold else best_cls
+    print("Wrote CV receipt:", out_path)
+    for m in aggregate:
+        t = m["test"]
+        print(
+            m["name"],
+            "test_acc=", round(t["accuracy"]["mean"], 3), "±", round(t["accuracy"]["std"], 3),
+            "test_macro_f1=", round(t["macro_f1"]["mean"], 3), "±", round(t["macro_f1"]["std"], 3),
+            "test_parp_fpr=", round(t["parp_false_positive_rate"]["mean"], 3),
+        )
+    return 0
 
 
 def main() -> int:
@@ -712,13 +1305,31 @@ def main() -> int:
     ap.add_argument("--tune_none_threshold", action="store_true", help="Tune NONE threshold on train only (no leakage)")
     ap.add_argument("--max_parp_fpr", type=float, default=None, help="Optional constraint during tuning: PARP FPR <= this value on train")
     ap.add_argument("--use_cache_only", action="store_true", help="Do not call Evo2; only use cached variant scores")
-    ap.add_argument("--cache_path", type=str, default="")
+    ap.add_argument("--cache_path", type=str, default="", help="Variant-score store (SQLite). Default: results/evo2_variant_scores.sqlite (shared across SL benchmarks)")
+    ap.add_argument("--legacy_json_cache", type=str, default="", help="Optional legacy JSON cache to import into the store (default: results/{out_prefix}_evo2_cache.json if present)")
     ap.add_argument("--evo_api_base", type=str, default="", help="If set, use local backend /api/evo endpoints for S (multi-window + exon)")
     ap.add_argument("--evo_api_model_id", type=str, default="evo2_1b")
     ap.add_argument("--evo_api_timeout_s", type=float, default=60.0)
     ap.add_argument("--evo_api_exon_flank", type=int, default=4096)
+    ap.add_argument("--evo_api_batch_route", type=str, default="/api/evo/score_variants_batch", help="Batch scoring route; falls back to per-variant calls if the backend lacks it ('' disables)")
+    ap.add_argument("--evo_api_max_in_flight", type=int, default=8, help="Upper bound on in-flight requests; the adaptive (AIMD) limit moves below it")
+    ap.add_argument("--evo_api_max_retries", type=int, default=4, help="Retries per request on 429/5xx/timeouts (jittered exponential backoff)")
+    ap.add_argument("--evo_api_target_latency_s", type=float, default=None, help="Halve the in-flight limit when a request is slower than this (default: errors only)")
     ap.add_argument("--out_prefix", type=str, default="gdsc2_multimodal_spd")
-    ap.add_argument("--flush_cache_every", type=int, default=1, help="Write Evo2 cache to disk every N cell lines (default: 1)")
+    ap.add_argument("--no_input_cache", action="store_true", help="Parse Omics CSV / GDSC2 xlsx directly instead of the columnar cache (data/cache/)")
+    ap.add_argument("--max_concurrency", type=int, default=1, help="Score up to N cell lines concurrently (thread pool; 1 = sequential)")
+    ap.add_argument("--flush_cache_every", type=int, default=1, help="Commit variant-score store every N cell lines (default: 1)")
+    ap.add_argument("--no_variant_dedup", action="store_true", help="Score variants per line instead of once per unique (chrom, pos, ref, alt) across all lines")
+    ap.add_argument("--lr_solver", type=str, default="newton", choices=["newton", "gd"], help="LR-SP/LR-SPD trainer: damped Newton to tolerance, or legacy fixed-step gradient descent")
+    ap.add_argument("--lr_tol", type=float, default=1e-6, help="Newton stop: max |gradient| tolerance")
+    ap.add_argument("--lr_max_iter", type=int, default=100, help="Newton iteration cap")
+    ap.add_argument("--threshold_grid_step", type=float, default=0.05, help="Step of the NONE / probability threshold grids (tuning is vectorized, so fine steps are cheap)")
+    ap.add_argument("--cv_folds", type=int, default=0, help="Repeated stratified K-fold CV over the chosen lines (>=2 enables; replaces the single split)")
+    ap.add_argument("--cv_repeats", type=int, default=1, help="Number of CV repeats (reshuffled per repeat)")
+    ap.add_argument("--cv_workers", type=int, default=0, help="Processes for CV folds (0 = cpu_count)")
+    ap.add_argument("--save_calibrator", action="store_true", help="Write the TRAIN gene calibrator to results/{out_prefix}_gene_calibrator.npz")
+    ap.add_argument("--load_calibrator", type=str, default="", help="Reuse a saved gene calibrator (.npz) instead of rebuilding it from TRAIN (single split only)")
+    ap.add_argument("--depmap_index", type=str, nargs="?", const="default", default="", help="Ground D on the genome-wide DepMap essentiality index (optional dir; default: data/depmap_essentiality_index). Without this flag the JSON summaries are used")
     args = ap.parse_args()
 
     random.seed(args.seed)
@@ -744,21 +1355,22 @@ def main() -> int:
     model_df["OncotreeLineage"] = model_df["OncotreeLineage"].astype(str)
     model_df = model_df[["ModelID", "COSMIC_ID", "OncotreeLineage"]].drop_duplicates()
 
-    gdsc = pd.read_excel(gdsc_path, engine="openpyxl", usecols=["COSMIC_ID", "DRUG_NAME", "Z_SCORE", "AUC"])
+    gdsc_cols = ["COSMIC_ID", "DRUG_NAME", "Z_SCORE", "AUC"]
+    if args.no_input_cache:
+        gdsc = pd.read_excel(gdsc_path, engine="openpyxl", usecols=gdsc_cols)
+    else:
+        gdsc = load_gdsc2(gdsc_path, columns=gdsc_cols, drug_names=DRUG_TO_CLASS.keys())
     gdsc["COSMIC_ID"] = gdsc["COSMIC_ID"].apply(normalize_cosmic_id)
     gdsc = gdsc.dropna(subset=["COSMIC_ID", "DRUG_NAME"])
     gdsc = gdsc[gdsc["DRUG_NAME"].isin(set(DRUG_TO_CLASS.keys()))].copy()
     gdsc["drug_class"] = gdsc["DRUG_NAME"].map(DRUG_TO_CLASS)
     gdsc = gdsc.merge(model_df, on="COSMIC_ID", how="inner")
 
-    # Label each cell line
-    labels_by_mid: Dict[str, str] = {}
-    lineage_by_mid: Dict[str, str] = {}
-    for mid, g in gdsc.groupby("ModelID"):
-        mid = str(mid)
-        lineage_by_mid[mid] = str(g["OncotreeLineage"].iloc[0])
-        z_by_class = g.groupby("drug_class")["Z_SCORE"].mean().to_dict()
-        labels_by_mid[mid] = compute_label_from_z(z_by_class, args.z_sensitive_threshold, args.min_margin)
+    # Label each cell line (vectorized over the whole panel; same rule as compute_label_from_z)
+    labels_by_mid: Dict[str, str] = compute_labels(gdsc, args.z_sensitive_threshold, args.min_margin)
+    lineage_by_mid: Dict[str, str] = {
+        str(mid): str(lin) for mid, lin in gdsc.groupby(gdsc["ModelID"].astype(str))["OncotreeLineage"].first().items()
+    }
 
     # Stratified sample
     by_label: Dict[str, List[str]] = {l: [] for l in LABELS}
@@ -796,21 +1408,38 @@ def main() -> int:
     train_ids = sorted(set(train_ids))
     test_ids = set(sorted(test_ids))
 
-    # Load depmap grounding
-    depmap = load_depmap_grounding(depmap_grounding_path)
-
-    # Load cache
-    cache: Dict[str, Dict] = {}
-    if args.cache_path:
+    # Load depmap grounding (JSON summaries; the genome-wide memory-mapped index only when asked for)
+    depmap: Union[Dict, EssentialityIndex]
+    if args.depmap_index:
+        depmap_index_path = (
+            os.path.join(data_dir, "depmap_essentiality_index") if args.depmap_index == "default" else args.depmap_index
+        )
+        depmap = load_index_if_present(depmap_index_path)
+        if depmap is None:
+            raise SystemExit(f"--depmap_index: no DepMap essentiality index at {depmap_index_path}")
+        print(f"[depmap] grounding: genome-wide index {depmap_index_path} ({len(depmap.genes)} genes)")
+    else:
+        depmap = load_depmap_grounding(depmap_grounding_path)
+        print(f"[depmap] grounding: JSON summaries {depmap_grounding_path} (pass --depmap_index for the genome-wide index)")
+
+    # Open shared variant-score store (incremental writes; no full rewrites)
+    legacy_json = args.legacy_json_cache or os.path.join(results_dir, f"{args.out_prefix}_evo2_cache.json")
+    if args.cache_path and args.cache_path.endswith(".json"):
+        # Back-compat: a legacy JSON cache path is imported into a sibling .sqlite store
+        legacy_json = args.cache_path
+        cache_path = os.path.splitext(args.cache_path)[0] + ".sqlite"
+    elif args.cache_path:
         cache_path = args.cache_path
     else:
-        cache_path = os.path.join(results_dir, f"{args.out_prefix}_evo2_cache.json")
+        cache_path = os.path.join(results_dir, "evo2_variant_scores.sqlite")
+    cache = VariantScoreStore(cache_path)
 
-    if os.path.exists(cache_path):
-        try:
-            cache = json.load(open(cache_path))
-        except Exception:
-            cache = {}
+    if os.path.exists(legacy_json):
+        if cache.legacy_json_imported(legacy_json):
+            print(f"[cache] legacy cache {legacy_json} already imported (unchanged); skipping")
+        else:
+            n_imported = cache.import_legacy_json(legacy_json, default_model_id=modal_model_id(), force=True)
+            print(f"[cache] imported {n_imported} legacy records from {legacy_json}")
 
     scorer = None
     if not args.use_cache_only:
@@ -820,197 +1449,112 @@ def main() -> int:
                 model_id=args.evo_api_model_id,
                 timeout_s=args.evo_api_timeout_s,
                 exon_flank=args.evo_api_exon_flank,
+                batch_route=args.evo_api_batch_route,
+                max_in_flight=args.evo_api_max_in_flight,
+                max_retries=args.evo_api_max_retries,
+                target_latency_s=args.evo_api_target_latency_s,
             )
         else:
             scorer = Evo2VariantScorer()
 
+    # Store identity comes from the configured scorer (also in --use_cache_only mode)
+    if getattr(args, "evo_api_base", ""):
+        score_identity = {
+            "model_id": str(args.evo_api_model_id),
+            "windows": list(DEFAULT_EVO_WINDOWS),
+            "flank": int(args.evo_api_exon_flank),
+        }
+    else:
+        score_identity = {"model_id": modal_model_id(), "windows": None, "flank": None}
+    if scorer is not None:
+        score_identity = scorer.score_identity
+
     # Stream Omics mutations for chosen
     want = set(chosen)
     usecols_m = ["ModelID", "Chrom", "Pos", "Ref", "Alt", "VariantType", "HugoSymbol", "VepImpact"]
-    muts_chunks = []
-    for chunk in pd.read_csv(omics_path, usecols=usecols_m, chunksize=200000):
-        chunk["ModelID"] = chunk["ModelID"].astype(str)
-        sub = chunk[chunk["ModelID"].isin(want)].copy()
-        if len(sub):
-            sub["HugoSymbol"] = sub["HugoSymbol"].astype(str).str.upper()
-            sub = sub[sub["HugoSymbol"].isin(DDR_BROAD)]
-            if len(sub):
-                muts_chunks.append(sub)
-        if len(muts_chunks) and sum(len(x) for x in muts_chunks) > 400000:
-            break
-
-    muts = pd.concat(muts_chunks, ignore_index=True) if muts_chunks else pd.DataFrame(columns=usecols_m)
-
-    feats: Dict[str, CellLineFeatures] = {}
-    for i, mid in enumerate(chosen, start=1):
-        mm = muts[muts["ModelID"].astype(str) == str(mid)]
-        feats[mid] = compute_features_for_cellline(
-            model_id=mid,
-            lineage=lineage_by_mid.get(mid, "Unknown"),
-            muts=mm,
+    muts: Union[pd.DataFrame, OmicsShards]
+    if args.no_input_cache:
+        # One filtered streaming pass spilled to per-ModelID shards (bounded memory, no row cap)
+        muts = stream_filter_omics(omics_path, model_ids=want, genes=DDR_BROAD, columns=usecols_m)
+    else:
+        # Columnar cache with pushdown on ModelID + DDR gene set (see input_cache.py)
+        muts = load_omics_mutations(omics_path, columns=usecols_m, model_ids=want, genes=DDR_BROAD)
+        muts["ModelID"] = muts["ModelID"].astype(str)
+        muts["HugoSymbol"] = muts["HugoSymbol"].astype(str).str.upper()
+
+    dedup_stats: Optional[Dict[str, int]] = None
+    dedup_failed: Set[str] = set()
+    if scorer is not None and not args.use_cache_only and not args.no_variant_dedup:
+        dedup_stats, dedup_failed = prescore_unique_variants(
+            chosen,
+            muts=muts,
             max_variants=args.max_variants_per_line,
             cache=cache,
             scorer=scorer,
-            use_cache_only=bool(args.use_cache_only),
+            score_identity=score_identity,
+            max_concurrency=args.max_concurrency,
             genome="hg38",
         )
 
-        if not args.use_cache_only:
-            print(f"[progress] {i}/{len(chosen)} ModelID={mid} scored={feats[mid].n_variants_scored}/{feats[mid].n_variants_considered} cache_keys={len(cache)}")
-        if (i % max(1, int(args.flush_cache_every))) == 0:
-            with open(cache_path, "w") as f:
-                json.dump(cache, f)
+    feats = compute_features_for_celllines(
+        chosen,
+        muts=muts,
+        lineage_by_mid=lineage_by_mid,
+        max_variants=args.max_variants_per_line,
+        cache=cache,
+        scorer=scorer,
+        use_cache_only=bool(args.use_cache_only),
+        score_identity=score_identity,
+        max_concurrency=args.max_concurrency,
+        flush_every=args.flush_cache_every,
+        genome="hg38",
+        failed_keys=dedup_failed,
+    )
 
     # Save cache
-    with open(cache_path, "w") as f:
-        json.dump(cache, f)
+    cache.close()
+    if hasattr(scorer, "close"):
+        scorer.close()
+    evo_http_stats = scorer.http_stats() if hasattr(scorer, "http_stats") else None
+    if evo_http_stats and evo_http_stats["failed_calls"]:
+        print(f"⚠️  [evo_api] {evo_http_stats['failed_calls']} requests failed after retries (see receipt evo_api_http)")
+
+    # Columnar feature table (lines × DDR genes) for everything downstream of scoring
+    table = build_feature_table(feats)
+    del feats
 
     # Evaluate methods
     # Evaluate methods (report train/test; tune on train only if enabled)
     test_list = [mid for mid in chosen if mid in test_ids]
     train_list = list(train_ids)
 
-    def eval_on(mids: List[str], pred_by_mid: Dict[str, str]) -> Dict:
-        y_true = [labels_by_mid[mid] for mid in mids]
-        y_pred = [pred_by_mid.get(mid, "NONE") for mid in mids]
-
-        acc = sum(1 for t, p in zip(y_true, y_pred) if t == p) / max(1, len(y_true))
-        mf1 = macro_f1(y_true, y_pred, LABELS)
-        cm = confusion_matrix(y_true, y_pred, LABELS)
-
-        non_parp_idx = [i for i, t in enumerate(y_true) if t != "PARP"]
-        parp_fp = sum(1 for i in non_parp_idx if y_pred[i] == "PARP")
-        parp_fpr = parp_fp / max(1, len(non_parp_idx))
-
-        return {
-            "accuracy": acc,
-            "macro_f1": mf1,
-            "parp_false_positive_rate": parp_fpr,
-            "confusion_matrix": cm,
-        }
-
-    preds: Dict[str, Dict[str, str]] = {}
-
-    # Baseline: Always NONE
-    preds["Always NONE"] = {mid: "NONE" for mid in chosen}
-
-    # P-only baseline (gene-bucket presence; uses whatever S scores exist)
-    def p_only(mid: str) -> str:
-        f = feats[mid]
-        if f.n_variants_scored == 0:
-            return "NONE"
-        if f.hrr_max > 0 or f.ber_max > 0:
-            return "PARP"
-        if f.atr_axis_max > 0 or f.ddr_broad_max > 0:
-            return "ATR"
-        if f.checkpoint_max > 0:
-            return "WEE1"
-        if f.dnapk_max > 0:
-            return "DNA_PK"
-        return "NONE"
-
-    preds["P-only"] = {mid: p_only(mid) for mid in chosen}
-
-    # Build gene calibrator on TRAIN only (SPE doctrine: gene-specific calibration)
-    train_feats = {mid: feats[mid] for mid in train_list}
-    calib = build_gene_calibrator(train_feats)
-
-    # SP / SPD score dictionaries
-    sp_scores: Dict[str, Dict[str, float]] = {}
-    spd_scores: Dict[str, Dict[str, float]] = {}
-
-    for i, mid in enumerate(chosen, start=1):
-        base = score_classes_sp_calibrated(feats[mid], calib=calib)
-        sp_scores[mid] = base
-        spd_scores[mid] = apply_depmap_grounding(base, depmap=depmap, lineage=feats[mid].lineage)
-
-    # Default (fixed) thresholds
-    preds["SP"] = {mid: predict_from_scores(sp_scores[mid], none_threshold=args.none_threshold) for mid in chosen}
-    preds["SPD"] = {mid: predict_from_scores(spd_scores[mid], none_threshold=args.none_threshold) for mid in chosen}
-
-    tuning = {}
-    if args.tune_none_threshold:
-        grid = [round(x * 0.05, 3) for x in range(0, 41)]  # 0.00..2.00
-        tuning["SP"] = tune_none_threshold(
-            mids=train_list,
-            labels_by_mid=labels_by_mid,
-            score_by_mid=sp_scores,
-            grid=grid,
-            max_parp_fpr=args.max_parp_fpr,
-        )
-
-        tuning["SPD"] = tune_none_threshold(
-            mids=train_list,
+    if args.cv_folds >= 2:
+        return run_cross_validation(
+            chosen,
             labels_by_mid=labels_by_mid,
-            score_by_mid=spd_scores,
-            grid=grid,
-            max_parp_fpr=args.max_parp_fpr,
+            table=table,
+            depmap=depmap,
+            args=args,
+            results_dir=results_dir,
+            cache_path=cache_path,
         )
 
-        # apply tuned thresholds
-        preds["SP"] = {mid: predict_from_scores(sp_scores[mid], none_threshold=tuning["SP"]["none_threshold"]) for mid in chosen}
-        preds["SPD"] = {mid: predict_from_scores(spd_scores[mid], none_threshold=tuning["SPD"]["none_threshold"]) for mid in chosen}
-
-    # Learned combiner (train-only): softmax regression over SP/SPD score vectors
-    # Feature sets
-    def _feat_sp(mid: str) -> np.ndarray:
-        f = feats[mid]
-        s4 = sp_scores[mid]
-        return np.array([
-            float(s4.get("PARP", 0.0)),
-            float(s4.get("ATR", 0.0)),
-            float(s4.get("WEE1", 0.0)),
-            float(s4.get("DNA_PK", 0.0)),
-            float(f.n_variants_scored),
-        ], dtype=np.float64)
-
-    def _feat_spd(mid: str) -> np.ndarray:
-        f = feats[mid]
-        s4 = spd_scores[mid]
-        ess = [
-            get_lineage_essentiality(depmap, lineage=f.lineage, gene="PARP1"),
-            get_lineage_essentiality(depmap, lineage=f.lineage, gene="ATR"),
-            get_lineage_essentiality(depmap, lineage=f.lineage, gene="WEE1"),
-            get_lineage_essentiality(depmap, lineage=f.lineage, gene="PRKDC"),
-        ]
-        return np.array([
-            float(s4.get("PARP", 0.0)),
-            float(s4.get("ATR", 0.0)),
-            float(s4.get("WEE1", 0.0)),
-            float(s4.get("DNA_PK", 0.0)),
-            float(f.n_variants_scored),
-            float(ess[0]), float(ess[1]), float(ess[2]), float(ess[3]),
-        ], dtype=np.float64)
-
-    # Train models
-    y_train = [labels_by_mid[m] for m in train_list]
-    X_train_sp = np.stack([_feat_sp(m) for m in train_list], axis=0)
-    X_train_spd = np.stack([_feat_spd(m) for m in train_list], axis=0)
-    lr_sp = fit_softmax_regression(X_train_sp, y_train, LABELS, lr=0.5, reg=1e-3, steps=2000, seed=args.seed)
-    lr_spd = fit_softmax_regression(X_train_spd, y_train, LABELS, lr=0.5, reg=1e-3, steps=2000, seed=args.seed)
-
-    # Tune probability threshold on train only (safety constraint supported)
-    grid_p = [round(x * 0.05, 3) for x in range(0, 19)]  # 0.00..0.90
-    prob_train_sp = predict_softmax(lr_sp, X_train_sp)
-    prob_train_spd = predict_softmax(lr_spd, X_train_spd)
-    tuning["LR_SP"] = tune_prob_threshold(y_train, prob_train_sp, LABELS, grid=grid_p, max_parp_fpr=args.max_parp_fpr)
-    tuning["LR_SPD"] = tune_prob_threshold(y_train, prob_train_spd, LABELS, grid=grid_p, max_parp_fpr=args.max_parp_fpr)
-
-    # Predict on all chosen
-    X_all_sp = np.stack([_feat_sp(m) for m in chosen], axis=0)
-    X_all_spd = np.stack([_feat_spd(m) for m in chosen], axis=0)
-    prob_all_sp = predict_softmax(lr_sp, X_all_sp)
-    prob_all_spd = predict_softmax(lr_spd, X_all_spd)
-    preds["LR-SP"] = {mid: pred_from_prob(prob_all_sp[i], LABELS, tuning["LR_SP"]["prob_threshold"]) for i, mid in enumerate(chosen)}
-    preds["LR-SPD"] = {mid: pred_from_prob(prob_all_spd[i], LABELS, tuning["LR_SPD"]["prob_threshold"]) for i, mid in enumerate(chosen)}
-
-    results = []
-    for name, pred in preds.items():
-        results.append({
-            "name": name,
-            "train": eval_on(train_list, pred),
-            "test": eval_on(test_list, pred),
-        })
+    calib = GeneCalibrator.load(args.load_calibrator) if args.load_calibrator else None
+    split = evaluate_split(
+        train_list,
+        test_list,
+        labels_by_mid=labels_by_mid,
+        table=table,
+        depmap=depmap,
+        args=args,
+        calib=calib,
+    )
+    if args.save_calibrator:
+        calib_path = os.path.join(results_dir, f"{args.out_prefix}_gene_calibrator.npz")
+        split["calibrator"].save(calib_path)
+        print("Wrote gene calibrator:", calib_path)
+    tuning = split["tuning"]
+    results = split["results"]
 
     receipt = {
         "n_cell_lines": len(chosen),
@@ -1023,8 +1567,15 @@ def main() -> int:
         "none_threshold": float(args.none_threshold),
         "tune_none_threshold": bool(args.tune_none_threshold),
         "max_parp_fpr": None if args.max_parp_fpr is None else float(args.max_parp_fpr),
+        "threshold_grid_step": float(args.threshold_grid_step),
+        "gene_calibrator": args.load_calibrator or "built_on_train",
+        "depmap_grounding": "essentiality_index" if isinstance(depmap, EssentialityIndex) else "json_summaries",
         "tuning": tuning,
+        "lr_solver": split["lr_solver"],
         "use_cache_only": bool(args.use_cache_only),
+        "max_concurrency": int(args.max_concurrency),
+        "variant_dedup": dedup_stats,
+        "evo_api_http": evo_http_stats,
         "cache_path": os.path.relpath(cache_path, results_dir),
         "label_distribution": dict(Counter([labels_by_mid[mid] for mid in chosen])),
         "methods": results,
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Append-only JSONL checkpoint journal for long per-cell-line runs (resume after a crash).
+
+Format (one JSON object per line):
+- first line: {"_journal": {"version": 1, "config": {...}}}   run fingerprint (what must match to resume)
+- then:       {"model_id": "...", "status": "ok", "result": {...}, "ts": ...}
+
+Records are appended and fsync'd per batch, so at most the in-flight batch is lost on a crash.
+A torn final line (process killed mid-write) is ignored on load. If the same ModelID appears more
+than once, the last record wins. An existing non-empty journal is never truncated implicitly: pass
+`resume=True` to continue it, or `fresh=True` to start over (the old file is kept as `<path>.bak`).
+
+Usage:
+    journal = CheckpointJournal(path, config={...}, resume=args.resume)
+    done = journal.completed()          # {model_id: result} for status == "ok"
+    journal.append([(mid, result, "ok"), ...])
+    journal.close()
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+JOURNAL_VERSION = 1
+
+
+class CheckpointJournal:
+    def __init__(self, path: str, *, config: Dict[str, Any], resume: bool = False, fresh: bool = False):
+        self.path = str(path)
+        self.config = json.loads(json.dumps(config, default=str))
+        self.records: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        if resume and os.path.exists(self.path):
+            header = self._load()
+            if header is not None and header.get("config") != self.config:
+                raise SystemExit(
+                    f"Checkpoint {self.path} was written with a different configuration; "
+                    f"refusing to resume.\n  journal: {header.get('config')}\n  current: {self.config}"
+                )
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if self._torn_tail():
+                self._fh.write("\n")  # terminate a torn final record so new records start on a clean line
+            if header is None:
+                self._write_header()
+        else:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                if not fresh:
+                    raise SystemExit(
+                        f"Checkpoint {self.path} already exists; pass --resume to continue it "
+                        f"or --fresh to start over (the old journal is kept as {self.path}.bak)."
+                    )
+                os.replace(self.path, self.path + ".bak")
+                print(f"Checkpoint: previous journal moved to {self.path}.bak")
+            self._fh = open(self.path, "w", encoding="utf-8")
+            self._write_header()
+
+    def _write_header(self) -> None:
+        self._fh.write(json.dumps({"_journal": {"version": JOURNAL_VERSION, "config": self.config}}) + "\n")
+        self._sync()
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        header = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write at crash time
+                if "_journal" in obj:
+                    header = obj["_journal"]
+                elif "model_id" in obj:
+                    self.records[str(obj["model_id"])] = obj
+        return header
+
+    def _torn_tail(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _sync(self) -> None:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def completed(self) -> Dict[str, Any]:
+        """ModelID → result for every line journaled with status "ok"."""
+        return {mid: r.get("result") for mid, r in self.records.items() if r.get("status") == "ok"}
+
+    def append(self, items: Iterable[Tuple[str, Any, str]]) -> None:
+        """Append (model_id, result, status) records and fsync once."""
+        now = time.time()
+        n = 0
+        for model_id, result, status in items:
+            rec = {"model_id": str(model_id), "status": str(status), "result": result, "ts": now}
+            self.records[str(model_id)] = rec
+            self._fh.write(json.dumps(rec, default=str) + "\n")
+            n += 1
+        if n:
+            self._sync()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._sync()
+            self._fh.close()
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
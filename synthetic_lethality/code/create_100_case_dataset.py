@@ -8,9 +8,10 @@ Extends create_pilot_dataset.py to include:
 - 20 diverse cancer types
 - 10 edge cases
 """
+import argparse
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import random
 
 
@@ -47,8 +48,29 @@ def _load_depmap_context() -> dict:
     return {}
 
 
+DEPMAP_INDEX_DIRS = (
+    Path(__file__).parent / "depmap_essentiality_index",
+    Path(__file__).parent.parent / "data" / "depmap_essentiality_index",
+)
+
+# Genome-wide index; None (JSON summaries only) unless main() is asked to use it
+DEPMAP_INDEX = None
+
+
+def _load_depmap_index(path: Optional[str] = None):
+    """Genome-wide DepMap essentiality index (memory-mapped) from `path`, or the default locations."""
+    try:
+        from depmap_index import load_index_if_present
+    except Exception:
+        return None
+    for p in ([Path(path)] if path else DEPMAP_INDEX_DIRS):
+        idx = load_index_if_present(str(p))
+        if idx is not None:
+            return idx
+    return None
+
+
 def _depmap_score_for_gene(*, gene: str, disease: str) -> float:
-    ctx = _load_depmap_context()
     gene_u = gene.upper()
     # Map our disease strings to DepMap lineage strings when possible
     lineage = None
@@ -60,6 +82,11 @@ def _depmap_score_for_gene(*, gene: str, disease: str) -> float:
     elif "prostate" in d:
         lineage = "Prostate"
 
+    # Preferred: genome-wide index (covers SL partners outside GENES_DEFAULT)
+    if DEPMAP_INDEX is not None and gene_u in DEPMAP_INDEX:
+        return DEPMAP_INDEX.score(lineage, gene_u)
+
+    ctx = _load_depmap_context()
     try:
         if lineage and ctx.get("by_lineage", {}).get(lineage, {}).get(gene_u):
             return float(ctx["by_lineage"][lineage][gene_u]["essentiality_score"])
@@ -213,6 +240,23 @@ def create_100_case_dataset() -> List[Dict[str, Any]]:
 
 def main():
     """Create and save 100-case dataset."""
+    global DEPMAP_INDEX
+    ap = argparse.ArgumentParser(description="Create the 100-case SL benchmark dataset")
+    ap.add_argument("--depmap_index", type=str, nargs="?", const="default", default="",
+                    help="Ground essentiality on the genome-wide DepMap index (optional dir; default: the standard "
+                         "locations). Without this flag the JSON summaries are used")
+    args = ap.parse_args()
+
+    if args.depmap_index:
+        path = None if args.depmap_index == "default" else args.depmap_index
+        DEPMAP_INDEX = _load_depmap_index(path)
+        if DEPMAP_INDEX is None:
+            where = path or ", ".join(str(p) for p in DEPMAP_INDEX_DIRS)
+            raise SystemExit(f"--depmap_index: no DepMap essentiality index at {where}")
+        print(f"DepMap grounding: genome-wide index ({len(DEPMAP_INDEX.genes)} genes), JSON summaries as fallback")
+    else:
+        print("DepMap grounding: JSON summaries (pass --depmap_index for the genome-wide index)")
+
     print("Creating 100-case synthetic lethality benchmark dataset...")
     test_cases = create_100_case_dataset()
     output_file = Path("data/test_cases_100.json")
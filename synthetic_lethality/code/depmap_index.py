@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Genome-wide DepMap essentiality index (all CRISPRGeneEffect genes × lineages).
+
+Why this exists:
+- `depmap_essentiality_by_context.json` only covers `GENES_DEFAULT` (16 genes) and is queried by nested
+  dict walks. Grounding SL partners outside the DDR set needs every gene, and a JSON of ~18k genes ×
+  ~30 lineages × 6 stats is not a viable artifact.
+
+Layout (directory, default `depmap_essentiality_index/`):
+- `stats.npy`  float32 (L+1, G, S): row 0 = global (all models), rows 1..L = lineages; S summary stats
+- `index.json` gene / lineage / stat lookup tables + provenance
+
+`stats.npy` is opened memory-mapped, so loading is O(1) and only touched pages are read.
+Stats match `generate_depmap_by_lineage._summarize_series` (mean/median/p25/p75, essentiality_score =
+clip(-mean, 0, 1), n_models).
+
+Usage:
+    python3 depmap_index.py --raw depmap_raw.csv --model_csv ../../../data/depmap/Model.csv
+    idx = EssentialityIndex.load("depmap_essentiality_index")
+    idx.essentiality(["Ovary", "Breast"], ["PARP1", "PRKDC"])   # (2, 2) float array
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+INDEX_VERSION = 1
+GLOBAL_KEY = "__GLOBAL__"
+STATS = [
+    "depmap_mean_effect",
+    "depmap_median_effect",
+    "depmap_p25_effect",
+    "depmap_p75_effect",
+    "essentiality_score",
+    "n_models",
+]
+_S = {s: i for i, s in enumerate(STATS)}
+
+
+def _gene_symbol(col: str) -> str:
+    """'BRCA1 (672)' -> 'BRCA1'."""
+    return str(col).split(" (")[0].strip().upper()
+
+
+def _summarize_block(X: np.ndarray) -> np.ndarray:
+    """(models × genes) float32 → (genes × S) float32 summary (NaN where a gene has no data)."""
+    G = X.shape[1]
+    out = np.full((G, len(STATS)), np.nan, dtype=np.float32)
+    n = np.sum(~np.isnan(X), axis=0)
+    out[:, _S["n_models"]] = n
+    has = n > 0
+    if not has.any():
+        return out
+    Xh = X[:, has].astype(np.float64)
+    with np.errstate(all="ignore"):
+        mean = np.nanmean(Xh, axis=0)
+        p25, med, p75 = np.nanpercentile(Xh, [25, 50, 75], axis=0)
+    out[has, _S["depmap_mean_effect"]] = mean
+    out[has, _S["depmap_median_effect"]] = med
+    out[has, _S["depmap_p25_effect"]] = p25
+    out[has, _S["depmap_p75_effect"]] = p75
+    out[has, _S["essentiality_score"]] = np.clip(-mean, 0.0, 1.0)
+    return out
+
+
+def build_index(
+    raw_path: str,
+    out_dir: str,
+    *,
+    lineage_by_model: Optional[Dict[str, str]] = None,
+) -> str:
+    """Build the index from a CRISPRGeneEffect matrix (rows ModelID, cols 'GENE (ENTREZ)')."""
+    import pandas as pd
+
+    df = pd.read_csv(raw_path, index_col=0)
+    symbols = [_gene_symbol(c) for c in df.columns]
+    keep = ~pd.Index(symbols).duplicated()
+    X = df.to_numpy(dtype=np.float32)[:, keep]
+    genes = [s for s, k in zip(symbols, keep) if k]
+    models = df.index.astype(str).tolist()
+
+    blocks = [_summarize_block(X)]
+    lineages: List[str] = []
+    if lineage_by_model:
+        lin = np.array([lineage_by_model.get(m) for m in models], dtype=object)
+        for name in sorted({str(x) for x in lin if x is not None}):
+            lineages.append(name)
+            blocks.append(_summarize_block(X[lin == name]))
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "stats.npy"), np.stack(blocks, axis=0).astype(np.float32))
+    meta = {
+        "version": INDEX_VERSION,
+        "source": os.path.abspath(raw_path),
+        "n_models": len(models),
+        "genes": genes,
+        "lineages": [GLOBAL_KEY] + lineages,
+        "stats": STATS,
+    }
+    with open(os.path.join(out_dir, "index.json"), "w") as f:
+        json.dump(meta, f)
+    return out_dir
+
+
+class EssentialityIndex:
+    """Memory-mapped (lineage × gene × stat) DepMap summary matrix with vectorized lookups."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(os.path.join(self.path, "index.json")) as f:
+            meta = json.load(f)
+        self.meta = meta
+        self.genes: List[str] = list(meta["genes"])
+        self.lineages: List[str] = list(meta["lineages"])
+        self.stats = np.load(os.path.join(self.path, "stats.npy"), mmap_mode="r")
+        self.gene_index: Dict[str, int] = {g: i for i, g in enumerate(self.genes)}
+        self.lineage_index: Dict[str, int] = {l: i for i, l in enumerate(self.lineages)}
+
+    @classmethod
+    def load(cls, path: str) -> "EssentialityIndex":
+        return cls(path)
+
+    # Pickle by path (CV worker processes reopen the memmap instead of copying it)
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def gene_ids(self, genes: Sequence[str]) -> np.ndarray:
+        return np.array([self.gene_index.get(str(g).upper(), -1) for g in genes], dtype=np.int64)
+
+    def lineage_ids(self, lineages: Sequence[Optional[str]]) -> np.ndarray:
+        return np.array([self.lineage_index.get(str(l), -1) if l else -1 for l in lineages], dtype=np.int64)
+
+    def lookup(self, lineages: Sequence[Optional[str]], genes: Sequence[str], stat: str = "essentiality_score") -> np.ndarray:
+        """(len(lineages), len(genes)) stat values with the JSON grounding fallback rule:
+        lineage value if that lineage has data for the gene, else global, else 0.0."""
+        s = _S[stat]
+        gi = self.gene_ids(genes)
+        li = self.lineage_ids(lineages)
+        out = np.zeros((len(li), len(gi)), dtype=np.float64)
+        gok = gi >= 0
+        if not gok.any():
+            return out
+        g_sel = gi[gok]
+        glob = np.asarray(self.stats[0][g_sel, s], dtype=np.float64)
+        val = np.broadcast_to(glob, (len(li), len(g_sel))).copy()
+        lok = li >= 0
+        if lok.any():
+            lin_vals = np.asarray(self.stats[li[lok]][:, g_sel, s], dtype=np.float64)
+            lin_n = np.asarray(self.stats[li[lok]][:, g_sel, _S["n_models"]], dtype=np.float64)
+            use = (lin_n > 0) & ~np.isnan(lin_vals)
+            val[lok] = np.where(use, lin_vals, val[lok])
+        out[:, gok] = np.nan_to_num(val, nan=0.0)
+        return out
+
+    def essentiality(self, lineages: Sequence[Optional[str]], genes: Sequence[str]) -> np.ndarray:
+        return self.lookup(lineages, genes, "essentiality_score")
+
+    def score(self, lineage: Optional[str], gene: str) -> float:
+        return float(self.essentiality([lineage], [gene])[0, 0])
+
+    def __contains__(self, gene: str) -> bool:
+        return str(gene).upper() in self.gene_index
+
+    def __len__(self) -> int:
+        return len(self.genes)
+
+
+def load_index_if_present(path: str) -> Optional[EssentialityIndex]:
+    if path and os.path.exists(os.path.join(path, "index.json")) and os.path.exists(os.path.join(path, "stats.npy")):
+        return EssentialityIndex(path)
+    return None
+
+
+def main() -> int:
+    import pandas as pd
+
+    here = Path(__file__).parent
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--raw", type=str, default=str(here / "depmap_raw.csv"), help="DepMap CRISPRGeneEffect.csv")
+    ap.add_argument("--model_csv", type=str, default=str((here / "../../../data/depmap/Model.csv").resolve()))
+    ap.add_argument("--out_dir", type=str, default=str((here / "../data/depmap_essentiality_index").resolve()))
+    args = ap.parse_args()
+
+    if not os.path.exists(args.raw):
+        raise SystemExit(f"Missing {args.raw}. Copy DepMap CRISPRGeneEffect.csv there (or pass --raw).")
+    lineage_by_model = None
+    if os.path.exists(args.model_csv):
+        m = pd.read_csv(args.model_csv, usecols=["ModelID", "OncotreeLineage"]).dropna()
+        lineage_by_model = dict(zip(m["ModelID"].astype(str), m["OncotreeLineage"].astype(str)))
+    else:
+        print(f"⚠️  {args.model_csv} not found: index will contain global summaries only")
+
+    out = build_index(args.raw, args.out_dir, lineage_by_model=lineage_by_model)
+    idx = EssentialityIndex(out)
+    print(f"✅ wrote {out} (genes={len(idx.genes)}, lineages={len(idx.lineages) - 1})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Resilient HTTP layer for Evo2 scoring calls (shared by the SL benchmarks).
+
+Why this exists:
+- `gdsc2_7d_validation.score_variant_with_evo2` swallowed every exception and returned None with no
+  retry, so a transient 502 silently dropped a variant from the features.
+- Concurrency was a static CLI value (`--evo2_max_concurrency` / `--evo_api_max_in_flight`): too small
+  wastes the backend, too large overloads it, and it was tuned by trial and error.
+
+What it does (wraps an existing pooled `httpx.Client` / `httpx.AsyncClient`; only `post` is used):
+- Retries 429 / 5xx / timeouts / transport errors with full-jitter exponential backoff
+  (honours `Retry-After`). Other 4xx are returned to the caller untouched (e.g. batch-route 404 probes).
+- AIMD concurrency: the in-flight limit starts at the configured maximum, grows by ~1 per window of
+  fast successes, and is halved (at most once per cooldown) on 429/5xx/timeouts or when observed
+  latency exceeds the target.
+- Circuit breaker: after N consecutive backend failures no requests are sent for a cooldown; calls
+  wait it out against their retry budget, then one half-open probe decides whether to close it.
+- `stats()` returns per-run counters (retried / failed calls, status histogram, limit range) for receipts.
+
+Usage:
+    client = ResilientClient(httpx.Client(timeout=60), max_concurrency=8)
+    r = client.post(url, json=payload); r.raise_for_status()
+    receipt["evo2_http"] = client.stats()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the breaker stays open for longer than a call's retry budget."""
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease in-flight limit (thread-safe)."""
+
+    def __init__(
+        self,
+        max_limit: int,
+        *,
+        min_limit: int = 1,
+        target_latency_s: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        cooldown_s: float = 1.0,
+    ):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.target_latency_s = float(target_latency_s) if target_latency_s else None
+        self.decrease_factor = float(decrease_factor)
+        self.cooldown_s = float(cooldown_s)
+        self._limit = float(self.max_limit)
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+        self.lowest = self.max_limit
+        self.n_decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def on_success(self, latency_s: float) -> None:
+        if self.target_latency_s is not None and latency_s > self.target_latency_s:
+            self.on_overload()
+            return
+        with self._lock:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / max(1.0, self._limit))
+
+    def on_overload(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown_s:
+                return  # one burst of errors → one decrease
+            self._last_decrease = now
+            self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+            self.n_decreases += 1
+            self.lowest = min(self.lowest, self.limit)
+
+
+class CircuitBreaker:
+    """Closed → open after `threshold` consecutive failures → half-open probe after `cooldown_s`."""
+
+    def __init__(self, threshold: int = 8, cooldown_s: float = 30.0):
+        self.threshold = max(1, int(threshold))
+        self.cooldown_s = float(cooldown_s)
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.n_opened = 0
+
+    def wait_time(self) -> Tuple[float, bool]:
+        """(0.0, is_probe) if a request may be sent now, else (seconds to wait, False).
+
+        `is_probe` is True when the caller claimed the half-open probe; it must then end in
+        `record_success` / `record_failure` or, for any other outcome, `release_probe`.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0, False
+            remaining = self._opened_at + self.cooldown_s - time.monotonic()
+            if remaining > 0:
+                return remaining, False
+            if self._probe_in_flight:
+                return min(1.0, self.cooldown_s), False
+            self._probe_in_flight = True
+            return 0.0, True
+
+    def release_probe(self) -> None:
+        """Give up a claimed probe without a verdict (the breaker stays open; the next caller probes)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or (self._opened_at is None and self._failures >= self.threshold):
+                self.n_opened += 1
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class _Resilience:
+    """Policy + shared state used by both the sync and the async client."""
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        max_retries: int = 4,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        target_latency_s: Optional[float] = None,
+        breaker_threshold: int = 8,
+        breaker_cooldown_s: float = 30.0,
+        seed: Optional[int] = None,
+    ):
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_s = float(backoff_base_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self.aimd = AIMDController(max_concurrency, min_limit=min_concurrency, target_latency_s=target_latency_s)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown_s)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters: Counter = Counter()
+        self.status_counts: Counter = Counter()
+
+    def count(self, **inc: int) -> None:
+        with self._lock:
+            self.counters.update(inc)
+
+    def backoff(self, attempt: int, resp: Optional[httpx.Response] = None) -> float:
+        if resp is not None:
+            ra = resp.headers.get("retry-after")
+            try:
+                if ra is not None:
+                    return min(self.backoff_max_s, max(0.0, float(ra)))
+            except ValueError:
+                pass
+        cap = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+        with self._lock:
+            return self._rng.uniform(0.0, cap)
+
+    def observe(
+        self,
+        resp: Optional[httpx.Response],
+        exc: Optional[BaseException],
+        latency_s: float,
+        probe: bool = False,
+    ) -> bool:
+        """Update AIMD / breaker / counters for one attempt. Returns True if it should be retried."""
+        if exc is not None:
+            self.count(attempts=1, transport_errors=1, timeouts=int(isinstance(exc, httpx.TimeoutException)))
+            self.aimd.on_overload()
+            self.breaker.record_failure()
+            return True
+        assert resp is not None
+        with self._lock:
+            self.counters["attempts"] += 1
+            self.status_counts[str(resp.status_code)] += 1
+        if resp.status_code in RETRYABLE_STATUS:
+            self.aimd.on_overload()
+            # 429 is backpressure, not a broken backend: it only counts against a half-open probe
+            # (which must not stay claimed, or the breaker would never close again)
+            if resp.status_code != 429 or probe:
+                self.breaker.record_failure()
+            return True
+        self.breaker.record_success()
+        self.aimd.on_success(latency_s)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {k: int(self.counters.get(k, 0)) for k in (
+                "calls", "attempts", "retried_calls", "retries", "failed_calls",
+                "timeouts", "transport_errors", "circuit_waits",
+            )}
+            out["status_counts"] = dict(self.status_counts)
+        out["concurrency"] = {
+            "max": self.aimd.max_limit,
+            "final": self.aimd.limit,
+            "lowest": self.aimd.lowest,
+            "decreases": self.aimd.n_decreases,
+        }
+        out["circuit_opened"] = self.breaker.n_opened
+        return out
+
+
+class ResilientClient:
+    """Sync wrapper (thread-safe) around a pooled `httpx.Client`."""
+
+    def __init__(self, client: httpx.Client, **policy: Any):
+        self._client = client
+        self._r = _Resilience(**policy)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+
+    def _acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self._r.aimd.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """POST with retries; returns the response (non-retryable statuses included) or raises."""
+        r = self._r
+        r.count(calls=1)
+        attempt = 0
+        while True:
+            wait, probe = r.breaker.wait_time()
+            if wait > 0:
+                if attempt >= r.max_retries:
+                    r.count(failed_calls=1)
+                    raise CircuitOpenError(f"Evo2 circuit open; gave up on {url}")
+                r.count(circuit_waits=1, retries=1, retried_calls=int(attempt == 0))
+                attempt += 1
+                time.sleep(wait)
+                continue
+
+            resp: Optional[httpx.Response] = None
+            exc: Optional[BaseException] = None
+            try:
+                self._acquire()
+                t0 = time.monotonic()
+                try:
+                    resp = self._client.post(url, **kwargs)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    exc = e
+                finally:
+                    self._release()
+                retry = r.observe(resp, exc, time.monotonic() - t0, probe)
+            finally:
+                if probe:
+                    r.breaker.release_probe()
+            if not retry:
+                return resp  # type: ignore[return-value]
+            if attempt >= r.max_retries:
+                r.count(failed_calls=1)
+                if exc is not None:
+                    raise exc
+                resp.raise_for_status()  # type: ignore[union-attr]
+            r.count(retries=1, retried_calls=int(attempt == 0))
+            time.sleep(r.backoff(attempt, resp))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return self._r.stats()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class AsyncResilientClient:
+    """asyncio wrapper around a pooled `httpx.AsyncClient` (single event loop)."""
+
+    def __init__(self, client: httpx.AsyncClient, **policy: Any):
+        self._client = client
+        self._r = _Resilience(**policy)
+        self._cond: Optional[asyncio.Condition] = None  # created on first use (inside the loop)
+        self._in_flight = 0
+
+    async def _acquire(self) -> None:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            while self._in_flight >= self._r.aimd.limit:
+                await self._cond.wait()
+            self._in_flight += 1
+
+    async def _release(self) -> None:
+        assert self._cond is not None
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """POST with retries; returns the response (non-retryable statuses included) or raises."""
+        r = self._r
+        r.count(calls=1)
+        attempt = 0
+        while True:
+            wait, probe = r.breaker.wait_time()
+            if wait > 0:
+                if attempt >= r.max_retries:
+                    r.count(failed_calls=1)
+                    raise CircuitOpenError(f"Evo2 circuit open; gave up on {url}")
+                r.count(circuit_waits=1, retries=1, retried_calls=int(attempt == 0))
+                attempt += 1
+                await asyncio.sleep(wait)
+                continue
+
+            resp: Optional[httpx.Response] = None
+            exc: Optional[BaseException] = None
+            try:
+                await self._acquire()
+                t0 = time.monotonic()
+                try:
+                    resp = await self._client.post(url, **kwargs)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    exc = e
+                finally:
+                    await self._release()
+                retry = r.observe(resp, exc, time.monotonic() - t0, probe)
+            finally:
+                if probe:
+                    r.breaker.release_probe()  # e.g. cancelled mid-request
+            if not retry:
+                return resp  # type: ignore[return-value]
+            if attempt >= r.max_retries:
+                r.count(failed_calls=1)
+                if exc is not None:
+                    raise exc
+                resp.raise_for_status()  # type: ignore[union-attr]
+            r.count(retries=1, retried_calls=int(attempt == 0))
+            await asyncio.sleep(r.backoff(attempt, resp))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return self._r.stats()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
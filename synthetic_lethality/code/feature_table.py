@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Columnar per-cell-line feature table for the SL benchmarks.
+
+Replaces per-line `CellLineFeatures` objects (with a `gene_raw_max` dict each) downstream of scoring:
+- `raw`       float32 (N lines × G genes): max raw Evo2 disruption per gene (0.0 where unobserved)
+- `observed`  bool    (N × G): gene had at least one accepted scored variant (drives calibration)
+- `lineage_codes` int32 (N,) into `lineages`
+- `n_scored`, `n_considered` int32 (N,)
+
+Bucket maxima are masked reductions over gene-column groups; model feature matrices are built by
+slicing/stacking columns instead of per-line dict lookups. Tables are cheap to pickle (CV workers).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class FeatureTable:
+    model_ids: List[str]
+    genes: List[str]
+    raw: np.ndarray
+    observed: np.ndarray
+    lineages: List[str]
+    lineage_codes: np.ndarray
+    n_scored: np.ndarray
+    n_considered: np.ndarray
+
+    def __post_init__(self) -> None:
+        self.row_index: Dict[str, int] = {m: i for i, m in enumerate(self.model_ids)}
+        self.gene_index: Dict[str, int] = {g: j for j, g in enumerate(self.genes)}
+
+    # ---- construction ----
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Mapping],
+        *,
+        genes: Optional[Sequence[str]] = None,
+    ) -> "FeatureTable":
+        """Build from per-line records with keys model_id, lineage, gene_raw_max, n_variants_scored,
+        n_variants_considered (attributes are accepted too, e.g. CellLineFeatures)."""
+        recs = [r if isinstance(r, Mapping) else vars(r) for r in records]
+        gene_set = set(genes or [])
+        for r in recs:
+            gene_set.update((r.get("gene_raw_max") or {}).keys())
+        gene_list = sorted(gene_set)
+        gcol = {g: j for j, g in enumerate(gene_list)}
+
+        n, g = len(recs), len(gene_list)
+        raw = np.zeros((n, g), dtype=np.float32)
+        observed = np.zeros((n, g), dtype=bool)
+        lineages: List[str] = []
+        lin_code: Dict[str, int] = {}
+        codes = np.zeros(n, dtype=np.int32)
+        n_scored = np.zeros(n, dtype=np.int32)
+        n_considered = np.zeros(n, dtype=np.int32)
+        for i, r in enumerate(recs):
+            for gene, v in (r.get("gene_raw_max") or {}).items():
+                j = gcol[gene]
+                raw[i, j] = float(v)
+                observed[i, j] = True
+            lin = str(r.get("lineage"))
+            if lin not in lin_code:
+                lin_code[lin] = len(lineages)
+                lineages.append(lin)
+            codes[i] = lin_code[lin]
+            n_scored[i] = int(r.get("n_variants_scored") or 0)
+            n_considered[i] = int(r.get("n_variants_considered") or 0)
+        return cls(
+            model_ids=[str(r.get("model_id")) for r in recs],
+            genes=gene_list,
+            raw=raw,
+            observed=observed,
+            lineages=lineages,
+            lineage_codes=codes,
+            n_scored=n_scored,
+            n_considered=n_considered,
+        )
+
+    # ---- selection ----
+    def rows(self, model_ids: Sequence[str]) -> np.ndarray:
+        return np.array([self.row_index[m] for m in model_ids], dtype=np.int64)
+
+    def take(self, model_ids: Sequence[str]) -> "FeatureTable":
+        """Row subset (shares gene columns and lineage vocabulary)."""
+        r = self.rows(model_ids)
+        return FeatureTable(
+            model_ids=[self.model_ids[i] for i in r],
+            genes=self.genes,
+            raw=self.raw[r],
+            observed=self.observed[r],
+            lineages=self.lineages,
+            lineage_codes=self.lineage_codes[r],
+            n_scored=self.n_scored[r],
+            n_considered=self.n_considered[r],
+        )
+
+    def columns(self, genes: Sequence[str]) -> np.ndarray:
+        """Raw values for `genes` (N × len(genes)); genes absent from the table read as 0.0."""
+        out = np.zeros((len(self.model_ids), len(genes)), dtype=self.raw.dtype)
+        for k, g in enumerate(genes):
+            j = self.gene_index.get(g)
+            if j is not None:
+                out[:, k] = self.raw[:, j]
+        return out
+
+    # ---- reductions ----
+    def bucket_max(self, genes: Iterable[str]) -> np.ndarray:
+        """Per-line max over observed genes in the set, floored at 0.0 (same as the scalar fold)."""
+        cols = [self.gene_index[g] for g in genes if g in self.gene_index]
+        if not cols:
+            return np.zeros(len(self.model_ids), dtype=self.raw.dtype)
+        vals = np.where(self.observed[:, cols], self.raw[:, cols], 0.0)
+        return np.maximum(vals.max(axis=1), 0.0).astype(self.raw.dtype)
+
+    def lineage_matrix(self, by_lineage: Mapping[str, Sequence[float]], width: int) -> np.ndarray:
+        """Broadcast per-lineage vectors to lines: (N × width) via lineage codes."""
+        E = np.zeros((len(self.lineages), width), dtype=np.float64)
+        for k, lin in enumerate(self.lineages):
+            E[k] = np.asarray(by_lineage[lin], dtype=np.float64)
+        return E[self.lineage_codes]
+
+    def __len__(self) -> int:
+        return len(self.model_ids)
@@ -25,7 +25,7 @@ import os
 import sys
 from collections import Counter, defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 import numpy as np
@@ -57,6 +57,13 @@ def _maybe_add_backend_to_syspath() -> None:
 
 _maybe_add_backend_to_syspath()
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from checkpoint_journal import CheckpointJournal
+from evo2_http import AsyncResilientClient
+from gdsc2_labels import labels_from_matrix, z_by_class_matrix
+from input_cache import load_gdsc2, load_omics_mutations
+from variant_score_store import VariantScoreStore
+
 try:
     from api.services.pathway_to_mechanism_vector import (
         convert_pathway_scores_to_mechanism_vector,
@@ -185,6 +192,8 @@ WEE1_GENES = {
     "WEE1", "CDC25A"
 }
 
+ALL_DDR_PRIMARY_GENES = PARP_GENES | ATR_GENES | WEE1_GENES
+
 
 def moa_dict_to_vector(moa_dict: Dict[str, float], use_6d: bool = True) -> List[float]:
     """Convert MoA dict to 7D or 6D vector list."""
@@ -265,6 +274,47 @@ HRR_CNA_GENES = [
 ]
 
 
+class MutationIndex:
+    """
+    ModelID → contiguous row range over a ModelID-sorted mutation frame.
+
+    Built once per run so per-cell-line lookups are O(1) slices instead of a full-frame
+    `omics_df["ModelID"] == model_id` scan. Also carries an upper-cased gene column
+    (`_gene_upper`) for vectorized gene-set membership.
+    """
+
+    def __init__(self, omics_df: pd.DataFrame):
+        df = omics_df.assign(ModelID=omics_df["ModelID"].astype(str))
+        df = df.sort_values("ModelID", kind="stable").reset_index(drop=True)
+        if "HugoSymbol" in df.columns:
+            df["_gene_upper"] = df["HugoSymbol"].astype(str).str.strip().str.upper()
+        ids = df["ModelID"].to_numpy()
+        uniq, starts = np.unique(ids, return_index=True)
+        ends = np.append(starts[1:], len(ids))
+        self.df = df
+        self._ranges: Dict[str, Tuple[int, int]] = {
+            str(m): (int(a), int(b)) for m, a, b in zip(uniq.tolist(), starts.tolist(), ends.tolist())
+        }
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def __contains__(self, model_id: str) -> bool:
+        return str(model_id) in self._ranges
+
+    def get(self, model_id: str) -> pd.DataFrame:
+        start, stop = self._ranges.get(str(model_id), (0, 0))
+        return self.df.iloc[start:stop]
+
+    def genes_in(self, model_id: str, gene_set: set) -> set:
+        """Genes from `gene_set` mutated in this line (vectorized isin on the slice)."""
+        sub = self.get(model_id)
+        if sub.empty or "_gene_upper" not in sub.columns:
+            return set()
+        g = sub["_gene_upper"]
+        return set(g[g.isin(gene_set)].unique().tolist())
+
+
 def _scale_disruption_to_unit_interval(disruption: float, lo: float = 1e-6, hi: float = 1e-3) -> float:
     """
     Map raw Evo2 disruption (~|delta|) into [0,1] for thresholding.
@@ -280,8 +330,12 @@ def _scale_disruption_to_unit_interval(disruption: float, lo: float = 1e-6, hi:
     return (x - lo) / (hi - lo)
 
 
+class Evo2VariantScoringError(RuntimeError):
+    """An Evo2 request for a scorable variant failed (after retries, or with the circuit open)."""
+
+
 async def score_variant_with_evo2(
-    client: httpx.AsyncClient,
+    client: AsyncResilientClient,
     sem: asyncio.Semaphore,
     api_base: str,
     chrom: str,
@@ -289,15 +343,28 @@ async def score_variant_with_evo2(
     ref: str,
     alt: str,
     model_id: str = "evo2_1b",
+    store: Optional[VariantScoreStore] = None,
 ) -> Optional[Dict[str, float]]:
     """
     Score a variant using Evo2 API (multi-window + exon).
     
-    Returns: Dict with 'min_delta', 'exon_delta', 'disruption', or None if failed.
+    If `store` is given, hits are served from the persistent variant-score store and new
+    scores are written back (backend default windows/flank → windows=None, flank=None).
+    
+    Returns: Dict with 'min_delta', 'exon_delta', 'disruption', or None if the variant is not
+    scorable (non-SNV, or the backend returned no deltas).
+    Raises: Evo2VariantScoringError if a request failed, so callers can retry the line later.
     """
+    if not _is_snv(ref, alt):
+        return None
     try:
-        if not _is_snv(ref, alt):
-            return None
+
+        ident = dict(assembly="GRCh38", chrom=chrom, pos=int(pos), ref=ref, alt=alt, model_id=model_id, windows=None, flank=None)
+        key = store.key(**ident) if store is not None else None
+        if store is not None:
+            hit = store.get(key)
+            if hit is not None:
+                return hit
 
         # Limit concurrent in-flight HTTP requests
         async with sem:
@@ -324,19 +391,114 @@ async def score_variant_with_evo2(
             return None
 
         disruption = max(abs(min_delta or 0.0), abs(exon_delta or 0.0))
-        return {"min_delta": float(min_delta or 0.0), "exon_delta": float(exon_delta or 0.0), "disruption": float(disruption)}
+        out = {"min_delta": float(min_delta or 0.0), "exon_delta": float(exon_delta or 0.0), "disruption": float(disruption)}
+        if store is not None:
+            store.put(key, out, **ident)
+        return out
     except Exception as e:
         print(f"⚠️  Evo2 scoring failed for {chrom}:{pos} {ref}>{alt}: {e}")
+        raise Evo2VariantScoringError(f"{chrom}:{pos} {ref}>{alt}: {e}") from e
+
+
+VariantKey = Tuple[str, int, str, str]
+
+
+def evo2_variant_key(chrom: Any, pos: Any, ref: Any, alt: Any) -> VariantKey:
+    """Canonical (chrom, pos, ref, alt) used to dedup Evo2 calls across cell lines."""
+    return (str(chrom), int(pos), str(ref).upper(), str(alt).upper())
+
+
+def select_variants_for_evo2(mutations_df: pd.DataFrame, max_variants: int) -> pd.DataFrame:
+    """Per-line variant selection for Evo2 scoring (DDR-first budget, SNVs only)."""
+    # Limit variants for speed (prioritize DDR genes)
+    ddr_genes = {"BRCA1", "BRCA2", "TP53", "ATM", "ATR", "CHEK1", "CHEK2", "RAD51", "PALB2", "MBD4"}
+    
+    if len(mutations_df) > max_variants:
+        # Prioritize DDR genes first
+        ddr_muts = mutations_df[mutations_df["HugoSymbol"].str.upper().isin(ddr_genes)]
+        other_muts = mutations_df[~mutations_df["HugoSymbol"].str.upper().isin(ddr_genes)]
+        
+        # Take top DDR mutations + sample others
+        n_ddr = min(len(ddr_muts), max_variants // 2)
+        n_other = max_variants - n_ddr
+        
+        mutations_df = pd.concat([
+            ddr_muts.head(n_ddr),
+            other_muts.head(n_other),
+        ])
+    
+    # Keep SNVs only (Evo2 backend supports SNVs reliably; indels often fail/ref-mismatch)
+    muts = mutations_df.copy()
+    muts["Ref_str"] = muts["Ref"].astype(str)
+    muts["Alt_str"] = muts["Alt"].astype(str)
+    return muts[muts["Ref_str"].str.len().eq(1) & muts["Alt_str"].str.len().eq(1)]
+
+
+def _scorable_row(row) -> Optional[Tuple[VariantKey, str]]:
+    """(variant key, gene) if the row would be scored and mapped to pathways, else None."""
+    chrom = row.get("Chrom", "")
+    pos = row.get("Pos")
+    ref = row.get("Ref_str", "")
+    alt = row.get("Alt_str", "")
+    gene = row.get("HugoSymbol", "")
+    if pd.isna(pos) or not chrom or not ref or not alt or not gene:
         return None
+    return evo2_variant_key(chrom, pos, ref, alt), str(gene)
+
+
+class InflightVariantScores:
+    """Cross-line Evo2 dedup: one scoring task per distinct (chrom, pos, ref, alt), shared by every line.
+
+    Recurrent hotspots (TP53, KRAS, ...) are selected by many lines. The first line to need a variant
+    starts its scoring task; later lines (concurrent or not) await the same task instead of re-posting.
+    Dedup happens inside the journaled per-line pipeline, so each line is checkpointed as soon as its
+    own variants are scored (a crash loses only the lines in flight). A failed task is forgotten once
+    it finishes: lines already awaiting it see the failure, later lines re-request the variant.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[VariantKey, "asyncio.Future[Optional[Dict[str, float]]]"] = {}
+        self.n_occurrences = 0
+        self.n_requests = 0
+        self.n_failed = 0
+
+    def _forget_failed(self, key: VariantKey, task: "asyncio.Future") -> None:
+        if task.cancelled() or task.exception() is not None:
+            if not task.cancelled():
+                self.n_failed += 1
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    async def score(self, key: VariantKey, start) -> Optional[Dict[str, float]]:
+        """Result for `key`; `start()` (a coroutine factory) is only called by the first requester."""
+        self.n_occurrences += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(start())
+            task.add_done_callback(lambda t, k=key: self._forget_failed(k, t))
+            self._tasks[key] = task
+            self.n_requests += 1
+        # shield: a cancelled line must not cancel a task other lines are awaiting
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "n_variant_occurrences": self.n_occurrences,
+            "n_unique": len(self._tasks),
+            "n_requests": self.n_requests,
+            "n_failed": self.n_failed,
+        }
 
 
 async def compute_pathway_scores_from_mutations_evo2(
     mutations_df: pd.DataFrame,
     api_base: str,
-    client: httpx.AsyncClient,
+    client: AsyncResilientClient,
     sem: asyncio.Semaphore,
     model_id: str = "evo2_1b",
     max_variants: int = 50,
+    store: Optional[VariantScoreStore] = None,
+    dedup: Optional[InflightVariantScores] = None,
 ) -> Dict[str, float]:
     """
     Compute pathway scores from mutations using Evo2 scoring.
@@ -351,69 +513,59 @@ async def compute_pathway_scores_from_mutations_evo2(
         api_base: Evo2 API base URL
         model_id: Evo2 model to use
         max_variants: Max variants to score per cell line (for speed)
+        store: Optional persistent variant-score store (shared with the SPD benchmark)
+        dedup: Optional cross-line `InflightVariantScores`; a variant already scored (or being scored)
+            for another line is awaited instead of re-posted
     
     Returns:
-        Dict of pathway scores
+        Dict of pathway scores; `_provenance.variants_failed_evo2` counts variants whose Evo2 request
+        failed (they are left out of the aggregate, and the caller should not journal the line as "ok")
     """
     if mutations_df.empty:
         return {"ddr": 0.0, "ras_mapk": 0.0, "pi3k": 0.0, "vegf": 0.0, "her2": 0.0, "tp53": 0.0}
     
-    # Limit variants for speed (prioritize DDR genes)
-    ddr_genes = {"BRCA1", "BRCA2", "TP53", "ATM", "ATR", "CHEK1", "CHEK2", "RAD51", "PALB2", "MBD4"}
-    
-    if len(mutations_df) > max_variants:
-        # Prioritize DDR genes first
-        ddr_muts = mutations_df[mutations_df["HugoSymbol"].str.upper().isin(ddr_genes)]
-        other_muts = mutations_df[~mutations_df["HugoSymbol"].str.upper().isin(ddr_genes)]
-        
-        # Take top DDR mutations + sample others
-        n_ddr = min(len(ddr_muts), max_variants // 2)
-        n_other = max_variants - n_ddr
-        
-        mutations_df = pd.concat([
-            ddr_muts.head(n_ddr),
-            other_muts.head(n_other),
-        ])
-    
-    # Keep SNVs only (Evo2 backend supports SNVs reliably; indels often fail/ref-mismatch)
-    muts = mutations_df.copy()
-    muts["Ref_str"] = muts["Ref"].astype(str)
-    muts["Alt_str"] = muts["Alt"].astype(str)
-    muts = muts[muts["Ref_str"].str.len().eq(1) & muts["Alt_str"].str.len().eq(1)]
+    muts = select_variants_for_evo2(mutations_df, max_variants)
 
     # Score variants with Evo2 (concurrently, bounded by semaphore)
     seq_scores: List[Dict[str, Any]] = []
     n_seen = 0
     n_scored = 0
     n_scored_mapped = 0
+    n_failed = 0
 
     async def _score_row(row) -> Optional[Dict[str, Any]]:
-        chrom = row.get("Chrom", "")
-        pos = row.get("Pos")
-        ref = row.get("Ref_str", "")
-        alt = row.get("Alt_str", "")
-        gene = row.get("HugoSymbol", "")
-
-        if pd.isna(pos) or not chrom or not ref or not alt or not gene:
-            return None
-
-        evo2_result = await score_variant_with_evo2(
-            client=client,
-            sem=sem,
-            api_base=api_base,
-            chrom=str(chrom),
-            pos=int(pos),
-            ref=str(ref),
-            alt=str(alt),
-            model_id=model_id,
-        )
-        if evo2_result is None:
+        nonlocal n_failed
+        scorable = _scorable_row(row)
+        if scorable is None:
             return None
+        key, gene = scorable
 
+        # Unmapped genes are dropped at aggregation anyway: don't spend an Evo2 call on them
         pathway_weights = get_pathway_weights_for_gene(gene)
         if not pathway_weights:
             return None
 
+        def _score():
+            return score_variant_with_evo2(
+                client=client,
+                sem=sem,
+                api_base=api_base,
+                chrom=str(row.get("Chrom")),
+                pos=int(row.get("Pos")),
+                ref=str(row.get("Ref_str")),
+                alt=str(row.get("Alt_str")),
+                model_id=model_id,
+                store=store,
+            )
+
+        try:
+            evo2_result = await (dedup.score(key, _score) if dedup is not None else _score())
+        except Evo2VariantScoringError:
+            n_failed += 1
+            return None
+        if evo2_result is None:
+            return None
+
         return {
             "sequence_disruption": float(evo2_result["disruption"]),
             "calibrated_seq_percentile": 0.0,  # not needed for pathway aggregation in this validator
@@ -447,10 +599,14 @@ async def compute_pathway_scores_from_mutations_evo2(
             "variants_seen_snv": n_seen,
             "variants_scored_evo2": n_scored,
             "variants_scored_and_mapped": n_scored_mapped,
+            "variants_failed_evo2": n_failed,
         }
         return pathway_scores
     else:
-        return {"ddr": 0.0, "ras_mapk": 0.0, "pi3k": 0.0, "vegf": 0.0, "her2": 0.0, "tp53": 0.0}
+        return {
+            "ddr": 0.0, "ras_mapk": 0.0, "pi3k": 0.0, "vegf": 0.0, "her2": 0.0, "tp53": 0.0,
+            "_provenance": {"variants_seen_snv": n_seen, "variants_scored_evo2": 0, "variants_failed_evo2": n_failed},
+        }
 
 
 def compute_pathway_scores_from_mutations(mutations_df: pd.DataFrame) -> Dict[str, float]:
@@ -1104,7 +1260,12 @@ async def main_async() -> int:
     ap.add_argument("--evo2_model_id", type=str, default="evo2_1b", help="Evo2 model ID")
     ap.add_argument("--max_variants_per_line", type=int, default=30, help="Max variants to score per cell line (for speed)")
     ap.add_argument("--evo2_timeout_s", type=float, default=60.0, help="HTTP timeout (seconds) for Evo2 scoring requests")
-    ap.add_argument("--evo2_max_concurrency", type=int, default=10, help="Max concurrent Evo2 HTTP requests (avoid connection flaps)")
+    ap.add_argument("--evo2_max_concurrency", type=int, default=10, help="Upper bound on concurrent Evo2 HTTP requests; the adaptive (AIMD) limit moves below it")
+    ap.add_argument("--evo2_max_retries", type=int, default=4, help="Retries per Evo2 request on 429/5xx/timeouts (jittered exponential backoff)")
+    ap.add_argument("--evo2_target_latency_s", type=float, default=None, help="Halve the in-flight limit when an Evo2 request is slower than this (default: errors only)")
+    ap.add_argument("--no_variant_dedup", action="store_true", help="Score variants per line instead of once per unique (chrom, pos, ref, alt) across lines")
+    ap.add_argument("--line_workers", type=int, default=10, help="Cell lines in flight at once (queue workers); per-variant concurrency is bounded by --evo2_max_concurrency")
+    ap.add_argument("--evo2_score_store", type=str, default="", help="Persistent variant-score store (SQLite). Default: results/evo2_variant_scores.sqlite; 'none' disables")
     ap.add_argument(
         "--mutation_scoring",
         type=str,
@@ -1117,6 +1278,10 @@ async def main_async() -> int:
     ap.add_argument("--max_cell_lines", type=int, default=500, help="Max cell lines to process")
     ap.add_argument("--spd_results", type=str, help="Path to SPD-ML results JSON for comparison")
     ap.add_argument("--out", type=str, default="gdsc2_7d_validation.json")
+    ap.add_argument("--no_input_cache", action="store_true", help="Parse Omics CSV / GDSC2 xlsx directly instead of the columnar cache (data/cache/)")
+    ap.add_argument("--checkpoint", type=str, default="", help="Per-cell-line JSONL checkpoint journal. Default: results/<out>.checkpoint.jsonl")
+    ap.add_argument("--resume", action="store_true", help="Resume from the checkpoint journal (skip ModelIDs already scored)")
+    ap.add_argument("--fresh", action="store_true", help="Start over even if a checkpoint journal exists (old journal kept as .bak)")
     args = ap.parse_args()
 
     # Default dimension is 6D for cell lines unless explicitly overridden.
@@ -1162,10 +1327,10 @@ async def main_async() -> int:
         model_path = os.path.abspath(os.path.join(script_dir, "..", "..", "..", "data", "depmap", "Model.csv"))
     
     print(f"Loading GDSC2 data from {gdsc_path}...")
-    gdsc_df = pd.read_excel(gdsc_path, engine="openpyxl")
-    
-    print(f"Loading Omics mutations from {omics_path}...")
-    omics_df = pd.read_csv(omics_path, low_memory=False)
+    if args.no_input_cache:
+        gdsc_df = pd.read_excel(gdsc_path, engine="openpyxl")
+    else:
+        gdsc_df = load_gdsc2(gdsc_path, drug_names=PARP_DRUGS | ATR_DRUGS | WEE1_DRUGS | DNAPK_DRUGS)
     
     print(f"Loading DepMap Model.csv from {model_path}...")
     # DepMap mapping (same approach as preflight script)
@@ -1202,29 +1367,22 @@ async def main_async() -> int:
     merged_sl = merged[merged["DRUG_NAME"].isin(set(PARP_DRUGS | ATR_DRUGS | WEE1_DRUGS | DNAPK_DRUGS))]
     print(f"Filtered to {len(merged_sl)} SL drug combinations")
     
-    # Group by ModelID and compute labels
+    # Compute labels for all cell lines at once: (cell line × drug class) Z matrix.
+    # agg="last" keeps this script's rule (last non-missing drug row per class wins).
+    sl_classed = merged_sl.assign(drug_class=merged_sl["DRUG_NAME"].map(DRUG_TO_CLASS)).dropna(subset=["drug_class"])
+    z_ids, z_classes, z_mat = z_by_class_matrix(sl_classed, agg="last")
+    z_labels = labels_from_matrix(z_mat, z_classes, args.z_sensitive_threshold, args.min_margin)
+    has_z = ~np.isnan(z_mat).all(axis=1) if z_mat.size else np.zeros(len(z_ids), dtype=bool)
+
     cell_line_labels = {}
     cell_line_zscores = defaultdict(dict)
-    
-    for model_id, group in merged_sl.groupby("ModelID"):
-        z_by_class = {}
-        for _, row in group.iterrows():
-            drug = row["DRUG_NAME"]
-            drug_class = DRUG_TO_CLASS.get(drug, "UNKNOWN")
-            if drug_class == "UNKNOWN":
-                continue
-            z_score = row.get("Z_SCORE")
-            if pd.notna(z_score):
-                z_by_class[drug_class] = z_score
-                cell_line_zscores[model_id][drug_class] = float(z_score)
-        
-        if z_by_class:
-            label = compute_label_from_z(
-                z_by_class,
-                z_sensitive_threshold=args.z_sensitive_threshold,
-                min_margin=args.min_margin,
-            )
-            cell_line_labels[model_id] = label
+    for i, model_id in enumerate(z_ids):
+        if not has_z[i]:
+            continue
+        cell_line_labels[model_id] = z_labels[i]
+        for j, drug_class in enumerate(z_classes):
+            if not np.isnan(z_mat[i, j]):
+                cell_line_zscores[model_id][drug_class] = float(z_mat[i, j])
     
     print(f"Computed labels for {len(cell_line_labels)} cell lines")
     label_counts = Counter(cell_line_labels.values())
@@ -1232,6 +1390,16 @@ async def main_async() -> int:
     
     # Limit cell lines if requested
     cell_line_ids = list(cell_line_labels.keys())[:args.max_cell_lines]
+
+    print(f"Loading Omics mutations from {omics_path}...")
+    if args.no_input_cache:
+        omics_df = pd.read_csv(omics_path, low_memory=False)
+    else:
+        # Columnar cache with ModelID pushdown: only the lines we will score are materialized
+        omics_df = load_omics_mutations(omics_path, model_ids=cell_line_ids)
+    mutation_index = MutationIndex(omics_df)
+    del omics_df
+    print(f"Indexed {len(mutation_index.df)} mutations across {len(mutation_index)} ModelIDs")
     
     # Process each cell line: compute 7D vector and predict
     predictions_7d = {}
@@ -1244,16 +1412,27 @@ async def main_async() -> int:
     # Use async Evo2 scoring if API base provided
     use_evo2 = args.evo2_api_base and args.evo2_api_base != "none"
 
-    client: Optional[httpx.AsyncClient] = None
+    client: Optional[AsyncResilientClient] = None
     sem: Optional[asyncio.Semaphore] = None
+    store: Optional[VariantScoreStore] = None
     if use_evo2:
-        client = httpx.AsyncClient(timeout=args.evo2_timeout_s)
+        # Retry/backoff + adaptive in-flight limit + circuit breaker (see evo2_http.py)
+        client = AsyncResilientClient(
+            httpx.AsyncClient(timeout=args.evo2_timeout_s),
+            max_concurrency=int(args.evo2_max_concurrency),
+            max_retries=args.evo2_max_retries,
+            target_latency_s=args.evo2_target_latency_s,
+        )
         sem = asyncio.Semaphore(int(args.evo2_max_concurrency))
-    
-    async def process_cell_line(model_id: str) -> Tuple[str, Dict]:
-        """Process a single cell line asynchronously."""
-        # Get mutations for this cell line
-        cell_mutations = omics_df[omics_df["ModelID"] == model_id].copy()
+        if args.evo2_score_store.lower() != "none":
+            store_path = args.evo2_score_store or os.path.join(results_dir, "evo2_variant_scores.sqlite")
+            store = VariantScoreStore(store_path)
+            print(f"Using variant-score store: {store_path} ({len(store)} records)")
+    
+    async def process_cell_line(model_id: str) -> Tuple[str, Dict, str]:
+        """Process a single cell line asynchronously. Returns (model_id, pathway_scores, status)."""
+        # Get mutations for this cell line (O(1) slice from the prebuilt index)
+        cell_mutations = mutation_index.get(model_id)
         
         # Compute pathway scores
         if use_evo2:
@@ -1265,6 +1444,8 @@ async def main_async() -> int:
                     sem=sem,
                     model_id=args.evo2_model_id,
                     max_variants=args.max_variants_per_line,
+                    store=store,
+                    dedup=dedup,
                 )
             except Exception as e:
                 print(f"⚠️  Evo2 failed for {model_id}: {e}, falling back to mutation counts")
@@ -1273,6 +1454,13 @@ async def main_async() -> int:
                     if args.mutation_scoring == "consequence_weighted"
                     else compute_pathway_scores_from_mutations(cell_mutations)
                 )
+                # Journaled but not "ok": a --resume retries Evo2 for this line
+                return model_id, pathway_scores, "evo2_fallback"
+            n_failed = pathway_scores.get("_provenance", {}).get("variants_failed_evo2", 0)
+            if n_failed:
+                # Scores miss the failed variants: journaled but not "ok", so a --resume re-scores the line
+                print(f"⚠️  {model_id}: {n_failed} Evo2 variant request(s) failed; line journaled as evo2_partial")
+                return model_id, pathway_scores, "evo2_partial"
         else:
             pathway_scores = (
                 compute_pathway_scores_from_mutations_weighted(cell_mutations)
@@ -1280,24 +1468,76 @@ async def main_async() -> int:
                 else compute_pathway_scores_from_mutations(cell_mutations)
             )
         
-        return model_id, pathway_scores
-    
-    # Process cell lines asynchronously (in batches to avoid overwhelming API)
-    pathway_scores_all = {}
-    batch_size = 10
-
+        return model_id, pathway_scores, "ok"
+    
+    # Checkpoint journal: every finished line is appended (fsync'd) as soon as it completes, so a
+    # crash loses only the lines in flight; --resume skips lines already journaled as "ok".
+    checkpoint_path = args.checkpoint or os.path.join(results_dir, f"{os.path.splitext(args.out)[0]}.checkpoint.jsonl")
+    journal = CheckpointJournal(
+        checkpoint_path,
+        config={
+            "evo2_enabled": bool(use_evo2),
+            "evo2_model_id": args.evo2_model_id if use_evo2 else None,
+            "max_variants_per_line": args.max_variants_per_line,
+            "mutation_scoring": args.mutation_scoring,
+        },
+        resume=args.resume,
+        fresh=args.fresh,
+    )
+    done = journal.completed()
+    pathway_scores_all = {mid: done[mid] for mid in cell_line_ids if mid in done}
+    todo = [mid for mid in cell_line_ids if mid not in pathway_scores_all]
+    print(f"Checkpoint: {checkpoint_path} ({len(pathway_scores_all)} lines resumed, {len(todo)} to score)")
+
+    # Cross-line variant dedup, inside the journaled pipeline (each distinct variant is posted once)
+    dedup = InflightVariantScores() if use_evo2 and not args.no_variant_dedup else None
+
+    # Sliding-window scheduler: a bounded queue of cell lines drained by N workers. A slow
+    # (hypermutated) line only occupies its own worker; per-variant HTTP concurrency is governed
+    # by the shared semaphore and the client's adaptive limit, so freed slots are refilled immediately.
+    n_workers = max(1, min(int(args.line_workers), len(todo) or 1))
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * n_workers)
+    n_done = 0
+
+    async def producer() -> None:
+        for mid in todo:
+            await queue.put(mid)
+        for _ in range(n_workers):
+            await queue.put(None)  # one stop sentinel per worker
+
+    async def worker() -> None:
+        nonlocal n_done
+        while True:
+            mid = await queue.get()
+            if mid is None:
+                return
+            result = await process_cell_line(mid)
+            pathway_scores_all[mid] = result[1]
+            if store is not None:
+                store.flush()  # persist this line's variant scores before journaling the line
+            journal.append([result])
+            n_done += 1
+            if n_done % 50 == 0 or n_done == len(todo):
+                print(f"  Processed {n_done}/{len(todo)} cell lines...")
+
+    evo2_http_stats: Optional[Dict[str, Any]] = None
+    tasks = [asyncio.create_task(producer())] + [asyncio.create_task(worker()) for _ in range(n_workers)]
     try:
-        for i in range(0, len(cell_line_ids), batch_size):
-            batch = cell_line_ids[i:i+batch_size]
-            batch_results = await asyncio.gather(*[process_cell_line(mid) for mid in batch])
-            for mid, ps in batch_results:
-                pathway_scores_all[mid] = ps
-
-            if (i // batch_size + 1) % 5 == 0:
-                print(f"  Processed {min(i+batch_size, len(cell_line_ids))}/{len(cell_line_ids)} cell lines...")
+        await asyncio.gather(*tasks)
     finally:
+        for t in tasks:
+            t.cancel()
+        journal.close()
         if client is not None:
             await client.aclose()
+            evo2_http_stats = client.stats()
+            if evo2_http_stats["failed_calls"]:
+                print(f"⚠️  {evo2_http_stats['failed_calls']} Evo2 requests failed after retries (see receipt evo2_http)")
+        if store is not None:
+            store.close()
+    if dedup is not None:
+        ds = dedup.stats()
+        print(f"[dedup] {ds['n_variant_occurrences']} selected variants → {ds['n_requests']} Evo2 requests ({ds['n_failed']} failed)")
     
     for model_id in cell_line_ids:
         pathway_scores = pathway_scores_all.get(model_id, {})
@@ -1307,7 +1547,7 @@ async def main_async() -> int:
             pathway_scores = {k: v for k, v in pathway_scores.items() if k != "_provenance"}
         
         # Extract primary DDR gene and compute HRD proxy
-        cell_mutations = omics_df[omics_df["ModelID"] == model_id].copy()
+        cell_mutations = mutation_index.get(model_id)
         primary_ddr_gene = None
         hrd_proxy = None
         
@@ -1323,13 +1563,8 @@ async def main_async() -> int:
                 primary_gene=None,
                 default_if_none=default_hrd_proxy,
             )
-            # Get all DDR genes from mutations
-            ddr_genes_in_mutations = set()
-            all_ddr_genes = PARP_GENES | ATR_GENES | WEE1_GENES
-            for _, row in cell_mutations.iterrows():
-                gene = str(row.get("HugoSymbol", "")).strip().upper()
-                if gene in all_ddr_genes:
-                    ddr_genes_in_mutations.add(gene)
+            # Get all DDR genes from mutations (vectorized set membership)
+            ddr_genes_in_mutations = mutation_index.genes_in(model_id, ALL_DDR_PRIMARY_GENES)
             
             # Priority: PARP genes > ATR genes > WEE1 genes
             parp_matches = ddr_genes_in_mutations & PARP_GENES
@@ -1337,11 +1572,11 @@ async def main_async() -> int:
             wee1_matches = ddr_genes_in_mutations & WEE1_GENES
             
             if parp_matches:
-                primary_ddr_gene = list(parp_matches)[0]  # Take first match
+                primary_ddr_gene = sorted(parp_matches)[0]  # Take first match (deterministic)
             elif atr_matches:
-                primary_ddr_gene = list(atr_matches)[0]
+                primary_ddr_gene = sorted(atr_matches)[0]
             elif wee1_matches:
-                primary_ddr_gene = list(wee1_matches)[0]
+                primary_ddr_gene = sorted(wee1_matches)[0]
         
         # Convert to 7D or 6D mechanism vector (use_6d=True skips IO dimension for cell lines)
         use_7d_vector = not args.use_6d
@@ -1460,6 +1695,13 @@ async def main_async() -> int:
             "evo2_enabled": use_evo2,
             "evo2_api_base": args.evo2_api_base if use_evo2 else None,
             "evo2_model_id": args.evo2_model_id if use_evo2 else None,
+            "evo2_score_store": (store.path if store is not None else None),
+            "checkpoint": checkpoint_path,
+            "line_workers": args.line_workers,
+            "evo2_http": evo2_http_stats,
+            "variant_dedup": dedup.stats() if dedup is not None else None,
+            "resumed_cell_lines": len(done.keys() & set(cell_line_ids)),
+            "line_status": dict(Counter(journal.records[mid].get("status") for mid in cell_line_ids if mid in journal.records)),
             "max_variants_per_line": args.max_variants_per_line,
             "hrd_proxy_file": args.hrd_proxy_file,
             "hrd_proxy_default": args.hrd_proxy_default,
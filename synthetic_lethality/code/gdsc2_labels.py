@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Vectorized GDSC2 drug-class labeling (same rule as `compute_label_from_z`, all lines at once).
+
+Label rule (transparent, preclinical):
+- Z_SCORE is aggregated per (cell line, drug class) into a dense matrix (NaN = not screened).
+- Best class = most negative Z; require best_z <= z_sensitive_threshold, else NONE.
+- Require (second_best_z - best_z) >= min_margin, else NONE (ambiguous).
+
+The matrix form lets us label the full panel for a whole grid of
+(z_sensitive_threshold, min_margin) values in one NumPy pass, which is what the label-sensitivity
+sweeps need. Ties resolve to the alphabetically-first class, matching the dict/sort-based rule.
+
+Usage:
+    python3 gdsc2_labels.py --thresholds -1.2,-1.0,-0.8,-0.6 --margins 0,0.1,0.25,0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+NONE_LABEL = "NONE"
+
+
+def z_by_class_matrix(
+    gdsc: pd.DataFrame,
+    *,
+    id_col: str = "ModelID",
+    class_col: str = "drug_class",
+    z_col: str = "Z_SCORE",
+    agg: str = "mean",
+) -> Tuple[List[str], List[str], np.ndarray]:
+    """Pivot Z_SCORE to a (cell line × drug class) float matrix.
+
+    `agg="mean"` matches the SPD benchmark / preflight (mean Z per class); `agg="last"` matches the
+    7D validator (last non-missing drug row per class wins). Cell lines are sorted (groupby order);
+    lines with no usable Z still get a row of NaN.
+    """
+    ids = sorted(gdsc[id_col].astype(str).unique().tolist())
+    z = pd.to_numeric(gdsc[z_col], errors="coerce")
+    x = gdsc.assign(**{id_col: gdsc[id_col].astype(str), z_col: z})
+    wide = x.groupby([id_col, class_col])[z_col].agg(agg).unstack(class_col)
+    wide = wide.reindex(index=ids)
+    wide = wide.reindex(columns=sorted(wide.columns.astype(str).tolist()))
+    return ids, list(wide.columns), wide.to_numpy(dtype=np.float64)
+
+
+def label_indices(
+    Z: np.ndarray,
+    z_sensitive_thresholds: Iterable[float],
+    min_margins: Iterable[float],
+) -> np.ndarray:
+    """Return class indices of shape (T, M, N); -1 means NONE.
+
+    T = len(thresholds), M = len(margins), N = cell lines.
+    """
+    thr = np.asarray(list(z_sensitive_thresholds), dtype=np.float64)
+    mar = np.asarray(list(min_margins), dtype=np.float64)
+    n, k = Z.shape
+    Zf = np.where(np.isnan(Z), np.inf, Z)
+    if k == 0:
+        return np.full((len(thr), len(mar), n), -1, dtype=np.int64)
+
+    order = np.argsort(Zf, axis=1, kind="stable")
+    rows = np.arange(n)
+    best_idx = order[:, 0]
+    best = Zf[rows, best_idx]
+    second = Zf[rows, order[:, 1]] if k >= 2 else np.full(n, np.inf)
+    with np.errstate(invalid="ignore"):
+        margin = second - best  # inf when only one class screened
+
+    sensitive = np.isfinite(best)[None, :] & (best[None, :] <= thr[:, None])  # (T, N)
+    unambiguous = margin[None, :] >= mar[:, None]  # (M, N)
+    ok = sensitive[:, None, :] & unambiguous[None, :, :]  # (T, M, N)
+    return np.where(ok, best_idx[None, None, :], -1)
+
+
+def labels_from_matrix(
+    Z: np.ndarray,
+    classes: List[str],
+    z_sensitive_threshold: float,
+    min_margin: float,
+) -> List[str]:
+    idx = label_indices(Z, [z_sensitive_threshold], [min_margin])[0, 0]
+    names = np.array(list(classes) + [NONE_LABEL], dtype=object)
+    return names[idx].tolist()  # -1 → NONE (last element)
+
+
+def compute_labels(
+    gdsc: pd.DataFrame,
+    z_sensitive_threshold: float,
+    min_margin: float,
+    *,
+    agg: str = "mean",
+) -> Dict[str, str]:
+    """ModelID → label for every line in `gdsc` (sorted ModelID order)."""
+    ids, classes, Z = z_by_class_matrix(gdsc, agg=agg)
+    return dict(zip(ids, labels_from_matrix(Z, classes, z_sensitive_threshold, min_margin)))
+
+
+def label_grid_distribution(
+    gdsc: pd.DataFrame,
+    z_sensitive_thresholds: List[float],
+    min_margins: List[float],
+    *,
+    agg: str = "mean",
+) -> List[Dict]:
+    """Label distribution for every (threshold, margin) grid point, computed in one pass."""
+    ids, classes, Z = z_by_class_matrix(gdsc, agg=agg)
+    idx = label_indices(Z, z_sensitive_thresholds, min_margins)
+    names = list(classes) + [NONE_LABEL]
+    out = []
+    for ti, t in enumerate(z_sensitive_thresholds):
+        for mi, m in enumerate(min_margins):
+            counts = np.bincount(idx[ti, mi] % len(names), minlength=len(names))
+            out.append({
+                "z_sensitive_threshold": float(t),
+                "min_margin": float(m),
+                "label_distribution": {names[j]: int(c) for j, c in enumerate(counts) if c},
+            })
+    return out
+
+
+def _parse_floats(s: str) -> List[float]:
+    return [float(x) for x in str(s).split(",") if x.strip()]
+
+
+def main() -> int:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from input_cache import load_gdsc2
+    from preflight_gdsc2_depmap_omics import DRUG_TO_CLASS, normalize_cosmic_id
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--thresholds", type=str, default="-1.5,-1.2,-1.0,-0.8,-0.6,-0.4")
+    ap.add_argument("--margins", type=str, default="0,0.1,0.25,0.5")
+    ap.add_argument("--agg", type=str, default="mean", choices=["mean", "last"])
+    ap.add_argument("--out", type=str, default="gdsc2_label_sensitivity_grid.json")
+    args = ap.parse_args()
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    gdsc_path = os.path.join(root, "data", "GDSC2_fitted_dose_response_27Oct23.xlsx")
+    model_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "depmap", "Model.csv"))
+    for p in (gdsc_path, model_path):
+        if not os.path.exists(p):
+            raise FileNotFoundError(p)
+
+    model_df = pd.read_csv(model_path, usecols=["ModelID", "COSMICID"], low_memory=False).dropna()
+    model_df["COSMIC_ID"] = model_df["COSMICID"].apply(normalize_cosmic_id)
+    model_df = model_df.dropna(subset=["COSMIC_ID"])[["ModelID", "COSMIC_ID"]].drop_duplicates()
+
+    gdsc = load_gdsc2(gdsc_path, columns=["COSMIC_ID", "DRUG_NAME", "Z_SCORE"], drug_names=DRUG_TO_CLASS.keys())
+    gdsc["COSMIC_ID"] = gdsc["COSMIC_ID"].apply(normalize_cosmic_id)
+    gdsc = gdsc.dropna(subset=["COSMIC_ID", "DRUG_NAME"])
+    gdsc["drug_class"] = gdsc["DRUG_NAME"].map(DRUG_TO_CLASS)
+    gdsc = gdsc.merge(model_df, on="COSMIC_ID", how="inner")
+
+    grid = label_grid_distribution(gdsc, _parse_floats(args.thresholds), _parse_floats(args.margins), agg=args.agg)
+    receipt = {
+        "n_cell_lines": int(gdsc["ModelID"].nunique()),
+        "agg": args.agg,
+        "grid": grid,
+    }
+    results_dir = os.path.join(root, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    out_path = os.path.join(results_dir, args.out)
+    with open(out_path, "w") as f:
+        json.dump(receipt, f, indent=2)
+    print("Wrote label grid:", out_path, f"({len(grid)} grid points)")
+    for g in grid:
+        print(g["z_sensitive_threshold"], g["min_margin"], g["label_distribution"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
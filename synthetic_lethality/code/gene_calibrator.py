@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Array-backed per-gene empirical calibrator (raw Evo2 disruption → within-gene percentile).
+
+Replaces the dict-of-lists calibrator in `benchmark_gdsc2_multimodal_spd.py`:
+- All per-gene sorted distributions are packed into one contiguous float64 array + CSR-style offsets.
+- Genes without a distribution fall back to the '__GLOBAL__' distribution (same rule as before).
+- `percentiles(raw, genes)` scores a whole (cell line × gene) matrix at once. Values are rank-encoded
+  against the calibrator's unique values, so per-gene `bisect_right` becomes one integer `searchsorted`
+  over the packed keys (exact, no floating-point segment tricks).
+- `save(path)` / `GeneCalibrator.load(path)` round-trip through `.npz` for reuse across runs.
+
+Percentile definition (unchanged): bisect_right(sorted_vals, x) / len(sorted_vals).
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+
+GLOBAL_KEY = "__GLOBAL__"
+
+
+class GeneCalibrator:
+    """Packed per-gene sorted distributions with vectorized percentile lookup."""
+
+    def __init__(self, genes: Sequence[str], values: np.ndarray, offsets: np.ndarray):
+        self.genes: List[str] = [str(g) for g in genes]
+        self.values = np.asarray(values, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if len(self.offsets) != len(self.genes) + 1:
+            raise ValueError("offsets must have len(genes) + 1 entries")
+        self.gene_index: Dict[str, int] = {g: i for i, g in enumerate(self.genes)}
+        if GLOBAL_KEY not in self.gene_index:
+            raise ValueError(f"calibrator is missing the {GLOBAL_KEY} distribution")
+        self._global = self.gene_index[GLOBAL_KEY]
+        self.sizes = np.diff(self.offsets)
+
+        # Rank encoding: key = segment * M + rank(value), rank = #unique values <= value (1-based)
+        self._uniq = np.unique(self.values)
+        self._M = len(self._uniq) + 1
+        seg = np.repeat(np.arange(len(self.genes), dtype=np.int64), self.sizes)
+        rank = np.searchsorted(self._uniq, self.values, side="right").astype(np.int64)
+        self._keys = seg * self._M + rank
+
+    # ---- construction ----
+    @classmethod
+    def from_distributions(cls, by_gene: Mapping[str, Iterable[float]]) -> "GeneCalibrator":
+        genes = list(by_gene.keys())
+        arrays = [np.sort(np.asarray(list(by_gene[g]), dtype=np.float64)) for g in genes]
+        offsets = np.zeros(len(genes) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(a) for a in arrays])
+        values = np.concatenate(arrays) if arrays else np.zeros(0)
+        return cls(genes, values, offsets)
+
+    @classmethod
+    def from_gene_maxima(cls, gene_maxima: Iterable[Mapping[str, float]]) -> "GeneCalibrator":
+        """Build from per-line {gene: raw max} dicts (TRAIN only). 0.0 is added to every distribution."""
+        by_gene: Dict[str, List[float]] = {}
+        global_vals: List[float] = []
+        for gm in gene_maxima:
+            for g, v in (gm or {}).items():
+                by_gene.setdefault(g, []).append(float(v))
+                global_vals.append(float(v))
+        for g in by_gene:
+            by_gene[g].append(0.0)
+        global_vals.append(0.0)
+        by_gene[GLOBAL_KEY] = global_vals
+        return cls.from_distributions(by_gene)
+
+    @classmethod
+    def from_gene_matrix(cls, raw: np.ndarray, observed: np.ndarray, genes: Sequence[str]) -> "GeneCalibrator":
+        """Build from a (lines × genes) raw matrix + observed mask (see feature_table.FeatureTable)."""
+        raw = np.asarray(raw, dtype=np.float64)
+        observed = np.asarray(observed, dtype=bool)
+        by_gene: Dict[str, np.ndarray] = {}
+        for j, g in enumerate(genes):
+            vals = raw[observed[:, j], j]
+            if vals.size:
+                by_gene[str(g)] = np.append(vals, 0.0)
+        by_gene[GLOBAL_KEY] = np.append(raw[observed], 0.0)
+        return cls.from_distributions(by_gene)
+
+    # ---- lookup ----
+    def segments(self, genes: Sequence[str]) -> np.ndarray:
+        """Distribution index per query gene (upper-cased; unknown genes → global)."""
+        return np.array([self.gene_index.get(str(g).upper(), self._global) for g in genes], dtype=np.int64)
+
+    def percentiles(self, raw: np.ndarray, genes: Sequence[str]) -> np.ndarray:
+        """Percentile of raw[i, j] within the distribution of genes[j]; raw is (N, len(genes))."""
+        raw = np.asarray(raw, dtype=np.float64)
+        seg = np.broadcast_to(self.segments(genes), raw.shape)
+        r = np.searchsorted(self._uniq, raw, side="right").astype(np.int64)
+        counts = np.searchsorted(self._keys, seg * self._M + r, side="right") - self.offsets[seg]
+        return counts / np.maximum(1, self.sizes[seg])
+
+    def score(self, gene: str, raw: float) -> float:
+        return float(self.percentiles(np.array([[float(raw)]]), [gene])[0, 0])
+
+    def distribution(self, gene: str) -> np.ndarray:
+        i = self.gene_index.get(str(gene).upper(), self._global)
+        return self.values[self.offsets[i]: self.offsets[i + 1]]
+
+    def __contains__(self, gene: str) -> bool:
+        return str(gene) in self.gene_index
+
+    def __len__(self) -> int:
+        return len(self.genes)
+
+    # ---- persistence ----
+    def save(self, path: str) -> None:
+        np.savez(path, genes=np.array(self.genes, dtype=str), values=self.values, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "GeneCalibrator":
+        with np.load(path, allow_pickle=False) as z:
+            return cls([str(g) for g in z["genes"]], z["values"], z["offsets"])
@@ -6,7 +6,8 @@ Inputs
 - depmap_model.csv (optional) OR ../../../../data/depmap/Model.csv (optional): DepMap model metadata
 
 Outputs
-- depmap_essentiality_by_context.json
+- depmap_essentiality_by_context.json (GENES_DEFAULT only)
+- depmap_essentiality_index/ (all genes × lineages, memory-mapped; see depmap_index.py)
 
 Notes
 - If Model.csv is not present, we still emit global summaries and a clear warning.
@@ -178,6 +179,14 @@ def main() -> int:
     out_path = Path(__file__).parent / "depmap_essentiality_by_context.json"
     out_path.write_text(json.dumps(out, indent=2), encoding="utf-8")
     print(f"✅ wrote {out_path} (global genes={len(out['global'])}, lineages={len(out['by_lineage'])})")
+
+    # Genome-wide index (all CRISPRGeneEffect genes, memory-mapped) for grounding beyond GENES_DEFAULT
+    from depmap_index import EssentialityIndex, build_index
+
+    idx_dir = Path(__file__).parent / "depmap_essentiality_index"
+    build_index(str(raw_path), str(idx_dir), lineage_by_model=lineage_map)
+    idx = EssentialityIndex(str(idx_dir))
+    print(f"✅ wrote {idx_dir} (genes={len(idx.genes)}, lineages={len(idx.lineages) - 1})")
     return 0
 
 
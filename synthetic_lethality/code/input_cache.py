@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""Columnar binary cache for the SL benchmark inputs (OmicsSomaticMutations.csv, GDSC2 xlsx).
+
+Why this exists:
+- Every sweep run re-parsed OmicsSomaticMutations.csv (chunked CSV) and GDSC2_fitted_dose_response_27Oct23.xlsx
+  (openpyxl, tens of seconds) before doing any real work.
+
+What it does:
+- One-time conversion to a column-pruned, typed Parquet file (pyarrow) next to the source
+  under `<data_dir>/cache/`. Falls back to a pandas pickle if pyarrow is not installed.
+- A sidecar `*.meta.json` records the source SHA-256 (+ size/mtime for a cheap fast path);
+  the cache auto-rebuilds whenever the source content changes.
+- Loads support predicate pushdown on ModelID / HugoSymbol (Omics) and DRUG_NAME (GDSC2).
+
+Usage:
+    python3 input_cache.py                       # convert both inputs (default data dir)
+    python3 input_cache.py --force               # rebuild even if checksums match
+
+    from input_cache import load_omics_mutations, load_gdsc2
+    muts = load_omics_mutations(omics_path, columns=[...], model_ids=want, genes=DDR_BROAD)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+CACHE_VERSION = 1
+
+# Superset of columns any SL benchmark reads (pruned to what the source actually has)
+OMICS_COLUMNS = [
+    "ModelID",
+    "Chrom",
+    "Pos",
+    "Ref",
+    "Alt",
+    "VariantType",
+    "HugoSymbol",
+    "VepImpact",
+    "MolecularConsequence",
+    "LikelyLoF",
+]
+OMICS_DTYPES = {
+    "ModelID": "string",
+    "Chrom": "string",
+    "Pos": "Int64",
+    "Ref": "string",
+    "Alt": "string",
+    "VariantType": "string",
+    "HugoSymbol": "string",
+    "VepImpact": "string",
+    "MolecularConsequence": "string",
+    "LikelyLoF": "string",
+}
+
+GDSC2_COLUMNS = ["COSMIC_ID", "CELL_LINE_NAME", "DRUG_NAME", "LN_IC50", "AUC", "Z_SCORE"]
+GDSC2_DTYPES = {
+    "COSMIC_ID": "float64",
+    "CELL_LINE_NAME": "string",
+    "DRUG_NAME": "string",
+    "LN_IC50": "float64",
+    "AUC": "float64",
+    "Z_SCORE": "float64",
+}
+
+
+def _have_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def default_cache_dir(source_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(source_path)), "cache")
+
+
+def _cache_paths(source_path: str, cache_dir: Optional[str]) -> Dict[str, str]:
+    cache_dir = cache_dir or default_cache_dir(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    ext = ".parquet" if _have_pyarrow() else ".pkl"
+    return {
+        "dir": cache_dir,
+        "data": os.path.join(cache_dir, stem + ext),
+        "meta": os.path.join(cache_dir, stem + ".meta.json"),
+    }
+
+
+def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        return json.load(open(meta_path))
+    except Exception:
+        return None
+
+
+def _is_fresh(source_path: str, paths: Dict[str, str]) -> bool:
+    """Cache is fresh if it exists and the source SHA-256 matches (size+mtime fast path)."""
+    meta = _read_meta(paths["meta"])
+    if not meta or meta.get("version") != CACHE_VERSION or not os.path.exists(paths["data"]):
+        return False
+    st = os.stat(source_path)
+    if meta.get("source_size") == st.st_size and meta.get("source_mtime") == st.st_mtime:
+        return True
+    if meta.get("source_size") != st.st_size:
+        return False
+    # Touched but maybe unchanged: confirm by content, refresh the fast-path stamp if identical
+    if sha256_file(source_path) != meta.get("source_sha256"):
+        return False
+    meta["source_mtime"] = st.st_mtime
+    with open(paths["meta"], "w") as f:
+        json.dump(meta, f, indent=2)
+    return True
+
+
+def _read_source(source_path: str, kind: str) -> pd.DataFrame:
+    if kind == "omics":
+        header = pd.read_csv(source_path, nrows=0).columns.tolist()
+        cols = [c for c in OMICS_COLUMNS if c in header]
+        df = pd.read_csv(source_path, usecols=cols, dtype={c: "string" for c in cols if c != "Pos"}, low_memory=False)
+        return df.astype({c: t for c, t in OMICS_DTYPES.items() if c in df.columns})
+    if kind == "gdsc2":
+        header = pd.read_excel(source_path, engine="openpyxl", nrows=0).columns.tolist()
+        cols = [c for c in GDSC2_COLUMNS if c in header]
+        df = pd.read_excel(source_path, engine="openpyxl", usecols=cols)
+        for c in ("COSMIC_ID", "LN_IC50", "AUC", "Z_SCORE"):
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+        return df.astype({c: t for c, t in GDSC2_DTYPES.items() if c in df.columns})
+    raise ValueError(f"Unknown input kind: {kind}")
+
+
+def build_cache(source_path: str, kind: str, *, cache_dir: Optional[str] = None, force: bool = False) -> str:
+    """Convert `source_path` into the columnar cache if missing/stale. Returns cache data path."""
+    paths = _cache_paths(source_path, cache_dir)
+    if not force and _is_fresh(source_path, paths):
+        return paths["data"]
+
+    os.makedirs(paths["dir"], exist_ok=True)
+    t0 = time.time()
+    df = _read_source(source_path, kind)
+    if paths["data"].endswith(".parquet"):
+        df.to_parquet(paths["data"], index=False)
+    else:
+        df.to_pickle(paths["data"])
+
+    st = os.stat(source_path)
+    meta = {
+        "version": CACHE_VERSION,
+        "kind": kind,
+        "source_path": os.path.abspath(source_path),
+        "source_sha256": sha256_file(source_path),
+        "source_size": st.st_size,
+        "source_mtime": st.st_mtime,
+        "format": "parquet" if paths["data"].endswith(".parquet") else "pickle",
+        "columns": list(df.columns),
+        "dtypes": {c: str(t) for c, t in df.dtypes.items()},
+        "n_rows": int(len(df)),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "build_seconds": round(time.time() - t0, 2),
+    }
+    with open(paths["meta"], "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"[input_cache] wrote {paths['data']} ({meta['n_rows']} rows, {meta['build_seconds']}s)")
+    return paths["data"]
+
+
+def _load(
+    data_path: str,
+    *,
+    columns: Optional[List[str]],
+    filters: Dict[str, Optional[Iterable[str]]],
+) -> pd.DataFrame:
+    active = {c: sorted({str(v) for v in vals}) for c, vals in filters.items() if vals is not None}
+    if data_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        schema_cols = pq.read_schema(data_path).names
+        cols = None if columns is None else [c for c in columns if c in schema_cols]
+        pa_filters = [(c, "in", vals) for c, vals in active.items() if c in schema_cols] or None
+        df = pd.read_parquet(data_path, columns=cols, filters=pa_filters)
+    else:
+        df = pd.read_pickle(data_path)
+        for c, vals in active.items():
+            if c in df.columns:
+                df = df[df[c].isin(vals)]
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+    # Downstream code expects read_csv-like dtypes: object strings / int64 or float64, NaN for missing
+    for c in df.columns:
+        dt = str(df[c].dtype)
+        if dt == "string":
+            df[c] = df[c].astype(object).where(df[c].notna(), float("nan"))
+        elif dt == "Int64":
+            df[c] = df[c].astype("float64") if df[c].isna().any() else df[c].astype("int64")
+    return df.reset_index(drop=True)
+
+
+def load_omics_mutations(
+    omics_path: str,
+    *,
+    columns: Optional[List[str]] = None,
+    model_ids: Optional[Iterable[str]] = None,
+    genes: Optional[Iterable[str]] = None,
+    cache_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """Load OmicsSomaticMutations from the columnar cache (built on first use)."""
+    data_path = build_cache(omics_path, "omics", cache_dir=cache_dir)
+    return _load(data_path, columns=columns, filters={"ModelID": model_ids, "HugoSymbol": genes})
+
+
+def load_gdsc2(
+    gdsc_path: str,
+    *,
+    columns: Optional[List[str]] = None,
+    drug_names: Optional[Iterable[str]] = None,
+    cache_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """Load GDSC2 fitted dose response from the columnar cache (built on first use)."""
+    data_path = build_cache(gdsc_path, "gdsc2", cache_dir=cache_dir)
+    return _load(data_path, columns=columns, filters={"DRUG_NAME": drug_names})
+
+
+class OmicsShards:
+    """Per-ModelID mutation shards produced by `stream_filter_omics` (one small CSV per line).
+
+    `model_ids` restricts the view to a selection; shards for other lines stay on disk for reuse.
+    """
+
+    def __init__(self, shard_dir: str, columns: List[str], model_ids: Optional[Iterable[str]] = None):
+        self.shard_dir = shard_dir
+        self.columns = list(columns)
+        want = None if model_ids is None else {str(m) for m in model_ids}
+        self._files = {
+            os.path.splitext(name)[0]: os.path.join(shard_dir, name)
+            for name in os.listdir(shard_dir)
+            if name.endswith(".csv") and (want is None or os.path.splitext(name)[0] in want)
+        }
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, model_id: str) -> bool:
+        return str(model_id) in self._files
+
+    def get(self, model_id: str) -> pd.DataFrame:
+        path = self._files.get(str(model_id))
+        if path is None:
+            return pd.DataFrame(columns=self.columns)
+        df = pd.read_csv(path, dtype={"ModelID": str, "Chrom": str}, low_memory=False)
+        return df
+
+
+def _prune_stale_shards(shards_root: str, keep: str, source: Dict[str, Any]) -> None:
+    """Remove completed shard dirs built from an older version of the same source file.
+
+    Dirs from before the source was recorded (keyed per ModelID selection) are removed too.
+    """
+    for name in os.listdir(shards_root):
+        path = os.path.join(shards_root, name)
+        if path == keep or not os.path.isdir(path):
+            continue
+        meta = _read_meta(os.path.join(path, "_COMPLETE"))
+        if meta is None:
+            continue  # incomplete: possibly another run still writing it
+        built_from = meta.get("source")
+        if built_from is not None and (built_from.get("path") != source["path"] or built_from == source):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        print(f"[input_cache] removed stale Omics shards: {path}")
+
+
+def stream_filter_omics(
+    omics_path: str,
+    *,
+    model_ids: Iterable[str],
+    genes: Optional[Iterable[str]],
+    columns: List[str],
+    shard_dir: Optional[str] = None,
+    chunksize: int = 200000,
+) -> OmicsShards:
+    """Single streaming pass over the Omics CSV, spilling matching rows to per-ModelID shards.
+
+    Memory is bounded by `chunksize` (no row cap), so every line is complete regardless of how many
+    lines are requested. Shards cover every ModelID in the source and are keyed on the source file,
+    gene filter and columns only; `model_ids` is applied when loading, so a new selection reuses the
+    same shards instead of rescanning the CSV. Shards from older versions of the source are pruned.
+    HugoSymbol is upper-cased before gene matching.
+    """
+    gene_set = None if genes is None else {str(g).upper() for g in genes}
+    st = os.stat(omics_path)
+    source = {"path": os.path.abspath(omics_path), "size": st.st_size, "mtime": st.st_mtime}
+    sig = json.dumps(
+        [source["path"], st.st_size, st.st_mtime, sorted(gene_set or []), list(columns)],
+        separators=(",", ":"),
+    )
+    digest = hashlib.sha256(sig.encode("utf-8")).hexdigest()[:16]
+    shards_root = os.path.join(default_cache_dir(omics_path), "omics_shards")
+    if shard_dir is None:
+        shard_dir = os.path.join(shards_root, digest)
+        if os.path.isdir(shards_root):
+            _prune_stale_shards(shards_root, keep=shard_dir, source=source)
+    done_marker = os.path.join(shard_dir, "_COMPLETE")
+    if os.path.exists(done_marker):
+        return OmicsShards(shard_dir, columns, model_ids=model_ids)
+
+    os.makedirs(shard_dir, exist_ok=True)
+    for name in os.listdir(shard_dir):  # partial shards from an interrupted pass
+        os.remove(os.path.join(shard_dir, name))
+
+    n_rows = 0
+    for chunk in pd.read_csv(omics_path, usecols=columns, chunksize=int(chunksize), low_memory=False):
+        chunk["ModelID"] = chunk["ModelID"].astype(str)
+        sub = chunk
+        if gene_set is not None and len(sub):
+            sub = sub.assign(HugoSymbol=sub["HugoSymbol"].astype(str).str.upper())
+            sub = sub[sub["HugoSymbol"].isin(gene_set)]
+        if not len(sub):
+            continue
+        n_rows += len(sub)
+        for mid, g in sub.groupby("ModelID", sort=False):
+            path = os.path.join(shard_dir, f"{mid}.csv")
+            g.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+    n_model_ids = sum(1 for name in os.listdir(shard_dir) if name.endswith(".csv"))
+    with open(done_marker, "w") as f:
+        json.dump({"source": source, "n_rows": n_rows, "n_model_ids": n_model_ids}, f)
+    print(f"[input_cache] streamed {n_rows} Omics rows ({n_model_ids} ModelIDs) into shards: {shard_dir}")
+    return OmicsShards(shard_dir, columns, model_ids=model_ids)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data_dir", type=str, default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data")))
+    ap.add_argument("--cache_dir", type=str, default="", help="Default: <data_dir>/cache")
+    ap.add_argument("--force", action="store_true", help="Rebuild even if source checksums match")
+    args = ap.parse_args()
+
+    cache_dir = args.cache_dir or None
+    for name, kind in (("OmicsSomaticMutations.csv", "omics"), ("GDSC2_fitted_dose_response_27Oct23.xlsx", "gdsc2")):
+        src = os.path.join(args.data_dir, name)
+        if not os.path.exists(src):
+            print(f"[input_cache] skip (missing): {src}")
+            continue
+        out = build_cache(src, kind, cache_dir=cache_dir, force=bool(args.force))
+        print(f"[input_cache] {kind}: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -12,11 +12,16 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import sys
 from collections import Counter
 from typing import Dict, Optional
 
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gdsc2_labels import compute_labels
+from input_cache import load_gdsc2, load_omics_mutations
+
 
 PARP_DRUGS = {"Olaparib", "Niraparib", "Talazoparib", "Rucaparib", "Veliparib"}
 ATR_DRUGS = {"AZD6738", "VE-822", "VE821"}
@@ -85,6 +90,7 @@ def main() -> int:
     ap.add_argument("--min_margin", type=float, default=0.25)
     ap.add_argument("--max_lines", type=int, default=5000, help="Cap number of ModelIDs analyzed for fast preflight.")
     ap.add_argument("--out", type=str, default="gdsc2_depmap_omics_preflight.json")
+    ap.add_argument("--no_input_cache", action="store_true", help="Parse Omics CSV / GDSC2 xlsx directly instead of the columnar cache (data/cache/)")
     args = ap.parse_args()
 
     root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -114,7 +120,10 @@ def main() -> int:
     model_df = model_df[["ModelID", "COSMIC_ID", "OncotreeLineage"]].drop_duplicates()
 
     usecols_g = ["COSMIC_ID", "DRUG_NAME", "AUC", "Z_SCORE"]
-    gdsc = pd.read_excel(gdsc_path, engine="openpyxl", usecols=usecols_g)
+    if args.no_input_cache:
+        gdsc = pd.read_excel(gdsc_path, engine="openpyxl", usecols=usecols_g)
+    else:
+        gdsc = load_gdsc2(gdsc_path, columns=usecols_g, drug_names=DRUG_TO_CLASS.keys())
     gdsc["COSMIC_ID"] = gdsc["COSMIC_ID"].apply(normalize_cosmic_id)
     gdsc = gdsc.dropna(subset=["COSMIC_ID", "DRUG_NAME"])
     gdsc = gdsc[gdsc["DRUG_NAME"].isin(set(DRUG_TO_CLASS.keys()))].copy()
@@ -126,17 +135,15 @@ def main() -> int:
     candidate_ids = classes_per_line.index.astype(str).tolist()[: max(1, int(args.max_lines))]
     gdsc = gdsc[gdsc["ModelID"].astype(str).isin(set(candidate_ids))].copy()
 
-    labels: Dict[str, str] = {}
-    lineage_by_id: Dict[str, str] = {}
-    for mid, g in gdsc.groupby("ModelID"):
-        mid = str(mid)
-        lineage_by_id[mid] = str(g["OncotreeLineage"].iloc[0])
-        z_by_class = g.groupby("drug_class")["Z_SCORE"].mean().to_dict()
-        labels[mid] = compute_label_from_z(
-            z_by_class=z_by_class,
-            z_sensitive_threshold=float(args.z_sensitive_threshold),
-            min_margin=float(args.min_margin),
-        )
+    # Vectorized labeling (same rule as compute_label_from_z, see gdsc2_labels.py)
+    labels: Dict[str, str] = compute_labels(
+        gdsc,
+        z_sensitive_threshold=float(args.z_sensitive_threshold),
+        min_margin=float(args.min_margin),
+    )
+    lineage_by_id: Dict[str, str] = {
+        str(mid): str(lin) for mid, lin in gdsc.groupby(gdsc["ModelID"].astype(str))["OncotreeLineage"].first().items()
+    }
 
     label_counts = Counter(labels.values())
     lineage_counts = Counter(lineage_by_id.values())
@@ -144,13 +151,17 @@ def main() -> int:
     # Omics coverage estimate: stream and count unique ModelID hits
     want = set(labels.keys())
     seen = set()
-    for chunk in pd.read_csv(omics_path, usecols=["ModelID"], chunksize=300000):
-        chunk["ModelID"] = chunk["ModelID"].astype(str)
-        hit = set(chunk[chunk["ModelID"].isin(want)]["ModelID"].unique().tolist())
-        if hit:
-            seen |= hit
-        if len(seen) >= len(want):
-            break
+    if args.no_input_cache:
+        for chunk in pd.read_csv(omics_path, usecols=["ModelID"], chunksize=300000):
+            chunk["ModelID"] = chunk["ModelID"].astype(str)
+            hit = set(chunk[chunk["ModelID"].isin(want)]["ModelID"].unique().tolist())
+            if hit:
+                seen |= hit
+            if len(seen) >= len(want):
+                break
+    else:
+        hit_ids = load_omics_mutations(omics_path, columns=["ModelID"], model_ids=want)["ModelID"]
+        seen = set(hit_ids.astype(str).unique().tolist())
 
     receipt = {
         "inputs": {
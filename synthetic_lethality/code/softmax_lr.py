@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Multinomial logistic regression (softmax + L2) for the learned SL combiners (LR-SP / LR-SPD).
+
+Why this exists:
+- The original trainer ran a fixed 2000 full-batch gradient steps at lr=0.5 with no convergence check.
+  Seed sweeps / repeated CV multiply that by hundreds of fits.
+- The objective is convex and tiny (K=5 classes, D<=~10 features), so a damped Newton solver converges
+  to tolerance in ~10-30 iterations.
+
+Design:
+- Objective (per problem): mean cross-entropy + (reg/2)·||W||² on standardized features (bias unpenalized),
+  i.e. exactly what the gradient-descent trainer optimizes.
+- `fit_softmax_regression_batch` fits B independent problems in one set of batched tensor ops; the SPD
+  benchmark fits LR-SP and LR-SPD together per split (CV folds run in separate processes, so they are not
+  batched across folds). Ragged problems are zero-padded: padded rows get sample weight 0, padded feature
+  columns are all-zero after standardization and their weights stay at 0 under L2, so each padded problem
+  has the same optimum as the unpadded one.
+- `solver="gd"` reproduces the legacy fixed-step trainer (same init RNG, same updates).
+
+Models are plain dicts: {"classes", "W" (K×D), "b" (K,), "mu", "sigma", "solver", "n_iter", "converged"}.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def _one_hot(y_idx: List[int], n_classes: int) -> np.ndarray:
+    Y = np.zeros((len(y_idx), n_classes), dtype=np.float64)
+    for i, c in enumerate(y_idx):
+        Y[i, int(c)] = 1.0
+    return Y
+
+
+def softmax(z: np.ndarray) -> np.ndarray:
+    z = z - np.max(z, axis=-1, keepdims=True)
+    ez = np.exp(z)
+    return ez / np.sum(ez, axis=-1, keepdims=True)
+
+
+def _label_indices(y: Sequence[str], classes: List[str]) -> List[int]:
+    class_to_idx = {c: i for i, c in enumerate(classes)}
+    return [class_to_idx.get(lbl, class_to_idx["NONE"]) for lbl in y]
+
+
+def _standardize_params(X: np.ndarray):
+    mu = X.mean(axis=0)
+    sigma = X.std(axis=0)
+    sigma[sigma < 1e-8] = 1.0
+    return mu, sigma
+
+
+def _fit_gd(
+    Xn: np.ndarray,
+    Y: np.ndarray,
+    *,
+    lr: float,
+    reg: float,
+    steps: int,
+    seed: int,
+    W0: Optional[np.ndarray] = None,
+    b0: Optional[np.ndarray] = None,
+):
+    n, d = Xn.shape
+    k = Y.shape[1]
+    rng = np.random.default_rng(seed)
+    W = 0.01 * rng.standard_normal((k, d)) if W0 is None else np.array(W0, dtype=np.float64)
+    b = np.zeros((k,), dtype=np.float64) if b0 is None else np.array(b0, dtype=np.float64)
+    for _ in range(int(steps)):
+        P = softmax(Xn @ W.T + b)
+        G = (P - Y) / max(1, n)
+        W -= lr * (G.T @ Xn + reg * W)
+        b -= lr * G.sum(axis=0)
+    return W, b
+
+
+def _objective(Xa: np.ndarray, Y: np.ndarray, w: np.ndarray, theta: np.ndarray, reg: float, n_eff: np.ndarray) -> np.ndarray:
+    """Batched objective. Xa (B,N,D+1), Y (B,N,K), w (B,N), theta (B,K,D+1) → (B,)."""
+    logits = np.einsum("bnd,bkd->bnk", Xa, theta)
+    m = logits.max(axis=-1, keepdims=True)
+    lse = (m[..., 0] + np.log(np.exp(logits - m).sum(axis=-1)))
+    nll = (w * (lse - (Y * logits).sum(axis=-1))).sum(axis=1) / n_eff
+    return nll + 0.5 * reg * (theta[:, :, :-1] ** 2).sum(axis=(1, 2))
+
+
+def _fit_newton_batch(
+    Xn: np.ndarray,
+    Y: np.ndarray,
+    w: np.ndarray,
+    *,
+    reg: float,
+    tol: float,
+    max_iter: int,
+    theta0: np.ndarray,
+):
+    """Damped Newton with Armijo backtracking on B problems at once.
+
+    Xn (B,N,D) standardized, Y (B,N,K) one-hot, w (B,N) sample weights (0 = padding), theta0 (B,K,D+1).
+    Returns theta (B,K,D+1), n_iter (B,), converged (B,).
+    """
+    B, N, D = Xn.shape
+    K = Y.shape[2]
+    P_dim = K * (D + 1)
+    Xa = np.concatenate([Xn, np.ones((B, N, 1))], axis=2)
+    n_eff = np.maximum(w.sum(axis=1), 1.0)
+    # L2 on weights only; a tiny ridge on the bias pins the softmax shift invariance.
+    ridge = np.full((K, D + 1), float(reg))
+    ridge[:, -1] = 1e-10
+    ridge = ridge.reshape(-1)
+
+    theta = np.array(theta0, dtype=np.float64)
+    n_iter = np.zeros(B, dtype=np.int64)
+    converged = np.zeros(B, dtype=bool)
+    f = _objective(Xa, Y, w, theta, reg, n_eff)
+
+    for _ in range(int(max_iter)):
+        active = ~converged
+        if not active.any():
+            break
+        logits = np.einsum("bnd,bkd->bnk", Xa, theta)
+        P = softmax(logits)
+        R = (P - Y) * (w / n_eff[:, None])[..., None]  # (B,N,K)
+        grad = np.einsum("bnk,bnd->bkd", R, Xa).reshape(B, P_dim) + ridge * theta.reshape(B, P_dim)
+
+        gnorm = np.abs(grad).max(axis=1)
+        newly = active & (gnorm < tol)
+        converged |= newly
+        active = ~converged
+        if not active.any():
+            break
+
+        # Hessian: sum_i w_i (diag(p_i) - p_i p_iᵀ) ⊗ x_i x_iᵀ / n_eff
+        wp = P * (w / n_eff[:, None])[..., None]  # (B,N,K)
+        H = np.einsum("bnk,bnd,bne->bkde", wp, Xa, Xa)  # diagonal-in-class blocks
+        H_full = np.zeros((B, K, D + 1, K, D + 1))
+        idx = np.arange(K)
+        H_full[:, idx, :, idx, :] = np.moveaxis(H, 1, 0)
+        H_full -= np.einsum("bnk,bnl,bnd,bne->bkdle", wp, P, Xa, Xa)
+        H_full = H_full.reshape(B, P_dim, P_dim) + np.eye(P_dim)[None] * ridge[None, :, None]
+
+        step = np.linalg.solve(H_full[active], -grad[active][..., None])[..., 0]
+        full_step = np.zeros((B, P_dim))
+        full_step[active] = step
+        slope = (grad * full_step).sum(axis=1)
+
+        alpha = np.ones(B)
+        accepted = ~active
+        theta_new = theta.copy()
+        f_new = f.copy()
+        for _ls in range(30):
+            cand = theta.reshape(B, P_dim) + alpha[:, None] * full_step
+            cand = cand.reshape(B, K, D + 1)
+            f_cand = _objective(Xa, Y, w, cand, reg, n_eff)
+            ok = (~accepted) & (f_cand <= f + 1e-4 * alpha * slope)
+            theta_new[ok] = cand[ok]
+            f_new[ok] = f_cand[ok]
+            accepted |= ok
+            if accepted.all():
+                break
+            alpha = np.where(accepted, alpha, alpha * 0.5)
+        # No decrease possible at machine precision → treat as converged.
+        stalled = ~accepted
+        converged |= stalled
+        n_iter[active] += 1
+        theta, f = theta_new, f_new
+
+    return theta, n_iter, converged
+
+
+def fit_softmax_regression_batch(
+    Xs: Sequence[np.ndarray],
+    ys: Sequence[Sequence[str]],
+    classes: List[str],
+    *,
+    reg: float = 1e-3,
+    solver: str = "newton",
+    tol: float = 1e-6,
+    max_iter: int = 100,
+    lr: float = 0.5,
+    steps: int = 2000,
+    seeds: Optional[Sequence[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Fit B independent softmax regressions (one per (X, y) pair) in one batched solve.
+
+    `seeds` sets each problem's random initial weights.
+    """
+    B = len(Xs)
+    if B != len(ys):
+        raise ValueError("Xs and ys must have the same length")
+    if B == 0:
+        return []
+    K = len(classes)
+    seeds = list(seeds) if seeds is not None else [1337] * B
+
+    dims = [int(np.asarray(X).shape[1]) for X in Xs]
+    ns = [int(np.asarray(X).shape[0]) for X in Xs]
+    D, N = max(dims), max(max(ns), 1)
+
+    stats = []
+    Xn = np.zeros((B, N, D))
+    Y = np.zeros((B, N, K))
+    w = np.zeros((B, N))
+    theta0 = np.zeros((B, K, D + 1))
+    for j, (X, y) in enumerate(zip(Xs, ys)):
+        X = np.asarray(X, dtype=np.float64)
+        mu, sigma = _standardize_params(X) if X.shape[0] else (np.zeros(dims[j]), np.ones(dims[j]))
+        stats.append((mu, sigma))
+        Xn[j, : ns[j], : dims[j]] = (X - mu) / sigma
+        Y[j, : ns[j]] = _one_hot(_label_indices(y, classes), K)
+        w[j, : ns[j]] = 1.0
+        rng = np.random.default_rng(int(seeds[j]))
+        theta0[j, :, : dims[j]] = 0.01 * rng.standard_normal((K, dims[j]))
+
+    if solver == "gd":
+        models = []
+        for j in range(B):
+            Wj, bj = _fit_gd(
+                Xn[j, : ns[j], : dims[j]], Y[j, : ns[j]],
+                lr=lr, reg=reg, steps=steps, seed=int(seeds[j]),
+                W0=theta0[j, :, : dims[j]], b0=theta0[j, :, D],
+            )
+            models.append({
+                "classes": classes, "W": Wj, "b": bj, "mu": stats[j][0], "sigma": stats[j][1],
+                "solver": "gd", "n_iter": int(steps), "converged": None,
+            })
+        return models
+    if solver != "newton":
+        raise ValueError(f"unknown solver: {solver!r} (expected 'newton' or 'gd')")
+
+    theta, n_iter, converged = _fit_newton_batch(Xn, Y, w, reg=reg, tol=tol, max_iter=max_iter, theta0=theta0)
+    models = []
+    for j in range(B):
+        b = theta[j, :, D].copy()
+        b -= b.mean()  # softmax is shift-invariant in b; keep a canonical representative
+        models.append({
+            "classes": classes,
+            "W": theta[j, :, : dims[j]].copy(),
+            "b": b,
+            "mu": stats[j][0],
+            "sigma": stats[j][1],
+            "solver": "newton",
+            "n_iter": int(n_iter[j]),
+            "converged": bool(converged[j]),
+        })
+    return models
+
+
+def fit_softmax_regression(
+    X: np.ndarray,
+    y: List[str],
+    classes: List[str],
+    *,
+    lr: float = 0.5,
+    reg: float = 1e-3,
+    steps: int = 2000,
+    seed: int = 1337,
+    solver: str = "newton",
+    tol: float = 1e-6,
+    max_iter: int = 100,
+) -> Dict[str, Any]:
+    """Train-only multinomial logistic regression (softmax) with L2.
+
+    Returns dict containing W, bias, feature scaling params, and class list.
+    `solver="newton"` (default) stops at gradient tolerance `tol`; `solver="gd"` runs the legacy
+    fixed `steps` at learning rate `lr`.
+    """
+    return fit_softmax_regression_batch(
+        [X], [y], classes,
+        reg=reg, solver=solver, tol=tol, max_iter=max_iter,
+        lr=lr, steps=steps, seeds=[seed],
+    )[0]
+
+
+def predict_softmax(
+    model: Dict[str, Any],
+    X: np.ndarray,
+) -> np.ndarray:
+    X = X.astype(np.float64)
+    mu = model["mu"]; sigma = model["sigma"]
+    Xn = (X - mu) / sigma
+    W = model["W"]; b = model["b"]
+    logits = Xn @ W.T + b
+    return softmax(logits)
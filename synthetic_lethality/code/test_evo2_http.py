@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the Evo2 circuit breaker (evo2_http.py): open → half-open → closed transitions,
+and a half-open probe answered with 429 must not leave the breaker stuck open.
+
+Run: python3 test_evo2_http.py   (or pytest test_evo2_http.py)
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from evo2_http import AsyncResilientClient, CircuitBreaker, ResilientClient
+
+COOLDOWN_S = 0.05
+URL = "http://evo2.test/api/score_variant"
+
+
+def _sequence_transport(statuses):
+    """Mock transport answering with `statuses` in order, then 200 forever."""
+    remaining = list(statuses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(remaining.pop(0) if remaining else 200, json={"delta_score": 0.0})
+
+    return handler
+
+
+def test_breaker_transitions():
+    b = CircuitBreaker(threshold=3, cooldown_s=COOLDOWN_S)
+    assert b.wait_time() == (0.0, False)
+    for _ in range(3):
+        b.record_failure()
+    wait, probe = b.wait_time()
+    assert wait > 0 and not probe, "open: callers wait"
+
+    time.sleep(COOLDOWN_S * 1.5)
+    assert b.wait_time() == (0.0, True), "half-open: first caller claims the probe"
+    wait, probe = b.wait_time()
+    assert wait > 0 and not probe, "half-open: only one probe at a time"
+
+    b.record_failure()  # failed probe re-opens
+    assert b.wait_time()[0] > 0 and b.n_opened == 2
+
+    time.sleep(COOLDOWN_S * 1.5)
+    assert b.wait_time() == (0.0, True)
+    b.record_success()  # successful probe closes
+    assert b.wait_time() == (0.0, False)
+    assert not b._probe_in_flight and b._opened_at is None
+
+
+def test_released_probe_can_be_reclaimed():
+    b = CircuitBreaker(threshold=1, cooldown_s=COOLDOWN_S)
+    b.record_failure()
+    time.sleep(COOLDOWN_S * 1.5)
+    assert b.wait_time() == (0.0, True)
+    b.release_probe()
+    assert b.wait_time() == (0.0, True), "a released probe is handed to the next caller"
+
+
+def test_probe_429_does_not_wedge_sync_client():
+    client = ResilientClient(
+        httpx.Client(transport=httpx.MockTransport(_sequence_transport([500, 500, 500, 429]))),
+        max_concurrency=1, max_retries=10, backoff_base_s=0.001,
+        breaker_threshold=3, breaker_cooldown_s=COOLDOWN_S, seed=0,
+    )
+    assert client.post(URL, json={}).status_code == 200
+    for _ in range(3):
+        assert client.post(URL, json={}).status_code == 200
+    breaker = client._r.breaker
+    assert not breaker._probe_in_flight and breaker._opened_at is None
+    client.close()
+
+
+def test_probe_429_does_not_wedge_async_client():
+    async def run():
+        client = AsyncResilientClient(
+            httpx.AsyncClient(transport=httpx.MockTransport(_sequence_transport([500, 500, 500, 429]))),
+            max_concurrency=1, max_retries=10, backoff_base_s=0.001,
+            breaker_threshold=3, breaker_cooldown_s=COOLDOWN_S, seed=0,
+        )
+        statuses = [(await client.post(URL, json={})).status_code for _ in range(4)]
+        breaker = client._r.breaker
+        await client.aclose()
+        return statuses, breaker
+
+    statuses, breaker = asyncio.run(run())
+    assert statuses == [200] * 4
+    assert not breaker._probe_in_flight and breaker._opened_at is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Persistent, content-addressed Evo2 variant-score store (shared by the SL benchmarks).
+
+Why this exists:
+- `benchmark_gdsc2_multimodal_spd.py` used to keep scores in one JSON dict and rewrite it in full on
+  every flush; past ~100k keys the rewrite alone dominated wall time.
+- `gdsc2_7d_validation.py` had no cache at all, so every rerun re-paid every Evo2 call.
+
+Design:
+- One SQLite file (stdlib only, WAL journal) with a single table keyed by a SHA-256 digest of the
+  canonical variant/scoring identity: (assembly, chrom, pos, ref, alt, model_id, windows, flank).
+- O(1) primary-key lookups; writes are incremental (INSERT OR REPLACE) and committed in small batches.
+- Safe to share one store across threads (single connection guarded by a lock).
+- Legacy JSON caches are imported once: a `meta` row records the imported file's size, mtime and
+  sha256, and an unchanged file is not re-parsed on later runs.
+- Entries are only shared when the full identity matches. `gdsc2_7d_validation.py` keys on the
+  backend's default windows/flank (windows=None, flank=None) while the SPD benchmark's API scorer keys
+  on explicit windows and exon flank, so the two runners share the file but not each other's entries.
+
+Usage:
+    from variant_score_store import VariantScoreStore
+    with VariantScoreStore("results/evo2_variant_scores.sqlite") as store:
+        key = store.key(assembly="GRCh38", chrom="chr17", pos=43045712, ref="G", alt="A",
+                        model_id="evo2_1b", windows=[1024, 2048], flank=4096)
+        hit = store.get(key)
+        if hit is None:
+            store.put(key, {...})
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS variant_scores (
+    key        TEXT PRIMARY KEY,
+    assembly   TEXT NOT NULL,
+    chrom      TEXT NOT NULL,
+    pos        INTEGER NOT NULL,
+    ref        TEXT,
+    alt        TEXT NOT NULL,
+    model_id   TEXT NOT NULL,
+    windows    TEXT,
+    flank      INTEGER,
+    value      TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def normalize_assembly(assembly: str) -> str:
+    a = str(assembly or "").strip()
+    if a.lower() in ("hg38", "grch38"):
+        return "GRCh38"
+    if a.lower() in ("hg19", "grch37"):
+        return "GRCh37"
+    return a
+
+
+def normalize_chrom(chrom: Any) -> str:
+    c = str(chrom or "").strip()
+    return c[3:] if c.lower().startswith("chr") else c
+
+
+def variant_identity(
+    *,
+    assembly: str,
+    chrom: Any,
+    pos: int,
+    ref: Optional[str],
+    alt: str,
+    model_id: str,
+    windows: Optional[Iterable[int]] = None,
+    flank: Optional[int] = None,
+) -> Tuple[str, str, int, Optional[str], str, str, Optional[str], Optional[int]]:
+    """Canonical identity tuple (the thing we hash)."""
+    win = None if windows is None else ",".join(str(int(w)) for w in sorted(windows))
+    return (
+        normalize_assembly(assembly),
+        normalize_chrom(chrom),
+        int(pos),
+        None if ref is None else str(ref).upper(),
+        str(alt).upper(),
+        str(model_id),
+        win,
+        None if flank is None else int(flank),
+    )
+
+
+def variant_key(**kwargs: Any) -> str:
+    """SHA-256 content address for a (variant, scoring config) pair."""
+    ident = variant_identity(**kwargs)
+    blob = json.dumps(list(ident), separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class VariantScoreStore:
+    """SQLite-backed variant-score store with batched commits."""
+
+    def __init__(self, path: str, *, commit_every: int = 64):
+        self.path = str(path)
+        parent = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(parent, exist_ok=True)
+        self.commit_every = max(1, int(commit_every))
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ---- keys ----
+    @staticmethod
+    def key(**kwargs: Any) -> str:
+        return variant_key(**kwargs)
+
+    # ---- reads ----
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM variant_scores WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return None
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM variant_scores WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM variant_scores").fetchone()[0])
+
+    # ---- writes ----
+    def put(self, key: str, value: Dict[str, Any], **identity: Any) -> None:
+        """Insert/replace one record. `identity` (same kwargs as `key`) is stored for inspection."""
+        ident = variant_identity(**identity) if identity else (None,) * 8
+        assembly, chrom, pos, ref, alt, model_id, windows, flank = ident
+        row = (
+            key,
+            assembly or "",
+            chrom or "",
+            int(pos or 0),
+            ref,
+            alt or "",
+            model_id or "",
+            windows,
+            flank,
+            json.dumps(value, default=str),
+            time.time(),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO variant_scores "
+                "(key, assembly, chrom, pos, ref, alt, model_id, windows, flank, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def lookup(self, **identity: Any) -> Optional[Dict[str, Any]]:
+        return self.get(variant_key(**identity))
+
+    def store(self, value: Dict[str, Any], **identity: Any) -> str:
+        k = variant_key(**identity)
+        self.put(k, value, **identity)
+        return k
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self) -> "VariantScoreStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ---- migration ----
+    @staticmethod
+    def _legacy_marker_key(json_path: str) -> str:
+        return f"legacy_json_import:{os.path.abspath(json_path)}"
+
+    def _get_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _set_meta(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+            self._conn.commit()
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def legacy_json_imported(self, json_path: str) -> bool:
+        """True if this exact file (same content) was already imported into the store."""
+        marker = self._get_meta(self._legacy_marker_key(json_path))
+        if marker is None or not os.path.exists(json_path):
+            return False
+        st = os.stat(json_path)
+        if marker.get("size") == st.st_size and marker.get("mtime") == st.st_mtime:
+            return True
+        # touched or copied: compare content before declaring it new
+        return marker.get("size") == st.st_size and marker.get("sha256") == self._file_sha256(json_path)
+
+    def import_legacy_json(self, json_path: str, *, default_model_id: str, force: bool = False) -> int:
+        """Import a legacy `{genome}:{chrom}:{pos}:{ref}:{alt}` JSON cache (SPD benchmark format).
+
+        Model/window/flank identity is recovered from each record's `provenance` when present
+        (backend /api/evo records); otherwise `default_model_id` is used (Modal records).
+        A file already imported with the same content is skipped unless `force`.
+        Returns number of records imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        if not force and self.legacy_json_imported(json_path):
+            return 0
+        st = os.stat(json_path)
+        try:
+            legacy = json.load(open(json_path))
+        except Exception:
+            return 0
+        if not isinstance(legacy, dict):
+            return 0
+
+        n = 0
+        for k, v in legacy.items():
+            parts = str(k).split(":")
+            if len(parts) != 5 or not isinstance(v, dict):
+                continue
+            genome, chrom, pos, ref, alt = parts
+            prov = v.get("provenance") if isinstance(v.get("provenance"), dict) else {}
+            identity = dict(
+                assembly=genome,
+                chrom=chrom,
+                pos=int(pos),
+                ref=None if ref in ("None", "") else ref,
+                alt=alt,
+                model_id=str(prov.get("model_id") or default_model_id),
+                windows=prov.get("windows"),
+                flank=prov.get("exon_flank"),
+            )
+            self.store(v, **identity)
+            n += 1
+        self.flush()
+        self._set_meta(self._legacy_marker_key(json_path), {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": self._file_sha256(json_path),
+            "n_records": n,
+            "imported_at": time.time(),
+        })
+        return n